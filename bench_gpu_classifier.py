@@ -0,0 +1,64 @@
+# bench_gpu_classifier.py
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from gpu_classifier import classify
+
+BASE_DIR = Path(__file__).parent
+CORPUS = BASE_DIR / "amazon_ocr.gpu_laptops.json"
+REPEAT = 2000
+
+# The per-module rules this classifier replaced (ocr_mongo / ocr_from_images)
+LEGACY_INCLUDE = [
+    r"\brtx\b", r"\bgtx\b", r"\bgeforce\b", r"\bnvidia\b",
+    r"\bradeon\b", r"\brx\b", r"\bamd\s+radeon\b",
+]
+LEGACY_EXCLUDE = [
+    r"\bintel\b", r"\buhd\b", r"\biris\b", r"\bintegrated\b",
+    r"\buma\b", r"\bshared\b", r"\barc\b"
+]
+
+def legacy_has_gpu(text: str) -> bool:
+    t = (text or "").lower()
+    include_hit = any(re.search(p, t) for p in LEGACY_INCLUDE)
+    exclude_hit = any(re.search(p, t) for p in LEGACY_EXCLUDE)
+    return include_hit and not exclude_hit
+
+# Cases the corpus doesn't cover
+EXTRA = [
+    "Lenovo LOQ Intel Core i7-13650HX, NVIDIA RTX 4060 8GB, 16GB DDR5",
+    "ASUS Vivobook 15, Intel Core i5, Intel Iris Xe Graphics, 16GB",
+    "HP 15s Intel Core i3 UHD Graphics 8GB RAM",
+    "MSI Thin GF63 12th Gen i5 RTX4050",
+    "ASUS TUF A15 Ryzen 7 AMD Radeon RX 7600S",
+]
+
+def bench(fn, texts, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - t0) / (repeat * len(texts)) * 1e6
+
+def main():
+    corpus = Path(sys.argv[1]) if len(sys.argv) > 1 else CORPUS
+    docs = json.loads(corpus.read_text(encoding="utf-8"))
+    texts = [d.get("raw_text", "") for d in docs] + EXTRA
+    print(f"Texts: {len(texts)} ({len(docs)} from {corpus.name}) x {REPEAT}\n")
+
+    legacy_us = bench(legacy_has_gpu, texts, REPEAT)
+    new_us = bench(classify, texts, REPEAT)
+    print(f"legacy (14 re.search) : {legacy_us:8.2f} us/text")
+    print(f"compiled single pass  : {new_us:8.2f} us/text  ({legacy_us / new_us:.1f}x)\n")
+
+    for t in texts:
+        m = classify(t)
+        old = legacy_has_gpu(t)
+        flag = "  <- differs from legacy" if m.ok != old else ""
+        print(f"{str(m.ok):5s} {m.label:12s} {m.reason:15s} {m.token:12s} | {t.splitlines()[0][:60]}{flag}")
+
+if __name__ == "__main__":
+    main()
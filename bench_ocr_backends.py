@@ -0,0 +1,70 @@
+# bench_ocr_backends.py
+import difflib
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from ocr_backend import PytesseractBackend, TesserocrBackend
+from ocr_ext import configure_tesseract, preprocess_for_ocr
+
+BASE_DIR = Path(__file__).parent
+IMG_DIR = BASE_DIR / "card_images"
+LIMIT = int(os.getenv("BENCH_LIMIT", "50"))
+
+
+def pct(values, q):
+    vals = sorted(values)
+    return vals[min(len(vals) - 1, int(round(q * (len(vals) - 1))))]
+
+
+def run(backend, images, ocr_config):
+    times, texts = [], []
+    for pre in images:
+        t0 = time.perf_counter()
+        texts.append(backend.image_to_string(pre, ocr_config))
+        times.append((time.perf_counter() - t0) * 1000)
+    return times, texts
+
+
+def main():
+    img_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else IMG_DIR
+    _, _, ocr_config = configure_tesseract()
+
+    paths = sorted(img_dir.glob("*.png"))[:LIMIT]
+    if not paths:
+        print("No card images in", img_dir)
+        return
+
+    # preprocess once, so only the OCR call is timed
+    images = [preprocess_for_ocr(Image.open(p)) for p in paths]
+    print(f"Cards: {len(images)} from {img_dir}\n")
+
+    backends = [PytesseractBackend()]
+    try:
+        backends.append(TesserocrBackend())
+    except ImportError:
+        print("[skip] tesserocr not installed (pip install tesserocr)\n")
+
+    results = {}
+    for backend in backends:
+        # warm-up: first tesserocr call loads eng.traineddata
+        backend.image_to_string(images[0], ocr_config)
+        times, texts = run(backend, images, ocr_config)
+        results[backend.name] = texts
+        print(
+            f"{backend.name:12s} total {sum(times)/1000:7.2f}s | "
+            f"mean {statistics.mean(times):7.1f} ms | p50 {pct(times, .5):7.1f} ms | p95 {pct(times, .95):7.1f} ms"
+        )
+
+    if len(results) == 2:
+        a, b = results.values()
+        sim = [difflib.SequenceMatcher(None, x, y).ratio() for x, y in zip(a, b)]
+        print(f"\nText agreement: mean {statistics.mean(sim):.3f} | min {min(sim):.3f}")
+
+
+if __name__ == "__main__":
+    main()
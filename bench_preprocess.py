@@ -0,0 +1,124 @@
+# bench_preprocess.py
+import difflib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import ocr_backend
+from ocr_ext import configure_tesseract, extract_fields
+from preprocess_profiles import (
+    ACCURACY_TARGET, PROFILES, PROFILE_TABLE, apply_profile, choose_profile, glyph_bucket, line_height,
+)
+from roi import ROI_ENABLED, crop_text_regions
+
+BASE_DIR = Path(__file__).parent
+IMG_DIR = BASE_DIR / "card_images"
+# labelled cards: [{image_file, title, price, rating, raw_text?}, ...]
+LABELS = Path(os.getenv("BENCH_LABELS", str(BASE_DIR / "amazon_ocr.gpu_laptops.json")))
+TITLE_SIM = 0.9
+
+
+def norm(s: str) -> str:
+    return re.sub(r"\s+", " ", (s or "").lower()).strip()
+
+
+def digits(s: str) -> str:
+    return re.sub(r"\D", "", s or "")
+
+
+def score(pred: dict, truth: dict) -> tuple[int, int]:
+    """
+    (correct, scored) over title/price/rating; fields empty in truth are skipped.
+    """
+    correct = scored = 0
+    if truth.get("title"):
+        scored += 1
+        a, b = norm(pred.get("title_model")), norm(truth["title"])
+        correct += difflib.SequenceMatcher(None, a, b).ratio() >= TITLE_SIM
+    if truth.get("price"):
+        scored += 1
+        correct += digits(pred.get("price")) == digits(truth["price"])
+    if truth.get("rating"):
+        scored += 1
+        correct += (pred.get("rating") or "") == truth["rating"]
+    return correct, scored
+
+
+def load_cards(labels: Path, img_dir: Path) -> list:
+    cards = []
+    for row in json.loads(labels.read_text(encoding="utf-8")):
+        path = img_dir / row["image_file"]
+        if not path.exists():
+            continue
+        gray = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        if ROI_ENABLED:
+            gray = crop_text_regions(gray)
+        cards.append({"truth": row, "gray": gray, "height": line_height(gray)})
+    return cards
+
+
+def main():
+    img_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else IMG_DIR
+    _, _, ocr_config = configure_tesseract()
+
+    cards = load_cards(LABELS, img_dir)
+    if not cards:
+        print(f"No labelled cards found: {LABELS} + {img_dir}")
+        return
+    print(f"Cards: {len(cards)} | labels: {LABELS.name}\n")
+
+    # table[bucket][profile] -> {accuracy, ms, n}
+    table = {}
+    print(f"{'profile':12s} {'ms/card':>8s} {'field acc':>9s} {'text sim':>8s}")
+    for name, profile in PROFILES.items():
+        times, sims = [], []
+        per_bucket = {}
+        for card in cards:
+            t0 = time.perf_counter()
+            pre = apply_profile(card["gray"], profile, height=card["height"])
+            text = ocr_backend.image_to_string(pre, ocr_config)
+            ms = (time.perf_counter() - t0) * 1000
+            times.append(ms)
+
+            correct, scored = score(extract_fields(text), card["truth"])
+            if card["truth"].get("raw_text"):
+                sims.append(difflib.SequenceMatcher(None, norm(text), norm(card["truth"]["raw_text"])).ratio())
+
+            b = per_bucket.setdefault(glyph_bucket(card["height"]), {"correct": 0, "scored": 0, "ms": []})
+            b["correct"] += correct
+            b["scored"] += scored
+            b["ms"].append(ms)
+
+        tot_c = sum(b["correct"] for b in per_bucket.values())
+        tot_s = sum(b["scored"] for b in per_bucket.values())
+        print(
+            f"{name:12s} {statistics.mean(times):8.1f} {tot_c / max(1, tot_s):9.3f} "
+            f"{statistics.mean(sims) if sims else 0.0:8.3f}"
+        )
+
+        for bucket, b in per_bucket.items():
+            table.setdefault(bucket, {})[name] = {
+                "accuracy": round(b["correct"] / max(1, b["scored"]), 4),
+                "ms": round(statistics.mean(b["ms"]), 2),
+                "n": len(b["ms"]),
+            }
+
+    PROFILE_TABLE.parent.mkdir(parents=True, exist_ok=True)
+    PROFILE_TABLE.write_text(json.dumps(table, indent=2), encoding="utf-8")
+    print(f"\nAdaptive choice (accuracy >= {ACCURACY_TARGET}):")
+    for bucket in sorted(table):
+        print(f"  {bucket:7s} -> {choose_profile(bucket, table)}")
+    print("Saved profile table for PREPROCESS_PROFILE=adaptive:", PROFILE_TABLE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# cascade.py
+import os
+import threading
+import time
+
+import numpy as np
+
+import ocr_backend
+from roi import ROI_PAD, find_text_lines, group_rows
+
+# ----------------------------
+# Cascade config
+# ----------------------------
+# OCR_CASCADE=1: reject cards whose title band shows no NVIDIA/AMD GPU before
+# full OCR. Opt-in: a GPU named below the first TITLE_ROWS rows is lost.
+CASCADE_ENABLED = os.getenv("OCR_CASCADE", "0") == "1"
+TITLE_ROWS = int(os.getenv("OCR_CASCADE_TITLE_ROWS", "3"))
+# below this many readable characters the title band is "ambiguous", not a reject
+MIN_TITLE_CHARS = int(os.getenv("OCR_CASCADE_MIN_CHARS", "25"))
+
+# Part of the OCR cache key for stage-1 text
+STAGE1_PARAMS = f"title-band-{TITLE_ROWS}|x1|otsu"
+
+PASS, REJECT, AMBIGUOUS = "pass", "reject", "ambiguous"
+
+
+def title_band(gray: np.ndarray, rows: int = TITLE_ROWS) -> np.ndarray:
+    """
+    Crop the first text rows of the card (where the GPU model almost always is).
+    Falls back to the top third of the card when no rows are detected.
+    """
+    H, W = gray.shape[:2]
+    found = group_rows(find_text_lines(gray))[:rows]
+    if not found:
+        return gray[: max(1, H // 3), :]
+
+    x0 = max(0, min(r[0] for r in found) - ROI_PAD)
+    y0 = max(0, min(r[1] for r in found) - ROI_PAD)
+    x1 = min(W, max(r[2] for r in found) + ROI_PAD)
+    y1 = min(H, max(r[3] for r in found) + ROI_PAD)
+    return gray[y0:y1, x0:x1]
+
+
+def stage1_ocr(gray: np.ndarray, ocr_config: str) -> str:
+    """
+    Cheap pass: title band at native resolution, Otsu only (no upscale, no bilateral).
+    """
+    import cv2
+
+    _, th = cv2.threshold(title_band(gray), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return ocr_backend.image_to_string(th, ocr_config)
+
+
+def verdict(title_text: str, is_gpu) -> str:
+    """
+    pass      -> GPU filter already matches on the title
+    reject    -> title is readable and the filter doesn't match
+    ambiguous -> too little readable text to decide; run full OCR
+    """
+    if is_gpu(title_text):
+        return PASS
+    readable = sum(ch.isalnum() for ch in title_text or "")
+    return REJECT if readable >= MIN_TITLE_CHARS else AMBIGUOUS
+
+
+class CascadeStats:
+    """
+    Per-stage pass/reject counters and Tesseract time, to see what the cascade saves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {PASS: 0, REJECT: 0, AMBIGUOUS: 0, "stage2": 0}
+        self.stage1_seconds = 0.0
+        self.stage2_seconds = 0.0
+
+    def stage1(self, result: str, seconds: float):
+        with self._lock:
+            self.counts[result] += 1
+            self.stage1_seconds += seconds
+
+    def stage2(self, seconds: float):
+        with self._lock:
+            self.counts["stage2"] += 1
+            self.stage2_seconds += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            c = dict(self.counts)
+            s1, s2 = self.stage1_seconds, self.stage2_seconds
+        total = c[PASS] + c[REJECT] + c[AMBIGUOUS]
+        avg2 = s2 / c["stage2"] if c["stage2"] else 0.0
+        return {
+            **c,
+            "stage1_s": round(s1, 2),
+            "stage2_s": round(s2, 2),
+            # full OCR we did not run, priced at the measured stage-2 average
+            "saved_s": round(c[REJECT] * avg2 - s1, 2) if total else 0.0,
+        }
+
+
+STATS = CascadeStats()
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
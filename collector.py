@@ -1,15 +1,34 @@
 # collector.py
-import time
+import queue
+import threading
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
 
-from ocr_mongo import ocr_and_store 
+import cascade
+from freshness import FRESH_SECONDS, FreshnessIndex
+from dom_extract import extract_card_fields, is_complete
+from gpu_classifier import classify as classify_gpu
+import lean_chrome
+from lean_chrome import LEAN_CHROME, NET
+from engine import get_engine
+from manifest import get_manifest
+from metrics import METRICS
+from crawl_control import WAITS, AdaptivePacer, CircuitBreaker, RateLimiter
+from ocr_mongo import ocr_and_store, flush_writes, store_doc, take_write_failures
+from roi import roi_stats
+
+# with resume: pages captured between forced drains, i.e. how far the
+# checkpoint may trail the browser
+CHECKPOINT_EVERY = 5
+
+RESULT_CSS = "div.s-result-item[data-component-type='s-search-result']"
+SELECTED_PAGE_CSS = ".s-pagination-selected"
 
 
 def is_blocked(page_source: str) -> bool:
@@ -29,18 +48,554 @@ def accept_cookies(driver):
             btn = driver.find_element(By.CSS_SELECTOR, sel)
             if btn.is_displayed():
                 btn.click()
-                time.sleep(0.5)
+                WAITS.timed("cookies", lambda: WebDriverWait(driver, 3).until(EC.invisibility_of_element(btn)))
                 return True
         except Exception:
             pass
     return False
 
 
-def goto_next(driver):
+def search_url(query: str, page: int = 1) -> str:
+    url = f"https://www.amazon.in/s?k={urllib.parse.quote_plus(query)}"
+    return url if page <= 1 else f"{url}&page={page}"
+
+
+def make_driver(headless: bool, lean: bool = LEAN_CHROME):
+    """
+    Chrome session; lean=True skips images, media, fonts, ads and trackers
+    (lean_chrome.py) since only card text and layout are needed.
+    """
+    options = webdriver.ChromeOptions()
+    options.add_argument("--start-maximized")
+    options.add_argument(
+        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    )
+    if headless:
+        options.add_argument("--headless=new")
+    lean_chrome.apply_options(options, lean)
+    return lean_chrome.install(webdriver.Chrome(options=options), lean)
+
+
+def save_debug(driver, debug_dir: Path, kind: str, page: int):
+    (debug_dir / f"{kind}_page{page:02d}.html").write_text(driver.page_source, encoding="utf-8")
+    driver.save_screenshot(str(debug_dir / f"{kind}_page{page:02d}.png"))
+
+
+def selected_page(driver) -> int:
+    try:
+        return int(driver.find_element(By.CSS_SELECTOR, SELECTED_PAGE_CSS).text.strip())
+    except Exception:
+        return 0
+
+
+def goto_next(driver, wait, page: int):
+    """
+    Click Next and wait until the old result grid goes stale or the
+    pagination shows `page` (covers both full loads and in-place updates).
+    """
     nxt = driver.find_element(By.CSS_SELECTOR, "a.s-pagination-next")
     driver.execute_script("arguments[0].scrollIntoView({block:'center'});", nxt)
-    time.sleep(0.4)
+    WAITS.timed("next_clickable", lambda: wait.until(EC.element_to_be_clickable(nxt)))
+    old = driver.find_elements(By.CSS_SELECTOR, RESULT_CSS)[:1]
     nxt.click()
+    changed = WAITS.timed("next_page", lambda: wait.until(
+        lambda d: (old and EC.staleness_of(old[0])(d)) or selected_page(d) == page
+    ))
+    if not changed:
+        raise RuntimeError(f"results did not change to page {page}")
+
+
+def wait_cards_stable(driver, timeout: float = 5.0, poll: float = 0.2) -> int:
+    """
+    Wait until the result-card count stops changing between two polls
+    (lazy-loaded / sponsored cards after scrolling). Returns the count.
+    """
+    seen = {"n": -1}
+
+    def stable(d):
+        n = len(d.find_elements(By.CSS_SELECTOR, RESULT_CSS))
+        same, seen["n"] = n == seen["n"], n
+        return n if same and n else False
+
+    return WAITS.timed("cards_stable", lambda: WebDriverWait(driver, timeout, poll_frequency=poll).until(stable), seen["n"])
+
+
+def _write_png(path: Path, png: bytes):
+    try:
+        path.write_bytes(png)
+    except OSError as e:
+        print(f" [archive] could not write {path.name}: {e}")
+
+
+def dom_card(card, asin: str, page: int, index: int, query: str):
+    """
+    DOM-first extraction from the live card element.
+    Returns ("stored", doc), ("rejected", None) or ("incomplete", None);
+    only "incomplete" cards need a screenshot + OCR.
+    """
+    try:
+        fields = extract_card_fields(card.get_attribute("outerHTML"))
+    except Exception:
+        return "incomplete", None
+
+    if not is_complete(fields):
+        return "incomplete", None
+    gpu = classify_gpu(fields["text"])
+    if not gpu.ok:
+        return "rejected", None
+
+    doc = store_doc(
+        asin=asin,
+        page=page,
+        index=index,
+        query=query,
+        image_file=f"dom_p{page:02d}_{index:02d}_{asin}",
+        image_path="",
+        title=fields["title"],
+        price=fields["price"],
+        rating=fields["rating"],
+        raw_text=fields["text"],
+        extraction="dom",
+        gpu=gpu.label,
+    )
+    print(f" Mongo saved (DOM): {doc['title'][:60]} | {doc.get('price','')} | {doc.get('rating','')}")
+    return "stored", doc
+
+
+def run_ocr_job(job: dict) -> dict | None:
+    doc = ocr_and_store(**job)
+    if doc:
+        print(f" Mongo saved: {doc['title'][:60]} | {doc.get('price','')} | {doc.get('rating','')}")
+    else:
+        print(f" -> skipped by OCR filters ({Path(job['image_path']).name})")
+    return doc
+
+
+class OcrWorkQueue:
+    """
+    Bounded hand-off between the browser thread and OCR/store workers.
+    put() blocks when the queue is full, so capture never runs far ahead of OCR.
+    Stored docs go to on_doc(doc) when given; jobs still queued once
+    cancelled() is true are dropped without OCR.
+    """
+
+    def __init__(self, workers: int, maxsize: int, on_doc=None, cancelled=None):
+        self._q = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self.stored_docs = []
+        self.on_doc = on_doc
+        self.cancelled = cancelled
+        self.dropped = 0
+        self._threads = [
+            threading.Thread(target=self._run, name=f"ocr-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def put(self, job: dict):
+        self._q.put(job)
+
+    def _run(self):
+        while True:
+            job = self._q.get()
+            try:
+                if job is None:
+                    return
+                self._handle(job)
+            except Exception as e:
+                print(f" [OCR worker] {job.get('image_path')}: {e}")
+            finally:
+                self._q.task_done()
+
+    def _handle(self, job: dict):
+        if self.cancelled is not None and self.cancelled():
+            with self._lock:
+                self.dropped += 1
+            return
+        doc = run_ocr_job(job)
+        if not doc:
+            return
+        if self.on_doc is not None:
+            self.on_doc(doc)
+            return
+        with self._lock:
+            self.stored_docs.append(doc)
+
+    def drain(self):
+        """
+        Block until every queued job has been handled (workers keep running).
+        """
+        self._q.join()
+
+    def close(self) -> list:
+        """
+        Wait for the queue to drain, stop workers, return the docs they stored.
+        """
+        for _ in self._threads:
+            self._q.put(None)
+        for t in self._threads:
+            t.join()
+        return self.stored_docs
+
+
+class CrawlContext:
+    """
+    Everything a crawl shares between pages and browser sessions: output dirs,
+    capture options, the OCR work queue, the archive writer and stored docs.
+    """
+
+    def __init__(
+        self,
+        query: str,
+        cards_per_page: int,
+        base_dir: Path,
+        ocr_workers: int,
+        queue_size: int,
+        in_memory: bool,
+        archive_images: bool,
+        extract_mode: str,
+        resume: bool = False,
+        fresh_seconds: int = FRESH_SECONDS,
+        target: int | None = None,
+        on_doc=None,
+    ):
+        self.query = query
+        self.cards_per_page = cards_per_page
+        self.in_memory = in_memory
+        self.extract_mode = extract_mode
+
+        self.card_dir = base_dir / "card_images"
+        self.debug_dir = base_dir / "output" / "debug"
+        self.card_dir.mkdir(parents=True, exist_ok=True)
+        self.debug_dir.mkdir(parents=True, exist_ok=True)
+
+        # target: stop capturing (and drop queued OCR) once this many GPU docs are stored
+        # on_doc(doc): called (serialised) for each new ASIN up to the target, e.g. an exporter,
+        # once its upsert is confirmed by confirm()
+        self.target = target
+        self.on_doc = on_doc
+        self.stop = threading.Event()
+        self._asins = set()    # queued or stored; what the target counts
+        self._stored = set()   # confirmed by confirm()
+        self._unconfirmed = []
+
+        self.work = (
+            OcrWorkQueue(ocr_workers, queue_size, on_doc=self.add_doc, cancelled=self.stop.is_set)
+            if ocr_workers > 0 else None
+        )
+        self.archiver = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive")
+            if in_memory and archive_images else None
+        )
+        self._docs = []
+        self._lock = threading.Lock()
+
+        # ASINs refreshed recently (or seen earlier in this crawl) are skipped
+        # before screenshot/OCR
+        self.fresh = FreshnessIndex(fresh_seconds) if fresh_seconds > 0 else None
+        if self.fresh is not None:
+            self.fresh.start()
+
+        # crawl checkpoint: last page p such that pages 1..p are captured, their
+        # OCR jobs done and their writes confirmed
+        self.manifest = get_manifest() if resume else None
+        self.last_page = self.manifest.checkpoint(query) if resume else 0
+        self._captured = set()
+        self._done_pages = set()
+        self._failed_pages = set()
+        self._finished = False
+        self._confirm_lock = threading.Lock()
+        if self.last_page:
+            print(f"[RESUME] {query!r}: pages 1..{self.last_page} done, starting at page {self.last_page + 1}")
+
+    @property
+    def start_page(self) -> int:
+        return self.last_page + 1
+
+    def page_done(self, page: int):
+        """
+        Page captured and its cards queued. The checkpoint only moves past it
+        in drain()/close(), once its OCR jobs are done and writes confirmed;
+        with resume that drain is forced every CHECKPOINT_EVERY pages.
+        """
+        with self._lock:
+            self._captured.add(page)
+            due = self.manifest is not None and len(self._captured - self._done_pages) >= CHECKPOINT_EVERY
+        if due:
+            self.drain()
+
+    def _advance(self, pages: set):
+        with self._lock:
+            self._done_pages |= pages - self._failed_pages
+            last = self.last_page
+            while last + 1 in self._done_pages:
+                last += 1
+            moved, self.last_page = last != self.last_page, last
+        if moved and self.manifest is not None and not self._finished:
+            self.manifest.save_checkpoint(self.query, last)
+
+    def finished(self):
+        """
+        Crawl ran to the end: drop the checkpoint so the next run starts fresh
+        (in close(), unless a page lost writes and has to be redone).
+        """
+        self._finished = True
+
+    @property
+    def found(self) -> int:
+        """
+        Distinct ASINs stored so far.
+        """
+        with self._lock:
+            return len(self._asins)
+
+    def add_doc(self, doc: dict | None):
+        if not doc:
+            return
+        key = doc["asin"] or doc["image_file"]
+        with self._lock:
+            self._unconfirmed.append(doc)
+            self._asins.add(key)
+            reached = self.target is not None and len(self._asins) >= self.target
+        if reached and not self.stop.is_set():
+            self.stop.set()
+            print(f"[TARGET] {self.target} GPU laptops found; stopping capture.")
+
+    def target_reached(self) -> bool:
+        """
+        True when the target is met by confirmed writes. stop is set as soon
+        as enough docs are queued; this drains and confirms them first, and a
+        failed write clears stop again (see _confirm).
+        """
+        if not self.stop.is_set():
+            return False
+        self.drain()
+        return self.stop.is_set()
+
+    def add_fresh(self, skipped: list, page: int, query: str):
+        """
+        With a target, ASINs skipped as fresh still count: their stored docs
+        (only GPU laptops are stored) are read back from Mongo, one $in query
+        for the page's [(asin, index)].
+        """
+        if self.target is None or not skipped:
+            return
+        index = {asin.upper(): i for asin, i in skipped}
+        with METRICS.timer("page.fresh_docs", query=query, page=page):
+            docs = list(get_engine().col.find({"asin": {"$in": list(index)}}, {"_id": 0}))
+        for doc in sorted(docs, key=lambda d: index[d["asin"]]):
+            self.add_doc({**doc, "query": query, "page": page, "index": index[doc["asin"]], "extraction": "fresh"})
+
+    def confirm(self, pages: set = frozenset()) -> int:
+        """
+        Flush queued upserts and settle the docs added since the last call:
+        a doc whose write failed is dropped (its ASIN no longer counts), the
+        rest are kept and passed to on_doc. `pages` (all their jobs done) then
+        move the checkpoint, except pages that lost a write. Returns how many
+        docs were dropped.
+        """
+        with self._confirm_lock:
+            dropped = self._confirm()
+            self._advance(set(pages))
+        if dropped:
+            METRICS.count("card.write_failed", dropped, query=self.query)
+        return dropped
+
+    def _confirm(self) -> int:
+        flush_writes()
+        failed = take_write_failures()
+        dropped = 0
+        with self._lock:
+            docs, self._unconfirmed = self._unconfirmed, []
+            for doc in docs:
+                key = doc["asin"] or doc["image_file"]
+                if doc["extraction"] != "fresh" and doc["image_file"] in failed:
+                    if key not in self._stored:
+                        self._asins.discard(key)
+                    self._failed_pages.add(doc["page"])
+                    dropped += 1
+                    continue
+                self._docs.append(doc)
+                new = key not in self._stored
+                self._stored.add(key)
+                full = self.target is not None and len(self._stored) > self.target
+                if new and not full and self.on_doc is not None:
+                    self.on_doc(doc)
+            # stop was set on queued docs; lost writes put the crawl below target again
+            below = dropped and self.target is not None and len(self._asins) < self.target
+            found = len(self._asins)
+        if below and self.stop.is_set():
+            self.stop.clear()
+            print(f"[TARGET] {dropped} write(s) failed, {found}/{self.target} stored; resuming capture.")
+        return dropped
+
+    def drain(self):
+        """
+        Wait until queued OCR jobs are done and their writes confirmed, so
+        `found` and the checkpoint are up to date.
+        """
+        with self._lock:
+            # every job of these pages was queued before the drain starts
+            pages = set(self._captured)
+        if self.work is not None:
+            self.work.drain()
+        self.confirm(pages)
+
+    def submit(self, job: dict):
+        if self.work is not None:
+            self.work.put(job)
+        else:
+            self.add_doc(run_ocr_job(job))
+
+    def archive(self, path: Path, png: bytes):
+        if self.archiver is not None:
+            self.archiver.submit(_write_png, path, png)
+
+    def close(self) -> list:
+        """
+        Drain OCR + archive work, flush Mongo, return stored docs in page order.
+        """
+        if self.work is not None:
+            self._docs.extend(self.work.close())
+            if self.work.dropped:
+                print("OCR jobs dropped after target:", self.work.dropped)
+        if self.archiver is not None:
+            self.archiver.shutdown(wait=True)
+        dropped = self.confirm(self._captured)
+        if dropped:
+            print("Docs dropped after failed writes:", dropped)
+        if self._finished and self.manifest is not None:
+            if self._failed_pages:
+                print(f"[RESUME] keeping checkpoint: writes failed on page(s) {sorted(self._failed_pages)}")
+            else:
+                self.manifest.clear_checkpoint(self.query)
+        print("Mongo writer:", flush_writes())
+        print("OCR ROI:", roi_stats())
+        print("OCR cascade:", cascade.STATS.snapshot())
+        print("Crawl waits:", WAITS.snapshot())
+        print("Network:", NET.snapshot())
+        if self.fresh is not None:
+            print("Freshness:", self.fresh.stats())
+        METRICS.report("Crawl stage timings")
+        return sorted(self._docs, key=lambda d: (d["page"], d["index"]))
+
+
+def capture_page(driver, wait, page: int, ctx: CrawlContext, query: str | None = None) -> str:
+    """
+    Capture the result cards of the page currently loaded in `driver`.
+    `query` tags the docs when it differs from ctx.query (pipeline.py walks
+    several queries with one context).
+    Returns "ok", "blocked" or "timeout" (debug files saved for the latter two).
+    """
+    query = query or ctx.query
+    tags = {"query": query, "page": page}
+    with METRICS.timer("page.capture", **tags):
+        status = _capture_page(driver, wait, page, ctx, query, tags)
+    net = NET.page(driver, **tags)
+    if net is not None:
+        print(
+            f"[NET] page {page}: {net['requests']} requests, {net['kb']} KB, "
+            f"{net['blocked']} blocked, JS heap {net['heap_mb']} MB"
+        )
+    if status != "ok":
+        METRICS.count(f"page.{status}", **tags)
+    return status
+
+
+def _capture_page(driver, wait, page: int, ctx: CrawlContext, query: str, tags: dict) -> str:
+    if is_blocked(driver.page_source):
+        save_debug(driver, ctx.debug_dir, "BLOCKED", page)
+        print(f"[STOP] Block/CAPTCHA detected on page {page}. Saved debug files.")
+        return "blocked"
+
+    found = WAITS.timed("results", lambda: wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, RESULT_CSS))), **tags)
+    if found is None:
+        save_debug(driver, ctx.debug_dir, "TIMEOUT", page)
+        print(f"[STOP] Timeout waiting for results on page {page}. Saved debug files.")
+        return "timeout"
+
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight * 0.25);")
+    wait_cards_stable(driver)
+
+    cards = driver.find_elements(By.CSS_SELECTOR, RESULT_CSS)
+    print(f"Page {page}: cards found:", len(cards))
+
+    asins = [(card.get_attribute("data-asin") or "").strip() for card in cards]
+    if ctx.fresh is not None:
+        ctx.fresh.lookup(asins)
+
+    saved = 0
+    dom_stored = dom_rejected = fresh_skipped = 0
+    fresh = []  # (asin, index) read back in one query after the loop
+    for card, asin in zip(cards, asins):
+        if saved >= ctx.cards_per_page or ctx.stop.is_set():
+            break
+
+        if not asin:
+            continue
+
+        if ctx.fresh is not None:
+            reason = ctx.fresh.should_skip(asin)
+            if reason:
+                METRICS.count(f"card.skipped_{reason}", asin=asin, **tags)
+                if reason == "fresh":
+                    fresh.append((asin, saved))
+                fresh_skipped += 1
+                saved += 1
+                continue
+            ctx.fresh.mark(asin)
+
+        if ctx.extract_mode == "dom":
+            with METRICS.timer("card.dom", asin=asin, **tags):
+                status, doc = dom_card(card, asin, page, saved, query)
+            if status != "incomplete":
+                METRICS.count(f"card.dom_{status}", asin=asin, **tags)
+            if status == "stored":
+                ctx.add_doc(doc)
+                dom_stored += 1
+                saved += 1
+                continue
+            if status == "rejected":
+                dom_rejected += 1
+                saved += 1
+                continue
+
+        img_path = ctx.card_dir / f"card_p{page:02d}_{saved:02d}_{asin}.png"
+
+        try:
+            with METRICS.timer("card.screenshot", asin=asin, **tags):
+                if ctx.in_memory:
+                    png = card.screenshot_as_png
+                else:
+                    card.screenshot(str(img_path))
+                    png = None
+        except Exception:
+            METRICS.count("card.screenshot_failed", asin=asin, **tags)
+            continue
+
+        if png is not None:
+            ctx.archive(img_path, png)
+
+        ctx.submit(dict(
+            image_path=str(img_path),
+            asin=asin,
+            page=page,
+            index=saved,
+            query=query,
+            png_bytes=png,
+            archived=png is None or ctx.archiver is not None,
+        ))
+        saved += 1
+
+    ctx.add_fresh(fresh, page, query)
+    print(f"Page {page}:", "captured cards:" if ctx.work is not None else "processed cards:", saved - fresh_skipped)
+    if fresh_skipped:
+        print(f"Page {page}: skipped {fresh_skipped} fresh/repeated ASINs")
+    if ctx.extract_mode == "dom":
+        print(f"Page {page}: DOM stored {dom_stored} | rejected {dom_rejected} | OCR fallback {saved - dom_stored - dom_rejected}")
+    return "ok"
 
 
 def collect_cards_streaming_to_mongo(
@@ -50,113 +605,214 @@ def collect_cards_streaming_to_mongo(
     base_dir: Path,
     headless: bool = False,
     wait_seconds: int = 25,
+    ocr_workers: int = 2,
+    queue_size: int = 32,
+    in_memory: bool = True,
+    archive_images: bool = True,
+    extract_mode: str = "dom",
+    block_retries: int = 1,
+    resume: bool = False,
+    fresh_seconds: int = FRESH_SECONDS,
+    target: int | None = None,
 ):
     """
     Streaming pipeline:
     Selenium -> screenshot -> OCR -> MongoDB (upsert) immediately
     Returns list of stored docs (only those that passed filters).
-    """
 
-    card_dir = base_dir / "card_images"
-    debug_dir = base_dir / "output" / "debug"
-    card_dir.mkdir(parents=True, exist_ok=True)
-    debug_dir.mkdir(parents=True, exist_ok=True)
+    With ocr_workers > 0 the browser thread only captures screenshots and
+    pushes them onto a bounded queue drained by OCR/store worker threads,
+    so paging overlaps with OCR. ocr_workers=0 keeps the inline behaviour.
 
-    options = webdriver.ChromeOptions()
-    options.add_argument("--start-maximized")
-    options.add_argument(
-        "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-    )
-    if headless:
-        options.add_argument("--headless=new")
+    in_memory=True hands screenshot_as_png bytes straight to OCR (no disk
+    round-trip); card_images/ is then written by a background thread only
+    when archive_images=True.
+
+    extract_mode="dom" reads title/price/rating from the card's outerHTML and
+    only screenshots + OCRs cards whose DOM fields are incomplete;
+    extract_mode="ocr" OCRs every card. Docs record the path in "extraction".
 
-    driver = webdriver.Chrome(options=options)
-    wait = WebDriverWait(driver, wait_seconds)
+    No fixed sleeps: every wait is condition-based and timed (see "Crawl
+    waits"). A blocked/timed-out page backs off via AdaptivePacer and is
+    reloaded up to `block_retries` times before the crawl stops.
 
-    stored_docs = []
+    resume=True (opt-in) checkpoints, per query in the manifest, the last page
+    whose cards are OCR'd and confirmed in Mongo; an interrupted crawl restarts
+    from the next page (&page=N), and a crawl that runs to the end clears its
+    checkpoint.
 
+    Cards whose ASIN was upserted within fresh_seconds (FRESH_SECONDS env;
+    opt-in, 0 = off) or already handled earlier in this crawl are skipped
+    before the screenshot; see freshness.py.
+
+    target=N stops paging/screenshotting as soon as N GPU laptops are stored
+    (queued OCR jobs are dropped); pipeline.py builds on this.
+    """
+    ctx = CrawlContext(
+        query, cards_per_page, base_dir, ocr_workers, queue_size, in_memory, archive_images, extract_mode,
+        resume=resume, fresh_seconds=fresh_seconds, target=target,
+    )
+    if ctx.start_page > max_pages:
+        print(f"[RESUME] All {max_pages} pages already collected for {query!r}.")
+        ctx.finished()
+        return ctx.close()
+
+    driver = None
     try:
-        encoded = urllib.parse.quote_plus(query)
-        url = f"https://www.amazon.in/s?k={encoded}"
+        driver = make_driver(headless)
+        wait = WebDriverWait(driver, wait_seconds)
+        pacer = AdaptivePacer()
+
+        url = search_url(query, ctx.start_page)
         print("Opening:", url)
 
-        driver.get(url)
-        time.sleep(1)
+        WAITS.timed("page_load", lambda: driver.get(url), query=query, page=ctx.start_page)
         accept_cookies(driver)
 
-        for page in range(1, max_pages + 1):
+        page, retries = ctx.start_page, 0
+        while page <= max_pages and not ctx.stop.is_set():
             print(f"\n=== PAGE {page} ===")
 
-            if is_blocked(driver.page_source):
-                (debug_dir / f"BLOCKED_page{page:02d}.html").write_text(driver.page_source, encoding="utf-8")
-                driver.save_screenshot(str(debug_dir / f"BLOCKED_page{page:02d}.png"))
-                print("[STOP] Block/CAPTCHA detected. Saved debug files.")
-                break
-
-            try:
-                wait.until(
-                    EC.presence_of_element_located(
-                        (By.CSS_SELECTOR, "div.s-result-item[data-component-type='s-search-result']")
-                    )
-                )
-            except TimeoutException:
-                (debug_dir / f"TIMEOUT_page{page:02d}.html").write_text(driver.page_source, encoding="utf-8")
-                driver.save_screenshot(str(debug_dir / f"TIMEOUT_page{page:02d}.png"))
-                print("[STOP] Timeout waiting for results. Saved debug files.")
-                break
-
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight * 0.25);")
-            time.sleep(1)
-
-            cards = driver.find_elements(By.CSS_SELECTOR, "div.s-result-item[data-component-type='s-search-result']")
-            print("Cards found:", len(cards))
-
-            saved = 0
-            for _, card in enumerate(cards):
-                if saved >= cards_per_page:
+            if capture_page(driver, wait, page, ctx) != "ok":
+                pacer.record_block()
+                if retries >= block_retries:
                     break
-
-                asin = (card.get_attribute("data-asin") or "").strip()
-                if not asin:
-                    continue
-
-                img_path = card_dir / f"card_p{page:02d}_{saved:02d}_{asin}.png"
-
+                retries += 1
+                print(f"[PACE] Backing off {pacer.delay:.1f}s, then reloading page {page}.")
+                WAITS.record("pace", pacer.pace())
+                WAITS.timed("page_load", driver.refresh, query=query, page=page)
+                continue
+
+            pacer.record_ok()
+            ctx.page_done(page)
+            retries = 0
+            if page < max_pages and not ctx.target_reached():
+                WAITS.record("pace", pacer.pace())
                 try:
-                    card.screenshot(str(img_path))
+                    goto_next(driver, wait, page + 1)
                 except Exception:
-                    continue
+                    print("[END] Next not clickable / last page.")
+                    ctx.finished()
+                    break
+            page += 1
+        else:
+            ctx.finished()
 
-                
-                doc = ocr_and_store(
-                    image_path=str(img_path),
-                    asin=asin,
-                    page=page,
-                    index=saved,
-                    query=query,
-                )
-
-                if doc:
-                    stored_docs.append(doc)
-                    print(f" Mongo saved: {doc['title'][:60]} | {doc.get('price','')} | {doc.get('rating','')}")
-                else:
-                    print(" -> skipped by OCR filters")
+    finally:
+        # Chrome may have failed to start; the OCR workers still need closing
+        if driver is not None:
+            driver.quit()
+        stored_docs = ctx.close()
 
-                saved += 1
+    return stored_docs
 
-            print("Processed cards:", saved)
 
-            if page < max_pages:
-                try:
-                    goto_next(driver)
-                    time.sleep(2.5)
-                except Exception:
-                    print("[END] Next not clickable / last page.")
-                    break
+def collect_cards_parallel(
+    query: str,
+    max_pages: int,
+    cards_per_page: int,
+    base_dir: Path,
+    sessions: int = 4,
+    headless: bool = True,
+    wait_seconds: int = 25,
+    ocr_workers: int = 4,
+    queue_size: int = 64,
+    in_memory: bool = True,
+    archive_images: bool = True,
+    extract_mode: str = "dom",
+    pages_per_second: float = 1.0,
+    max_blocks: int = 2,
+    block_retries: int = 1,
+    resume: bool = False,
+    fresh_seconds: int = FRESH_SECONDS,
+    target: int | None = None,
+):
+    """
+    Same pipeline as collect_cards_streaming_to_mongo, but `sessions` browsers
+    run in parallel and take pages by URL (&page=N) from a shared queue instead
+    of clicking Next. All sessions share one page-load rate limiter and one
+    block/CAPTCHA circuit breaker, and feed the same OCR/store queue.
+    A shared AdaptivePacer adds delay only after block signals; blocked or
+    timed-out pages are re-queued up to `block_retries` times. With resume,
+    pages up to the checkpoint (see collect_cards_streaming_to_mongo) are skipped.
+    """
+    ctx = CrawlContext(
+        query, cards_per_page, base_dir, ocr_workers, queue_size, in_memory, archive_images, extract_mode,
+        resume=resume, fresh_seconds=fresh_seconds, target=target,
+    )
+    pages = queue.Queue()
+    for page in range(ctx.start_page, max_pages + 1):
+        pages.put((page, 0))
+
+    limiter = RateLimiter(pages_per_second)
+    breaker = CircuitBreaker(max_blocks)
+    pacer = AdaptivePacer()
 
+    def session(n: int):
+        driver = current = None
+        try:
+            driver = make_driver(headless)
+            wait = WebDriverWait(driver, wait_seconds)
+            first = True
+            while not breaker.is_open and not ctx.stop.is_set():
+                try:
+                    current = page, attempt = pages.get_nowait()
+                except queue.Empty:
+                    return
+
+                WAITS.record("rate_limit", limiter.wait())
+                WAITS.record("pace", pacer.pace())
+                if breaker.is_open:
+                    return
+                print(f"[session {n}] Opening page {page}")
+                WAITS.timed("page_load", lambda: driver.get(search_url(query, page)), query=query, page=page)
+                if first:
+                    accept_cookies(driver)
+                    first = False
+
+                status = capture_page(driver, wait, page, ctx)
+                current = None
+                if status == "ok":
+                    breaker.record_ok()
+                    pacer.record_ok()
+                    ctx.page_done(page)
+                    ctx.target_reached()  # confirms before the loop sees stop
+                    continue
+                if status == "blocked":
+                    breaker.record_block()
+                pacer.record_block()
+                if attempt < block_retries and not breaker.is_open:
+                    pages.put((page, attempt + 1))
+        except Exception as e:
+            print(f"[session {n}] stopped: {e}")
+            METRICS.count("session.failed", query=query, session=n)
+            if current is not None:
+                # the page this browser was on goes back to the other sessions
+                page, attempt = current
+                if attempt < block_retries:
+                    pages.put((page, attempt + 1))
+                else:
+                    print(f"[session {n}] giving up on page {page}")
+        finally:
+            if driver is not None:
+                driver.quit()
+
+    threads = [
+        threading.Thread(target=session, args=(n,), name=f"browser-{n}")
+        for n in range(min(sessions, pages.qsize()))
+    ]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        ctx.drain()
+        if not pages.empty():
+            print(f"[WARN] {pages.qsize()} page(s) left uncaptured (no browser session left)")
+        if ctx.last_page >= max_pages or ctx.stop.is_set():
+            ctx.finished()
     finally:
-        driver.quit()
+        stored_docs = ctx.close()
 
     return stored_docs
 
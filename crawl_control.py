@@ -0,0 +1,152 @@
+# crawl_control.py
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException
+
+from metrics import METRICS
+
+
+class RateLimiter:
+    """
+    Global pacing for page loads shared by all browser sessions:
+    at most `per_second` loads per second, spread evenly.
+    """
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> float:
+        """
+        Block until this caller's slot; returns seconds waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Shared block/CAPTCHA breaker: opens after `max_blocks` consecutive block
+    pages from any session, after which no session loads new pages.
+    """
+
+    def __init__(self, max_blocks: int = 2):
+        self.max_blocks = max_blocks
+        self.blocks = 0
+        self._consecutive = 0
+        self._open = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._open.is_set()
+
+    def record_block(self):
+        with self._lock:
+            self.blocks += 1
+            self._consecutive += 1
+            if self._consecutive >= self.max_blocks and not self._open.is_set():
+                self._open.set()
+                print(f"[STOP] Circuit breaker open after {self._consecutive} blocked pages.")
+
+    def record_ok(self):
+        with self._lock:
+            self._consecutive = 0
+
+
+class AdaptivePacer:
+    """
+    Extra delay before page loads: zero while pages come back clean, grows
+    (x factor, capped at max_delay) on each block signal and decays back on
+    clean pages.
+    """
+
+    def __init__(self, base: float = 0.0, first_backoff: float = 2.0, factor: float = 2.0,
+                 max_delay: float = 60.0, decay: float = 0.5):
+        self.base = base
+        self.first_backoff = first_backoff
+        self.factor = factor
+        self.max_delay = max_delay
+        self.decay = decay
+        self.delay = base
+        self._lock = threading.Lock()
+
+    def record_block(self):
+        with self._lock:
+            self.delay = min(self.max_delay, max(self.first_backoff, self.delay * self.factor))
+
+    def record_ok(self):
+        with self._lock:
+            d = self.delay * self.decay
+            self.delay = d if d >= self.base + 0.1 else self.base
+
+    def pace(self) -> float:
+        """
+        Sleep the current delay; returns seconds slept.
+        """
+        with self._lock:
+            delay = self.delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class WaitStats:
+    """
+    Time actually spent in each named wait (page loads, cookie banner, card
+    count settling, pacing...), to tune timeouts against real numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = {}  # name -> [count, total_s, max_s, timeouts]
+
+    def record(self, name: str, seconds: float, timed_out: bool = False, **tags):
+        METRICS.observe(f"wait.{name}", seconds, **tags)
+        if timed_out:
+            METRICS.count(f"wait.{name}.timeout", **tags)
+        with self._lock:
+            w = self._waits.setdefault(name, [0, 0.0, 0.0, 0])
+            w[0] += 1
+            w[1] += seconds
+            w[2] = max(w[2], seconds)
+            w[3] += timed_out
+
+    def timed(self, name: str, fn, default=None, **tags):
+        """
+        Run a blocking wait, record its duration; a TimeoutException is
+        recorded as a timeout and `default` is returned instead.
+        """
+        t0 = time.perf_counter()
+        try:
+            out = fn()
+        except TimeoutException:
+            self.record(name, time.perf_counter() - t0, timed_out=True, **tags)
+            return default
+        self.record(name, time.perf_counter() - t0, **tags)
+        return out
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = {k: list(v) for k, v in self._waits.items()}
+        return {
+            name: {
+                "n": n,
+                "total_s": round(total, 2),
+                "avg_s": round(total / n, 3) if n else 0.0,
+                "max_s": round(mx, 2),
+                "timeouts": to,
+            }
+            for name, (n, total, mx, to) in items.items()
+        }
+
+
+WAITS = WaitStats()
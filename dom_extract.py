@@ -0,0 +1,51 @@
+# dom_extract.py
+import re
+
+from bs4 import BeautifulSoup
+
+RATING_RE = re.compile(r"(\d(?:\.\d)?)\s*out\s*of\s*5", re.IGNORECASE)
+
+
+def _text(el) -> str:
+    return re.sub(r"\s+", " ", el.get_text(" ", strip=True)).strip() if el else ""
+
+
+def extract_card_fields(outer_html: str) -> dict:
+    """
+    Read title/price/rating from a search-result card's outerHTML.
+    Also returns the card's visible text (used for the GPU filter and as raw_text).
+    """
+    soup = BeautifulSoup(outer_html or "", "html.parser")
+
+    title = ""
+    h2 = soup.select_one("[data-cy='title-recipe'] h2") or soup.select_one("h2")
+    if h2:
+        # aria-label holds the untruncated title on newer layouts
+        title = (h2.get("aria-label") or "").strip() or _text(h2)
+
+    price = ""
+    el = soup.select_one(".a-price:not(.a-text-price) .a-offscreen")
+    if el and _text(el):
+        price = _text(el).replace(" ", "")
+    else:
+        whole = soup.select_one(".a-price-whole")
+        if whole:
+            price = "₹" + _text(whole).rstrip(".")
+
+    rating = ""
+    for el in soup.select("span.a-icon-alt, [aria-label*='out of 5']"):
+        m = RATING_RE.search(_text(el) or el.get("aria-label", ""))
+        if m:
+            rating = m.group(1)
+            break
+
+    text = "\n".join(s for s in soup.stripped_strings)
+    return {"title": title, "price": price, "rating": rating, "text": text}
+
+
+def is_complete(fields: dict) -> bool:
+    """
+    Title and price are required; a missing rating is normal for new listings
+    (there is nothing for OCR to find either), so it doesn't force a fallback.
+    """
+    return bool(fields.get("title")) and bool(fields.get("price"))
@@ -0,0 +1,185 @@
+# engine.py
+import atexit
+import os
+import threading
+from pathlib import Path
+
+# ----------------------------
+# Config (read at import; nothing is opened until first use)
+# ----------------------------
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MONGO_DB = os.getenv("MONGO_DB", "amazon_ocr")
+MONGO_COL = os.getenv("MONGO_COL", "gpu_laptops")
+
+# TESSERACT_EXE is the name ocr_ext.py used to read; still honoured as a fallback
+TESS_EXE = os.getenv("TESS_EXE") or os.getenv(
+    "TESSERACT_EXE", r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tesseract.exe"
+)
+TESSDATA_DIR = os.getenv("TESSDATA_DIR", r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tessdata")
+# quoted: the default path (and many Windows installs) may contain spaces
+OCR_CONFIG = f'--oem 3 --psm 6 --tessdata-dir "{TESSDATA_DIR}"'
+
+# (keys, options); created once per process, only if missing
+INDEXES = [
+    ([("asin", 1)], {"unique": False}),
+    ([("image_file", 1)], {"unique": True}),
+    # freshness window / incremental exports
+    ([("updated_at", 1)], {}),
+]
+
+
+class Engine:
+    """
+    Lazily initialised Mongo + Tesseract context. The client connects, the
+    indexes are checked and the Tesseract paths are validated on first use,
+    so importing the OCR modules costs nothing and works without Mongo.
+    """
+
+    def __init__(
+        self,
+        mongo_uri: str = MONGO_URI,
+        mongo_db: str = MONGO_DB,
+        mongo_col: str = MONGO_COL,
+        tess_exe: str = TESS_EXE,
+        tessdata_dir: str = TESSDATA_DIR,
+    ):
+        self.mongo_uri = mongo_uri
+        self.mongo_db = mongo_db
+        self.mongo_col = mongo_col
+        self.tess_exe = tess_exe
+        self.tessdata_dir = tessdata_dir
+        self.ocr_config = f'--oem 3 --psm 6 --tessdata-dir "{tessdata_dir}"'
+
+        self._lock = threading.RLock()
+        self._client = None
+        self._col = None
+        self._cols = {}     # extra collections, set up once: name -> collection
+        self._writers = {}  # collection name -> BulkUpserter
+        self._tesseract_ok = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from pymongo import MongoClient
+
+                    self._client = MongoClient(self.mongo_uri)
+        return self._client
+
+    @property
+    def col(self):
+        """
+        Card collection; indexes are ensured on first access.
+        """
+        if self._col is None:
+            with self._lock:
+                if self._col is None:
+                    col = self.client[self.mongo_db][self.mongo_col]
+                    ensure_indexes(col)
+                    self._col = col
+        return self._col
+
+    def collection(self, name: str, setup=None):
+        """
+        Another collection in the same database; setup(db, name) (creation
+        options, indexes) runs once per process on first access.
+        """
+        if name not in self._cols:
+            with self._lock:
+                if name not in self._cols:
+                    db = self.client[self.mongo_db]
+                    if setup is not None:
+                        setup(db, name)
+                    self._cols[name] = db[name]
+        return self._cols[name]
+
+    def writer(self, col=None):
+        """
+        Shared batched writer for the card collection (or `col`); flushed on
+        interpreter exit.
+        """
+        name = self.mongo_col if col is None else col.name
+        if name not in self._writers:
+            with self._lock:
+                if name not in self._writers:
+                    from mongo_writer import BulkUpserter
+
+                    w = BulkUpserter(self.col if col is None else col)
+                    if not self._writers:
+                        atexit.register(self.close)
+                    self._writers[name] = w
+        return self._writers[name]
+
+    def flush(self) -> dict:
+        """
+        Push all queued writes to Mongo now; returns the card writer's counters
+        ({} when nothing was ever written), plus other writers' by collection.
+        """
+        # a second round writes what after= callbacks of the first queued
+        # (price history is recorded once its card upsert is stored)
+        for _ in range(2):
+            for w in list(self._writers.values()):
+                w.flush()
+        return self._stats()
+
+    def close(self) -> dict:
+        """
+        Flush every writer (see flush()) before closing any of them.
+        """
+        self.flush()
+        for w in list(self._writers.values()):
+            w.close()
+        return self._stats()
+
+    def _stats(self) -> dict:
+        main = self._writers.get(self.mongo_col)
+        out = main.stats() if main is not None else {}
+        for name, w in self._writers.items():
+            if name != self.mongo_col:
+                out[name] = w.stats()
+        return out
+
+    def tesseract(self) -> str:
+        """
+        Validate the Tesseract install once and point pytesseract at it;
+        returns the OCR config string.
+        """
+        if not self._tesseract_ok:
+            with self._lock:
+                if not self._tesseract_ok:
+                    if not Path(self.tess_exe).exists():
+                        raise FileNotFoundError(f"tesseract.exe not found: {self.tess_exe}")
+                    if not Path(self.tessdata_dir, "eng.traineddata").exists():
+                        raise FileNotFoundError(
+                            f"eng.traineddata not found: {Path(self.tessdata_dir, 'eng.traineddata')}"
+                        )
+                    import pytesseract
+
+                    pytesseract.pytesseract.tesseract_cmd = self.tess_exe
+                    os.environ["TESSDATA_PREFIX"] = self.tessdata_dir
+                    self._tesseract_ok = True
+        return self.ocr_config
+
+
+def ensure_indexes(col):
+    """
+    Create INDEXES that don't exist yet (one listIndexes round trip when they all do).
+    """
+    existing = {tuple(info["key"]) for info in col.index_information().values()}
+    for keys, opts in INDEXES:
+        if tuple(keys) not in existing:
+            col.create_index(keys, **opts)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = Engine()
+    return _engine
@@ -0,0 +1,260 @@
+# export_parquet.py
+import json
+import os
+import shutil
+import sys
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from engine import get_engine
+from price_history import to_paise
+
+# ----------------------------
+# Export config
+# ----------------------------
+BASE_DIR = Path(__file__).parent
+EXPORT_DIR = Path(os.getenv("PARQUET_EXPORT_DIR", str(BASE_DIR / "output" / "parquet" / "gpu_laptops")))
+CURSOR_BATCH = int(os.getenv("PARQUET_CURSOR_BATCH", "2000"))
+ROW_GROUP = int(os.getenv("PARQUET_ROW_GROUP", "50000"))
+# updated_at is stamped by the server ($currentDate) when the upsert runs; a
+# doc from a batch still being applied can carry an older stamp than docs
+# already visible, so the window stops this far behind the server clock and
+# the next run picks those docs up
+SAFETY_LAG_S = float(os.getenv("PARQUET_SAFETY_LAG_S", "30"))
+
+STATE_FILE = "_export_state.json"
+
+# raw_text is deliberately not exported (it is most of each document)
+PROJECTION = {
+    "_id": 0, "asin": 1, "query": 1, "page": 1, "index": 1, "image_file": 1, "title": 1,
+    "price": 1, "rating": 1, "gpu": 1, "extraction": 1, "source": 1, "created_at": 1, "updated_at": 1,
+}
+
+
+def schema():
+    import pyarrow as pa
+
+    ts = pa.timestamp("ms", tz="UTC")
+    return pa.schema([
+        ("asin", pa.string()),
+        ("page", pa.int32()),
+        ("index", pa.int32()),
+        ("image_file", pa.string()),
+        ("title", pa.string()),
+        ("price_paise", pa.int64()),  # "₹1,23,990.50" -> 12399050
+        ("rating", pa.float32()),   # out of 5
+        ("gpu", pa.string()),
+        ("extraction", pa.string()),
+        ("source", pa.string()),
+        ("created_at", ts),
+        ("updated_at", ts),
+    ])
+
+
+def _utc(ts):
+    if ts is None:
+        return None
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+def _rating(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_row(doc: dict) -> dict:
+    return {
+        "asin": doc.get("asin") or None,
+        "page": _int(doc.get("page")),
+        "index": _int(doc.get("index")),
+        "image_file": doc.get("image_file"),
+        "title": doc.get("title"),
+        "price_paise": to_paise(doc.get("price")),
+        "rating": _rating(doc.get("rating")),
+        "gpu": doc.get("gpu") or None,
+        "extraction": doc.get("extraction") or None,
+        "source": doc.get("source"),
+        "created_at": _utc(doc.get("created_at")),
+        "updated_at": _utc(doc.get("updated_at")),
+    }
+
+
+def partition_dir(root: Path, query: str, capture_date: str) -> Path:
+    # hive layout; pyarrow decodes the URI-escaped query
+    q = urllib.parse.quote(query or "unknown", safe="")
+    return root / f"query={q}" / f"capture_date={capture_date}"
+
+
+class PartitionedWriter:
+    """
+    One ParquetWriter per (query, capture_date) partition touched in this run,
+    fed in row groups. Files are written as hidden .part-*.parquet.tmp
+    (pyarrow.dataset skips names starting with "." or "_") and renamed on
+    close; temp files left by an interrupted run are deleted on start.
+    """
+
+    def __init__(self, root: Path, run_id: str, row_group: int = ROW_GROUP):
+        self.root = root
+        self.run_id = run_id
+        self.row_group = row_group
+        self.schema = schema()
+        self.rows = 0
+        self._buffers = {}  # (query, date) -> [row]
+        self._writers = {}  # (query, date) -> (ParquetWriter, final path)
+        if root.exists():
+            for stale in [*root.rglob(".part-*.parquet.tmp"), *root.rglob("part-*.parquet.inprogress")]:
+                stale.unlink()
+
+    @staticmethod
+    def _tmp(path: Path) -> Path:
+        return path.with_name(f".{path.name}.tmp")
+
+    def write(self, query: str, capture_date: str, row: dict):
+        key = (query, capture_date)
+        buf = self._buffers.setdefault(key, [])
+        buf.append(row)
+        if len(buf) >= self.row_group:
+            self._flush(key)
+
+    def _flush(self, key):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        buf = self._buffers.pop(key, None)
+        if not buf:
+            return
+        if key not in self._writers:
+            d = partition_dir(self.root, *key)
+            d.mkdir(parents=True, exist_ok=True)
+            path = d / f"part-{self.run_id}.parquet"
+            self._writers[key] = (pq.ParquetWriter(str(self._tmp(path)), self.schema, compression="zstd"), path)
+        table = pa.Table.from_pylist(buf, schema=self.schema)
+        self._writers[key][0].write_table(table)
+        self.rows += len(buf)
+
+    def close(self) -> int:
+        """
+        Flush all partitions and publish their files; returns files written.
+        """
+        for key in list(self._buffers):
+            self._flush(key)
+        for w, path in self._writers.values():
+            w.close()
+            os.replace(self._tmp(path), path)
+        return len(self._writers)
+
+
+def load_state(root: Path) -> dict:
+    p = root / STATE_FILE
+    return json.loads(p.read_text(encoding="utf-8")) if p.exists() else {}
+
+
+def save_state(root: Path, state: dict):
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / (STATE_FILE + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, root / STATE_FILE)
+
+
+def server_now(col) -> datetime:
+    """
+    The server's clock (hello.localTime). updated_at comes from that clock,
+    so the export window's upper bound must too (client clocks drift).
+    """
+    from pymongo.errors import OperationFailure
+
+    admin = col.database.client.admin
+    try:
+        reply = admin.command("hello")
+    except OperationFailure:  # servers before 4.4.2
+        reply = admin.command("isMaster")
+    return _utc(reply["localTime"])
+
+
+def _swap(tmp: Path, root: Path):
+    """
+    Publish a rebuilt dataset: the old one is moved aside first (a directory
+    can't be os.replace'd onto a non-empty one), then deleted.
+    """
+    old = root.with_name(root.name + ".old")
+    if old.exists():
+        shutil.rmtree(old)
+    if root.exists():
+        os.replace(root, old)
+    os.replace(tmp, root)
+    if old.exists():
+        shutil.rmtree(old)
+
+
+def export(root: Path = EXPORT_DIR, full: bool = False, col=None) -> dict:
+    """
+    Export docs with since < updated_at <= server time - SAFETY_LAG_S, where
+    `since` is the watermark of the previous run. full=True rebuilds the
+    dataset in a directory next to `root` and swaps it in only when complete,
+    so a failed rebuild leaves the previous export untouched. Read it back
+    with pyarrow.dataset.dataset(root, partitioning="hive"); a re-updated
+    ASIN appears once per export that saw it, so keep the latest updated_at.
+    """
+    col = col if col is not None else get_engine().col
+    if not full:
+        return _export(root, load_state(root), col)
+
+    tmp = root.with_name(root.name + ".inprogress")
+    if tmp.exists():
+        shutil.rmtree(tmp)  # left by an interrupted rebuild
+    out = _export(tmp, {}, col)
+    _swap(tmp, root)
+    return out
+
+
+def _export(root: Path, state: dict, col) -> dict:
+    since = datetime.fromisoformat(state["watermark"]) if state.get("watermark") else None
+    upper = server_now(col) - timedelta(seconds=SAFETY_LAG_S)
+
+    window = {"$lte": upper}
+    if since is not None:
+        window["$gt"] = since
+    cursor = (
+        col.find({"updated_at": window}, PROJECTION)
+        .sort("updated_at", 1)
+        .batch_size(CURSOR_BATCH)
+    )
+
+    t0 = time.perf_counter()
+    run_id = upper.strftime("%Y%m%dT%H%M%S%f")
+    writer = PartitionedWriter(root, run_id)
+    for doc in cursor:
+        row = to_row(doc)
+        day = row["updated_at"].strftime("%Y-%m-%d")
+        writer.write(doc.get("query") or "", day, row)
+    files = writer.close()
+
+    # the watermark only moves once every file is published
+    save_state(root, {
+        "watermark": upper.isoformat(),
+        "last_run": run_id,
+        "rows_total": state.get("rows_total", 0) + writer.rows,
+    })
+    return {
+        "since": since.isoformat() if since else None,
+        "until": upper.isoformat(),
+        "rows": writer.rows,
+        "files": files,
+        "seconds": round(time.perf_counter() - t0, 2),
+    }
+
+
+if __name__ == "__main__":
+    # python export_parquet.py [--full]
+    print(export(full="--full" in sys.argv[1:]))
@@ -0,0 +1,331 @@
+# exporters.py
+import csv
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from price_history import to_paise
+
+# ----------------------------
+# Export config
+# ----------------------------
+EXPORT_FORMATS = tuple(f for f in os.getenv("EXPORT_FORMATS", "csv,xlsx").split(",") if f)
+PARQUET_ROW_GROUP = int(os.getenv("EXPORT_PARQUET_ROW_GROUP", "5000"))
+FLUSH_EVERY = int(os.getenv("EXPORT_FLUSH_EVERY", "50"))
+
+# Parquet types by column name; any other column is a string. "price" is
+# written as int64 paise under the name "price_paise".
+PARQUET_TYPES = {
+    "price": "int64",
+    "rating": "float32",
+    "page": "int32",
+    "index": "int32",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+}
+
+
+def price_value(price) -> int | None:
+    """
+    "₹1,23,990" -> 123990, "₹1,23,990.50" -> 123990 (whole rupees); None
+    when there is no number.
+    """
+    paise = to_paise(price)
+    return paise // 100 if paise is not None else None
+
+
+class CsvExporter:
+    """
+    Appends rows to a CSV as they arrive. With resume=True an existing file
+    is kept and rows whose `key` is already in it are skipped, so a re-run
+    after a crash picks up where it stopped.
+    """
+
+    def __init__(self, path: Path, columns: list, key: str | None = None, resume: bool = True):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.key = key
+        self.written = 0
+        self.skipped = 0
+        self._keys = set()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        exists = resume and self.path.exists() and self.path.stat().st_size > 0
+        if exists and key:
+            with open(self.path, newline="", encoding="utf-8-sig") as f:
+                self._keys = {row.get(key, "") for row in csv.DictReader(f)}
+        self._fh = open(self.path, "a" if exists else "w", newline="", encoding="utf-8" if exists else "utf-8-sig")
+        self._w = csv.DictWriter(self._fh, fieldnames=self.columns, extrasaction="ignore")
+        if not exists:
+            self._w.writeheader()
+
+    def write(self, row: dict) -> bool:
+        if self.key:
+            k = str(row.get(self.key, ""))
+            if k in self._keys:
+                self.skipped += 1
+                return False
+            self._keys.add(k)
+        self._w.writerow(row)
+        self.written += 1
+        return True
+
+    def flush(self):
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self):
+        if not self._fh.closed:
+            self.flush()
+            self._fh.close()
+
+
+def _parquet_value(column: str, value):
+    """
+    CSV-style export value -> the Parquet column's type (None if unreadable).
+    """
+    if value is None or value == "":
+        return None
+    kind = PARQUET_TYPES.get(column)
+    try:
+        if column == "price":
+            return to_paise(value)
+        if kind == "float32":
+            return float(value)
+        if kind == "int32":
+            return int(value)
+        if kind == "timestamp":
+            ts = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+            return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+class ParquetExporter:
+    """
+    Buffers rows and writes them as Parquet row groups of `row_group` rows,
+    typed per PARQUET_TYPES. Each session writes its own part file under
+    `path/`, as a hidden .part-*.parquet.tmp (pyarrow.dataset skips names
+    starting with "." or "_") renamed to part-*.parquet when flushed/closed,
+    so readers (and resumed runs) only ever see complete files. Temp files
+    left by a crashed run are deleted on start; resume=False also drops
+    earlier parts, like the CSV is rewritten. Needs pyarrow.
+    """
+
+    def __init__(self, path: Path, columns: list, row_group: int = PARQUET_ROW_GROUP, resume: bool = True):
+        import pyarrow as pa
+
+        types = {
+            "int64": pa.int64(), "float32": pa.float32(), "int32": pa.int32(),
+            "timestamp": pa.timestamp("ms", tz="UTC"),
+        }
+        self.dir = Path(path)
+        self.columns = list(columns)
+        self.row_group = row_group
+        self.schema = pa.schema([
+            ("price_paise" if c == "price" else c, types.get(PARQUET_TYPES.get(c), pa.string()))
+            for c in self.columns
+        ])
+        self.written = 0
+        self._rows = []
+        self._writer = None
+        self._part = None
+        self.dir.mkdir(parents=True, exist_ok=True)
+        stale = [*self.dir.glob(".part-*.parquet.tmp"), *self.dir.glob("part-*.parquet.inprogress")]
+        for old in stale + ([] if resume else list(self.dir.glob("part-*.parquet"))):
+            old.unlink()
+
+    @property
+    def _tmp(self) -> Path:
+        return self._part.with_name(f".{self._part.name}.tmp")
+
+    def _open(self):
+        import pyarrow.parquet as pq
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        n = len(list(self.dir.glob(f"part-{stamp}-*.parquet")))
+        self._part = self.dir / f"part-{stamp}-{n:03d}.parquet"
+        self._writer = pq.ParquetWriter(str(self._tmp), self.schema)
+
+    def _write_group(self):
+        import pyarrow as pa
+
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._open()
+        cols = {
+            name: [_parquet_value(c, r.get(c)) for r in self._rows]
+            for name, c in zip(self.schema.names, self.columns)
+        }
+        self._writer.write_table(pa.table(cols, schema=self.schema))
+        self.written += len(self._rows)
+        self._rows = []
+
+    def write(self, row: dict):
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group:
+            self._write_group()
+
+    def flush(self):
+        """
+        Write buffered rows and finish the current part file.
+        """
+        self._write_group()
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._tmp, self._part)
+            self._writer = None
+
+    def close(self):
+        self.flush()
+
+
+class SummaryStats:
+    """
+    Running aggregates for the Excel Summary sheet (constant memory).
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.priced = 0
+        self.price_sum = 0
+        self.price_min = None
+        self.price_max = None
+        self.rated = 0
+        self.rating_sum = 0.0
+        self.by_gpu = {}
+
+    def add(self, row: dict):
+        self.rows += 1
+        p = price_value(row.get("price"))
+        if p:
+            self.priced += 1
+            self.price_sum += p
+            self.price_min = p if self.price_min is None else min(self.price_min, p)
+            self.price_max = p if self.price_max is None else max(self.price_max, p)
+        try:
+            r = float(row.get("rating") or "")
+            self.rated += 1
+            self.rating_sum += r
+        except ValueError:
+            pass
+        gpu = row.get("gpu") or "unknown"
+        self.by_gpu[gpu] = self.by_gpu.get(gpu, 0) + 1
+
+    def sheet_rows(self) -> list:
+        out = [
+            ["Metric", "Value"],
+            ["GPU laptops", self.rows],
+            ["With price", self.priced],
+            ["Min price (₹)", self.price_min],
+            ["Avg price (₹)", round(self.price_sum / self.priced) if self.priced else None],
+            ["Max price (₹)", self.price_max],
+            ["Avg rating", round(self.rating_sum / self.rated, 2) if self.rated else None],
+            [],
+            ["GPU", "Count"],
+        ]
+        out += [[g, n] for g, n in sorted(self.by_gpu.items(), key=lambda kv: -kv[1])]
+        return out
+
+
+def csv_to_xlsx(csv_path: Path, xlsx_path: Path, sheet_name: str = "GPU_Laptops") -> int:
+    """
+    Stream a CSV into a write-only openpyxl workbook (data sheet + Summary),
+    one row at a time. Returns rows written.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    summary_ws = wb.create_sheet("Summary")
+    data_ws = wb.create_sheet(sheet_name)
+    stats = SummaryStats()
+
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        data_ws.append(reader.fieldnames or [])
+        for row in reader:
+            data_ws.append([row.get(c, "") for c in reader.fieldnames])
+            stats.add(row)
+
+    for r in stats.sheet_rows():
+        summary_ws.append(r)
+
+    tmp = Path(str(xlsx_path) + ".tmp")
+    wb.save(tmp)
+    os.replace(tmp, xlsx_path)
+    return stats.rows
+
+
+class StreamingExport:
+    """
+    One export stage for the batch scripts and the pipeline:
+    rows are appended to <base>.csv as they arrive (flushed every
+    flush_every rows), optionally mirrored to Parquet row groups under
+    <base>_parquet/, and the Excel workbook (<base>.xlsx, with a Summary
+    sheet) is streamed from the CSV on close(). resume=True keeps rows from an
+    interrupted run and skips keys already exported; resume=False starts the
+    export over (the caller re-emits what it already has, e.g. from the
+    manifest).
+    """
+
+    def __init__(
+        self,
+        base: Path,
+        columns: list,
+        key: str | None = None,
+        formats=EXPORT_FORMATS,
+        resume: bool = True,
+        sheet_name: str = "GPU_Laptops",
+        flush_every: int = FLUSH_EVERY,
+    ):
+        self.base = Path(base)
+        self.formats = set(formats)
+        self.sheet_name = sheet_name
+        self.flush_every = max(1, flush_every)
+        self.csv_path = self.base.with_suffix(".csv")
+        self.xlsx_path = self.base.with_suffix(".xlsx")
+        self.csv = CsvExporter(self.csv_path, columns, key=key, resume=resume)
+        self.parquet = (
+            ParquetExporter(self.base.parent / f"{self.base.name}_parquet", columns, resume=resume)
+            if "parquet" in self.formats else None
+        )
+
+    @property
+    def written(self) -> int:
+        return self.csv.written
+
+    def write(self, row: dict):
+        if not self.csv.write(row):
+            return
+        if self.parquet is not None:
+            self.parquet.write(row)
+        if self.csv.written % self.flush_every == 0:
+            self.csv.flush()
+
+    def flush(self):
+        self.csv.flush()
+        if self.parquet is not None:
+            self.parquet.flush()
+
+    def close(self) -> list:
+        """
+        Finish every format; returns the paths written.
+        """
+        self.csv.close()
+        paths = [self.csv_path]
+        if self.parquet is not None:
+            self.parquet.close()
+            paths.append(self.parquet.dir)
+        if "xlsx" in self.formats:
+            csv_to_xlsx(self.csv_path, self.xlsx_path, self.sheet_name)
+            paths.append(self.xlsx_path)
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,19 +1,10 @@
 # filter_gpu.py
 import re
 
-# NVIDIA / AMD discrete-only keywords/patterns
-GPU_INCLUDE = [
-    r"\brtx\b", r"\bgtx\b", r"\bgeforce\b", r"\bnvidia\b",
-    r"\bradeon\b", r"\brx\b", r"\bamd\s+radeon\b",
-]
+from gpu_classifier import classify
 
-# Exclude integrated + Intel Arc 
-GPU_EXCLUDE = [
-    r"\bintel\b.*\buhd\b", r"\buhd\s+graphics\b",
-    r"\biris\b", r"\biris\s+xe\b",
-    r"\bintegrated\b", r"\buma\b", r"\bshared\b",
-    r"\barc\b", r"\bintel\s+arc\b",
-]
+# NVIDIA / AMD discrete-only rules now live in gpu_classifier.py (shared with
+# ocr_mongo, ocr_from_images and the collector); kept here for existing imports.
 
 def normalize_text(s: str) -> str:
     if not s:
@@ -21,8 +12,4 @@ def normalize_text(s: str) -> str:
     return re.sub(r"\s+", " ", s.lower()).strip()
 
 def has_nvidia_amd_discrete_gpu(text: str) -> bool:
-    t = normalize_text(text)
-    include_hit = any(re.search(p, t) for p in GPU_INCLUDE)
-    exclude_hit = any(re.search(p, t) for p in GPU_EXCLUDE)
-
-    return include_hit and not exclude_hit
+    return classify(text).ok
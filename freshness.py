@@ -0,0 +1,148 @@
+# freshness.py
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from engine import get_engine
+
+# ----------------------------
+# Freshness config
+# ----------------------------
+# cards whose ASIN was upserted within this many seconds are not re-captured;
+# opt-in, 0 (default) disables the check
+FRESH_SECONDS = int(os.getenv("FRESH_SECONDS", "0"))
+
+
+class FreshnessIndex:
+    """
+    ASINs refreshed within the window, so the collector can skip a card before
+    screenshot/OCR. Loaded in bulk from Mongo at crawl start (in the
+    background, see start()), topped up per page with one $in query on the
+    asin index, and fed in-process with every ASIN this crawl has already
+    handled (sponsored repeats across pages). Until the load is done nothing
+    is skipped as fresh; if Mongo fails, the fresh check turns itself off.
+    """
+
+    def __init__(self, window_s: int = FRESH_SECONDS, col=None):
+        self.window_s = window_s
+        self._col = col
+        self._seen = {}  # asin -> unix time last refreshed
+        self._lock = threading.Lock()
+        self.loaded = 0
+        self.lookups = 0
+        self.skipped_fresh = 0   # refreshed in Mongo within the window
+        self.skipped_repeat = 0  # already handled earlier in this crawl
+        self._crawl = set()
+        self._missed = set()  # looked up, not refreshed within the window
+        self.ready = threading.Event()
+        self.disabled = False
+
+    @property
+    def col(self):
+        return self._col if self._col is not None else get_engine().col
+
+    def _cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.window_s)
+
+    def _remember(self, rows) -> int:
+        n = 0
+        with self._lock:
+            for row in rows:
+                asin = (row.get("asin") or "").upper()
+                ts = row.get("updated_at")
+                if not asin or ts is None:
+                    continue
+                if ts.tzinfo is None:
+                    ts = ts.replace(tzinfo=timezone.utc)
+                self._seen[asin] = max(self._seen.get(asin, 0.0), ts.timestamp())
+                n += 1
+        return n
+
+    def load(self) -> int:
+        """
+        Bulk-load every ASIN updated within the window (crawl start).
+        """
+        try:
+            rows = self.col.find(
+                {"updated_at": {"$gte": self._cutoff()}, "asin": {"$ne": ""}},
+                {"_id": 0, "asin": 1, "updated_at": 1},
+            )
+            self.loaded = self._remember(rows)
+        except Exception as e:
+            self.disabled = True
+            print("[WARN] freshness index not loaded, fresh check off:", e)
+        finally:
+            self.ready.set()
+        return self.loaded
+
+    def start(self):
+        """
+        load() on a background thread, so a slow or unreachable Mongo doesn't
+        hold up the first page.
+        """
+
+        def run():
+            n = self.load()
+            if not self.disabled:
+                print(f"Freshness: {n} ASINs refreshed in the last {self.window_s}s")
+
+        threading.Thread(target=run, name="freshness-load", daemon=True).start()
+
+    def lookup(self, asins):
+        """
+        One TTL query for ASINs not known yet (written by another process
+        since load()); cheap thanks to the asin index. Misses are remembered,
+        so each ASIN is asked about once per crawl. Skipped until load() is
+        done.
+        """
+        if self.disabled or not self.ready.is_set():
+            return
+        with self._lock:
+            unknown = sorted({a.upper() for a in asins if a} - set(self._seen) - self._missed)
+        if not unknown:
+            return
+        self.lookups += 1
+        try:
+            rows = list(self.col.find(
+                {"asin": {"$in": unknown}, "updated_at": {"$gte": self._cutoff()}},
+                {"_id": 0, "asin": 1, "updated_at": 1},
+            ))
+        except Exception as e:
+            self.disabled = True
+            print("[WARN] freshness lookup failed, fresh check off:", e)
+            return
+        self._remember(rows)
+        with self._lock:
+            self._missed.update(set(unknown) - set(self._seen))
+
+    def should_skip(self, asin: str) -> str:
+        """
+        "repeat" when the ASIN was handled earlier in this crawl, "fresh" when
+        it was refreshed within the window (both counted), else "".
+        """
+        asin = asin.upper()
+        with self._lock:
+            if asin in self._crawl:
+                self.skipped_repeat += 1
+                return "repeat"
+            ts = None if self.disabled else self._seen.get(asin)
+            if ts is not None and time.time() - ts < self.window_s:
+                self.skipped_fresh += 1
+                return "fresh"
+        return ""
+
+    def mark(self, asin: str):
+        with self._lock:
+            self._crawl.add(asin.upper())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_s": self.window_s,
+                "loaded": self.loaded,
+                "disabled": self.disabled,
+                "lookups": self.lookups,
+                "skipped_fresh": self.skipped_fresh,
+                "skipped_repeat": self.skipped_repeat,
+            }
@@ -0,0 +1,126 @@
+# gpu_classifier.py
+import re
+from dataclasses import dataclass
+
+# ----------------------------
+# Rules (one place for every entry point)
+# ----------------------------
+# Patterns are matched against lower-cased text and all start at a word
+# boundary (added once in _compile). Model patterns come first so "RTX 4050"
+# is captured as a model, not just "rtx".
+NVIDIA_MODEL = r"(?:rtx|gtx)\s*-?\s*\d{3,4}(?:\s*ti\b)?"
+AMD_MODEL = r"rx\s*-?\s*\d{3,4}[a-z]{0,2}\b"
+
+# discrete NVIDIA / AMD keywords
+GPU_INCLUDE = {
+    "rtx": r"rtx\b",
+    "gtx": r"gtx\b",
+    "geforce": r"geforce\b",
+    "nvidia": r"nvidia\b",
+    "radeon": r"radeon\b",
+    "rx": r"rx\b",
+}
+
+# integrated graphics + Intel Arc. A bare "intel" is NOT excluded: an
+# "Intel i7 + RTX 4060" laptop has a discrete GPU.
+GPU_EXCLUDE = {
+    "uhd": r"uhd\b",
+    "iris": r"iris\b",
+    "integrated": r"integrated\b",
+    "uma": r"uma\b",
+    "shared": r"shared\b",
+    "arc": r"arc\b",
+}
+# also appear next to discrete GPUs ("RTX 4050 6GB ... shared memory", Arc +
+# RTX hybrids): they only reject a card that has no discrete-GPU keyword
+WEAK_EXCLUDE = {"shared", "arc"}
+
+VENDOR = {
+    "nv_model": "nvidia", "rtx": "nvidia", "gtx": "nvidia", "geforce": "nvidia", "nvidia": "nvidia",
+    "amd_model": "amd", "radeon": "amd", "rx": "amd",
+}
+
+# reason codes
+DISCRETE = "discrete_gpu"
+INTEGRATED = "integrated_gpu"
+NO_GPU = "no_gpu_keyword"
+
+
+def _compile():
+    parts = [f"(?P<nv_model>{NVIDIA_MODEL})", f"(?P<amd_model>{AMD_MODEL})"]
+    parts += [f"(?P<inc_{k}>{p})" for k, p in GPU_INCLUDE.items()]
+    parts += [f"(?P<exc_{k}>{p})" for k, p in GPU_EXCLUDE.items()]
+    # the lookahead on possible first letters lets most word starts fail
+    # before any alternative is tried
+    first = "".join(sorted({k[0] for k in (*GPU_INCLUDE, *GPU_EXCLUDE)} | {"r", "g"}))
+    return re.compile(rf"\b(?=[{first}])(?:{'|'.join(parts)})")
+
+
+GPU_RE = _compile()
+
+
+@dataclass(frozen=True)
+class GpuMatch:
+    ok: bool
+    vendor: str = ""   # "nvidia" | "amd" | ""
+    model: str = ""    # e.g. "RTX 4050", "RX 6500M"
+    reason: str = NO_GPU
+    token: str = ""    # keyword that decided the reason
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def label(self) -> str:
+        return self.model or self.vendor
+
+
+def _model_name(raw: str) -> str:
+    m = re.match(r"(rtx|gtx|rx)\s*-?\s*(\d{3,4})\s*(\w*)", raw, re.IGNORECASE)
+    if not m:
+        return raw.upper()
+    suffix = m.group(3)
+    suffix = " Ti" if suffix.lower() == "ti" else suffix.upper()
+    return f"{m.group(1).upper()} {m.group(2)}{suffix}"
+
+
+def classify(text: str) -> GpuMatch:
+    """
+    Single pass over the text: keeps the first discrete-GPU hit (model if
+    available) and the first integrated/Arc hit, then decides. WEAK_EXCLUDE
+    keywords only count when there is no discrete hit.
+    """
+    include = model = exclude = weak = None
+    for m in GPU_RE.finditer((text or "").lower()):
+        group = m.lastgroup
+        if group in ("nv_model", "amd_model"):
+            if model is None:
+                model = m
+            if include is None:
+                include = m
+        elif group.startswith("inc_"):
+            if include is None:
+                include = m
+        elif group.removeprefix("exc_") in WEAK_EXCLUDE:
+            if weak is None:
+                weak = m
+        elif exclude is None:
+            exclude = m
+
+    if include is None:
+        hit = exclude or weak
+        if hit is not None:
+            return GpuMatch(False, reason=INTEGRATED, token=hit.group(0))
+        return GpuMatch(False)
+
+    group = model.lastgroup if model is not None else include.lastgroup
+    vendor = VENDOR[group.removeprefix("inc_")]
+    model_name = _model_name(model.group(0)) if model is not None else ""
+
+    if exclude is not None:
+        return GpuMatch(False, vendor, model_name, INTEGRATED, exclude.group(0))
+    return GpuMatch(True, vendor, model_name, DISCRETE, (model or include).group(0))
+
+
+def has_discrete_gpu(text: str) -> bool:
+    return classify(text).ok
@@ -0,0 +1,182 @@
+# lean_chrome.py
+import fnmatch
+import json
+import os
+import threading
+
+from metrics import METRICS
+
+# ----------------------------
+# Lean Chrome config
+# ----------------------------
+# LEAN_CHROME=0 loads the full page (and still reports traffic, as a baseline)
+LEAN_CHROME = os.getenv("LEAN_CHROME", "1") != "0"
+# LEAN_REPORT=1: per-page request/byte accounting from Chrome's performance
+# log (opt-in: logging every network event costs CPU and memory per page)
+LEAN_REPORT = os.getenv("LEAN_REPORT", "0") == "1"
+
+# Network.setBlockedURLs wildcard patterns ("*" matches anything).
+# Result-card text, layout, first-party JS and CSS are never in these lists.
+BLOCK_GROUPS = {
+    "images": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.ico*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*/vse-vms-*"],
+    "fonts": ["*.woff*", "*.ttf*", "*.otf*"],
+    "ads": [
+        "*amazon-adsystem.com*", "*aax-eu*.amazon*", "*aax-us*.amazon*", "*doubleclick.net*",
+        "*googlesyndication.com*", "*/gp/sponsored-products/*", "*adservice*",
+    ],
+    "trackers": [
+        "*fls-eu.amazon*", "*fls-na.amazon*", "*unagi*.amazon*", "*/uedata*", "*/rd/uedata*",
+        "*/1/batch/1/OE/*", "*/1/events/*", "*google-analytics.com*", "*googletagmanager.com*",
+        "*facebook.net*", "*scorecardresearch.com*",
+    ],
+}
+LEAN_BLOCK = [g for g in os.getenv("LEAN_BLOCK", ",".join(BLOCK_GROUPS)).split(",") if g]
+# extra deny patterns, and allow patterns that switch matching deny patterns off
+LEAN_DENY = [p for p in os.getenv("LEAN_DENY", "").split(",") if p]
+LEAN_ALLOW = [p for p in os.getenv("LEAN_ALLOW", "").split(",") if p]
+
+LEAN_FLAGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--autoplay-policy=user-gesture-required",
+    "--disable-features=Translate,OptimizationHints,MediaRouter,InterestFeedContentSuggestions",
+]
+
+
+def blocked_patterns(groups=LEAN_BLOCK, deny=LEAN_DENY, allow=LEAN_ALLOW) -> list:
+    """
+    Effective deny list: the chosen groups plus `deny`, minus any pattern an
+    `allow` entry matches (e.g. LEAN_ALLOW=*.png* keeps PNG sprites).
+    """
+    unknown = set(groups) - set(BLOCK_GROUPS)
+    if unknown:
+        raise ValueError(f"unknown LEAN_BLOCK group(s): {sorted(unknown)}")
+    pats = [p for g in groups for p in BLOCK_GROUPS[g]] + list(deny)
+    return [p for p in dict.fromkeys(pats) if not any(fnmatch.fnmatchcase(p, a) for a in allow)]
+
+
+def apply_options(options, lean: bool = LEAN_CHROME, report: bool = LEAN_REPORT):
+    """
+    Chrome flags/prefs for lean mode, and performance logging for the report.
+    """
+    if report:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    if not lean:
+        return options
+    for flag in LEAN_FLAGS:
+        options.add_argument(flag)
+    if "images" in LEAN_BLOCK and not any(fnmatch.fnmatchcase("*.jpg*", a) for a in LEAN_ALLOW):
+        # skip decoding too, not only the download
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+
+def install(driver, lean: bool = LEAN_CHROME, report: bool = LEAN_REPORT):
+    """
+    After the driver starts: CDP request blocking (covers every later
+    navigation in this session) and the Performance domain for heap stats.
+    If a CDP call fails the browser is quit before the error is re-raised,
+    so no Chrome process is left behind.
+    """
+    try:
+        if lean:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_patterns()})
+        if report:
+            driver.execute_cdp_cmd("Performance.enable", {})
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+
+class NetStats:
+    """
+    Requests/bytes per page from Chrome's performance log: loaded requests
+    and encoded bytes, requests blocked by setBlockedURLs (by resource
+    type) and the page's JS heap. Run once with LEAN_CHROME=0 for the
+    baseline; the difference is what lean mode saves. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.requests = 0
+        self.bytes = 0
+        self.blocked = 0
+        self.blocked_by_type = {}
+        self.max_heap_mb = 0.0
+
+    def page(self, driver, **tags) -> dict | None:
+        """
+        Drain the performance log accumulated since the previous call and
+        account it to this page; None when logging is off or unsupported.
+        """
+        if not LEAN_REPORT:
+            return None
+        try:
+            entries = driver.get_log("performance")
+        except Exception:
+            return None
+
+        types, sizes, blocked = {}, {}, {}
+        for e in entries:
+            msg = json.loads(e["message"])["message"]
+            method, p = msg.get("method"), msg.get("params", {})
+            if method == "Network.requestWillBeSent":
+                types[p["requestId"]] = p.get("type", "Other")
+            elif method == "Network.loadingFinished":
+                sizes[p["requestId"]] = p.get("encodedDataLength", 0)
+            elif method == "Network.loadingFailed" and p.get("blockedReason") == "inspector":
+                t = p.get("type") or types.get(p["requestId"], "Other")
+                blocked[t] = blocked.get(t, 0) + 1
+
+        heap_mb = 0.0
+        try:
+            metrics = driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+            heap_mb = next((m["value"] for m in metrics if m["name"] == "JSHeapUsedSize"), 0) / 1e6
+        except Exception:
+            pass
+
+        rec = {
+            "requests": len(sizes),
+            "kb": round(sum(sizes.values()) / 1024, 1),
+            "blocked": sum(blocked.values()),
+            "blocked_by_type": blocked,
+            "heap_mb": round(heap_mb, 1),
+        }
+        with self._lock:
+            self.pages += 1
+            self.requests += rec["requests"]
+            self.bytes += sum(sizes.values())
+            self.blocked += rec["blocked"]
+            for t, n in blocked.items():
+                self.blocked_by_type[t] = self.blocked_by_type.get(t, 0) + n
+            self.max_heap_mb = max(self.max_heap_mb, rec["heap_mb"])
+        METRICS.count("net.requests", rec["requests"], **tags)
+        METRICS.count("net.bytes", sum(sizes.values()), **tags)
+        METRICS.count("net.blocked", rec["blocked"], **tags)
+        return rec
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            n = self.pages or 1
+            return {
+                "lean": LEAN_CHROME,
+                "pages": self.pages,
+                "requests_per_page": round(self.requests / n, 1),
+                "kb_per_page": round(self.bytes / 1024 / n, 1),
+                "blocked_per_page": round(self.blocked / n, 1),
+                "blocked_by_type": dict(self.blocked_by_type),
+                "max_heap_mb": self.max_heap_mb,
+            }
+
+
+NET = NetStats()
@@ -0,0 +1,213 @@
+# manifest.py
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# ----------------------------
+# Manifest config
+# ----------------------------
+MANIFEST_PATH = Path(os.getenv("MANIFEST_PATH", str(Path(__file__).parent / "output" / "manifest.sqlite3")))
+
+# outcomes recorded per image
+STORED = "stored"
+SKIPPED = "skipped"
+ERROR = "error"
+
+
+def file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class Manifest:
+    """
+    What has already been processed, in SQLite:
+    - images: path, size, mtime, sha256, fingerprint, outcome (+ fields when stored)
+    - checkpoints: last completed crawl page per query
+    Batch runs only OCR new or changed files; crawls resume after the last page.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as c:
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL,"
+                " sha256 TEXT NOT NULL, fingerprint TEXT NOT NULL, outcome TEXT NOT NULL,"
+                " detail TEXT NOT NULL DEFAULT '', result TEXT, processed_at REAL NOT NULL)"
+            )
+            c.execute("CREATE INDEX IF NOT EXISTS ix_images_outcome ON images(outcome)")
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " query TEXT PRIMARY KEY, last_page INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---- images ----
+
+    def pending(self, paths, fp: str) -> list:
+        """
+        Paths that are new, changed, errored last time or were processed with
+        other settings (fingerprint). Unchanged size+mtime skips without
+        hashing; a touched file whose bytes are the same is skipped too.
+        """
+        known = {
+            row[0]: row[1:]
+            for row in self._conn().execute("SELECT path, size, mtime, sha256, fingerprint, outcome FROM images")
+        }
+        todo, touched = [], []
+        for p in paths:
+            p = Path(p)
+            state = self._check(p, known.get(str(p)), fp)
+            if state is True:
+                todo.append(p)
+            elif state is not None:
+                touched.append((state, str(p)))
+
+        if touched:
+            with self._conn() as c:
+                c.executemany("UPDATE images SET mtime = ? WHERE path = ?", touched)
+        return todo
+
+    def needs(self, path, fp: str) -> bool:
+        """
+        pending() for a single path (primary-key lookup, no table scan).
+        """
+        p = Path(path)
+        row = self._conn().execute(
+            "SELECT size, mtime, sha256, fingerprint, outcome FROM images WHERE path = ?", (str(p),)
+        ).fetchone()
+        state = self._check(p, row, fp)
+        if state is True:
+            return True
+        if state is not None:
+            with self._conn() as c:
+                c.execute("UPDATE images SET mtime = ? WHERE path = ?", (state, str(p)))
+        return False
+
+    @staticmethod
+    def _check(p: Path, row, fp: str):
+        """
+        True when p needs processing; its new mtime when only touched (same
+        bytes); None when unchanged.
+        """
+        if row is None:
+            return True
+        size, mtime, sha, row_fp, outcome = row
+        if outcome == ERROR or row_fp != fp:
+            return True
+        st = p.stat()
+        if st.st_size == size and st.st_mtime == mtime:
+            return None
+        if st.st_size == size and file_hash(p) == sha:
+            return st.st_mtime
+        return True
+
+    def record(
+        self, path, fp: str, outcome: str, detail: str = "", result: dict | None = None, sha256: str | None = None
+    ):
+        """
+        Upsert the row for path. sha256 is the hash of the bytes that were
+        OCR'd when the caller already has it; otherwise the file is hashed.
+        """
+        p = Path(path)
+        st = p.stat()
+        with self._conn() as c:
+            c.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(p), st.st_size, st.st_mtime, sha256 or file_hash(p), fp, outcome, detail,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None, time.time(),
+                ),
+            )
+
+    def iter_stored(self):
+        """
+        Yield (path, result dict) for every image whose last outcome was
+        "stored", by path; streamed from the cursor.
+        """
+        rows = self._conn().execute(
+            "SELECT path, result FROM images WHERE outcome = ? AND result IS NOT NULL ORDER BY path", (STORED,)
+        )
+        for path, result in rows:
+            yield path, json.loads(result)
+
+    def forget(self, fp: str | None = None) -> int:
+        """
+        forget(fp) -> drop rows made with that fingerprint; forget() -> all rows.
+        """
+        with self._conn() as c:
+            if fp is not None:
+                cur = c.execute("DELETE FROM images WHERE fingerprint = ?", (fp,))
+            else:
+                cur = c.execute("DELETE FROM images")
+        return cur.rowcount
+
+    # ---- crawl checkpoints ----
+
+    def checkpoint(self, query: str) -> int:
+        """
+        Last completed page for this query; 0 when the crawl should start fresh.
+        """
+        row = self._conn().execute("SELECT last_page FROM checkpoints WHERE query = ?", (query,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def save_checkpoint(self, query: str, page: int):
+        with self._conn() as c:
+            c.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?)", (query, page, time.time()))
+
+    def clear_checkpoint(self, query: str):
+        with self._conn() as c:
+            c.execute("DELETE FROM checkpoints WHERE query = ?", (query,))
+
+    def stats(self) -> dict:
+        outcomes = dict(self._conn().execute("SELECT outcome, COUNT(*) FROM images GROUP BY outcome").fetchall())
+        checkpoints = dict(self._conn().execute("SELECT query, last_page FROM checkpoints").fetchall())
+        return {"images": sum(outcomes.values()), **outcomes, "checkpoints": checkpoints}
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest() -> Manifest:
+    """
+    Process-wide manifest, opened on first use.
+    """
+    global _manifest
+    if _manifest is None:
+        with _manifest_lock:
+            if _manifest is None:
+                _manifest = Manifest()
+    return _manifest
+
+
+if __name__ == "__main__":
+    # python manifest.py [stats|reset|forget <fingerprint>|uncheckpoint <query>]
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    m = Manifest()
+    if cmd == "reset":
+        print("Removed:", m.forget())
+    elif cmd == "forget" and len(sys.argv) > 2:
+        print("Removed:", m.forget(sys.argv[2]))
+    elif cmd == "uncheckpoint" and len(sys.argv) > 2:
+        m.clear_checkpoint(" ".join(sys.argv[2:]))
+    print(m.stats())
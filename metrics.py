@@ -0,0 +1,248 @@
+# metrics.py
+import atexit
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# ----------------------------
+# Metrics config
+# ----------------------------
+# METRICS=0 keeps in-memory summaries but writes no files
+METRICS_ENABLED = os.getenv("METRICS", "1") != "0"
+METRICS_DIR = Path(os.getenv("METRICS_DIR", str(Path(__file__).parent / "output" / "metrics")))
+# METRICS_JSONL=1 also logs every observation to a JSON-lines file (opt-in).
+# Records are buffered and written every METRICS_FLUSH_EVERY records or
+# METRICS_FLUSH_S seconds (and at exit); past METRICS_MAX_MB the file is
+# rotated to *.jsonl.1, so at most twice that is kept.
+METRICS_JSONL = os.getenv("METRICS_JSONL", "0") == "1"
+METRICS_FLUSH_EVERY = int(os.getenv("METRICS_FLUSH_EVERY", "1000"))
+METRICS_FLUSH_S = float(os.getenv("METRICS_FLUSH_S", "5"))
+METRICS_MAX_MB = float(os.getenv("METRICS_MAX_MB", "64"))
+
+QUANTILES = (0.5, 0.95, 0.99)
+# timings kept per stage for the percentiles (a uniform sample past this);
+# n, total and max stay exact, so a long-running watcher stays bounded
+METRICS_RESERVOIR = int(os.getenv("METRICS_RESERVOIR", "10000"))
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    k = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+class _Timings:
+    """
+    One stage's n / total / max plus a reservoir sample (Algorithm R).
+    """
+
+    __slots__ = ("n", "total", "max", "sample")
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sample = []
+
+    def add(self, seconds: float, size: int):
+        self.n += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if len(self.sample) < size:
+            self.sample.append(seconds)
+        else:
+            j = random.randrange(self.n)
+            if j < size:
+                self.sample[j] = seconds
+
+
+class Metrics:
+    """
+    Per-stage timings and event counters for one run.
+    report() prints p50/p95/p99 per stage and writes a Prometheus-style text
+    snapshot. With jsonl, every observation is also logged to a JSON-lines
+    file tagged with query/page/asin etc., written in batches outside the
+    lock. Thread-safe; nothing is opened until the first write.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path = METRICS_DIR,
+        enabled: bool = METRICS_ENABLED,
+        reservoir: int = METRICS_RESERVOIR,
+        jsonl: bool = METRICS_JSONL,
+        flush_every: int = METRICS_FLUSH_EVERY,
+        flush_s: float = METRICS_FLUSH_S,
+        max_bytes: int = int(METRICS_MAX_MB * 1024 * 1024),
+    ):
+        self.out_dir = Path(out_dir)
+        self.enabled = enabled
+        self.jsonl = enabled and jsonl
+        self.reservoir = max(1, reservoir)
+        self.flush_every = max(1, flush_every)
+        self.flush_s = flush_s
+        self.max_bytes = max_bytes
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+        self._lock = threading.Lock()
+        self._timings = {}  # stage -> _Timings
+        self._counts = {}   # event -> n
+        self._buf = []      # JSONL records not yet written
+        self._flushed = time.monotonic()
+        self._io_lock = threading.Lock()  # file handle; never taken under _lock
+        self._fh = None
+
+    @property
+    def jsonl_path(self) -> Path:
+        return self.out_dir / f"metrics-{self.run_id}-{os.getpid()}.jsonl"
+
+    def _emit(self, rec: dict) -> list | None:
+        # caller holds the lock; returns a batch for the caller to _write once
+        # the lock is released
+        if not self.jsonl:
+            return None
+        self._buf.append(rec)
+        if len(self._buf) < self.flush_every and time.monotonic() - self._flushed < self.flush_s:
+            return None
+        return self._take()
+
+    def _take(self) -> list:
+        buf, self._buf = self._buf, []
+        self._flushed = time.monotonic()
+        return buf
+
+    def _write(self, batch: list):
+        if not batch:
+            return
+        data = "".join(json.dumps(rec, default=str) + "\n" for rec in batch)
+        with self._io_lock:
+            if self._fh is None:
+                self.out_dir.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.jsonl_path, "a", encoding="utf-8")
+            self._fh.write(data)
+            self._fh.flush()
+            if self._fh.tell() >= self.max_bytes:
+                # keep one previous file; the next batch starts a new one
+                self._fh.close()
+                self._fh = None
+                os.replace(self.jsonl_path, self.jsonl_path.with_name(self.jsonl_path.name + ".1"))
+
+    def flush(self):
+        """
+        Write buffered JSONL records now.
+        """
+        with self._lock:
+            batch = self._take()
+        self._write(batch)
+
+    def close(self):
+        self.flush()
+        with self._io_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def observe(self, stage: str, seconds: float, **tags):
+        with self._lock:
+            t = self._timings.get(stage)
+            if t is None:
+                t = self._timings[stage] = _Timings()
+            t.add(seconds, self.reservoir)
+            batch = self._emit({"ts": round(time.time(), 3), "stage": stage, "s": round(seconds, 6), **tags})
+        if batch:
+            self._write(batch)
+
+    def count(self, event: str, n: int = 1, **tags):
+        with self._lock:
+            self._counts[event] = self._counts.get(event, 0) + n
+            batch = self._emit({"ts": round(time.time(), 3), "event": event, "n": n, **tags})
+        if batch:
+            self._write(batch)
+
+    @contextmanager
+    def timer(self, stage: str, **tags):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - t0, **tags)
+
+    def _snapshot(self):
+        with self._lock:
+            timings = {k: (t.n, t.total, t.max, sorted(t.sample)) for k, t in self._timings.items()}
+            counts = dict(self._counts)
+        return timings, counts
+
+    def summary(self) -> dict:
+        """
+        {stage: {n, total_s, p50, p95, p99, max}} plus {"counts": {...}}.
+        """
+        timings, counts = self._snapshot()
+        out = {}
+        for stage, (n, total, top, vals) in sorted(timings.items()):
+            out[stage] = {
+                "n": n,
+                "total_s": round(total, 3),
+                **{f"p{int(q * 100)}": round(percentile(vals, q), 4) for q in QUANTILES},
+                "max": round(top, 4),
+            }
+        out["counts"] = counts
+        return out
+
+    def prometheus(self) -> str:
+        """
+        Text exposition format snapshot (summaries + counters).
+        """
+        timings, counts = self._snapshot()
+        lines = [
+            "# HELP card_stage_seconds Time spent per pipeline stage.",
+            "# TYPE card_stage_seconds summary",
+        ]
+        for stage, (n, total, _, vals) in sorted(timings.items()):
+            for q in QUANTILES:
+                lines.append(f'card_stage_seconds{{stage="{stage}",quantile="{q}"}} {percentile(vals, q):.6f}')
+            lines.append(f'card_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'card_stage_seconds_count{{stage="{stage}"}} {n}')
+        lines += [
+            "# HELP card_events_total Skipped / blocked / failed cards and pages.",
+            "# TYPE card_events_total counter",
+        ]
+        for event, n in sorted(counts.items()):
+            lines.append(f'card_events_total{{event="{event}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def report(self, title: str = "Stage timings") -> dict:
+        """
+        End-of-run: print the percentile table, write the .prom snapshot.
+        """
+        s = self.summary()
+        counts = s.pop("counts")
+        print(f"\n{title} (seconds):")
+        print(f"  {'stage':22s} {'n':>6s} {'total':>9s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+        for stage, r in s.items():
+            print(
+                f"  {stage:22s} {r['n']:6d} {r['total_s']:9.2f} "
+                f"{r['p50']:8.4f} {r['p95']:8.4f} {r['p99']:8.4f} {r['max']:8.4f}"
+            )
+        if counts:
+            print("  counts:", counts)
+
+        self.flush()
+        if self.enabled and (s or counts):
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            prom = self.out_dir / f"metrics-{self.run_id}-{os.getpid()}.prom"
+            prom.write_text(self.prometheus(), encoding="utf-8")
+            print("  metrics:", *([self.jsonl_path.name, "|"] if self.jsonl else []), prom.name)
+        return {**s, "counts": counts}
+
+
+METRICS = Metrics()
+atexit.register(METRICS.close)
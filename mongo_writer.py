@@ -0,0 +1,286 @@
+# mongo_writer.py
+import os
+import threading
+import time
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from metrics import METRICS
+
+# ----------------------------
+# Writer config
+# ----------------------------
+MONGO_BATCH_SIZE = int(os.getenv("MONGO_BATCH_SIZE", "200"))
+MONGO_FLUSH_SECONDS = float(os.getenv("MONGO_FLUSH_SECONDS", "1.0"))
+MONGO_MAX_PENDING = int(os.getenv("MONGO_MAX_PENDING", "2000"))
+
+
+def _print_error(tag: str, err: str):
+    print(f"[MongoDB] Error storing {tag}: {err}")
+
+
+class BulkUpserter:
+    """
+    Collects $set/$setOnInsert upserts (and plain inserts) and writes them as
+    unordered bulk_write batches from a background thread, when batch_size
+    docs are pending or flush_seconds have passed. upsert() blocks once max_pending docs are
+    waiting, so a slow Mongo pushes back on the producer instead of growing
+    memory.
+
+    Upserts for a key that is still pending are merged into the queued op
+    (later $set values win), so an unordered batch never holds two writes
+    for the same document. Per-document failures go to on_error(tag, message)
+    and are kept until take_failures(): queued is not stored, callers that
+    need to know (manifest, exports) check after flush(). Work that must only
+    happen once a write is stored goes in after= callbacks, run on the
+    flushing thread for every write that succeeded.
+    """
+
+    def __init__(
+        self,
+        col,
+        batch_size: int = MONGO_BATCH_SIZE,
+        flush_seconds: float = MONGO_FLUSH_SECONDS,
+        max_pending: int = MONGO_MAX_PENDING,
+        on_error=_print_error,
+    ):
+        self.col = col
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max(max_pending, batch_size)
+        self.on_error = on_error
+
+        self._pending = []  # [_Op]
+        self._by_key = {}   # upsert key -> pending _Op
+        self._failures = {}  # tag -> message, until take_failures()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        # counters
+        self.docs = 0
+        self.batches = 0
+        self.failures = 0
+        self.merged = 0
+        self.batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="mongo-writer", daemon=True)
+        self._thread.start()
+
+    def upsert(
+        self,
+        key: dict,
+        set_doc: dict,
+        set_on_insert: dict | None = None,
+        tag: str = "",
+        current_date=(),
+        unset=(),
+        after=None,
+    ):
+        """
+        current_date: fields set to the server's clock ($currentDate) instead
+        of the value in set_doc, e.g. updated_at for incremental exports.
+        unset: fields removed from the stored doc ($unset).
+        after: called with no arguments once the upsert succeeded (merged
+        upserts run every caller's callback); never called when it fails.
+        """
+        current = dict.fromkeys(current_date, True)
+        removed = dict.fromkeys(unset, "")
+        skip = current.keys() | removed.keys()
+        update = {"$set": {k: v for k, v in set_doc.items() if k not in skip}}
+        if set_on_insert:
+            update["$setOnInsert"] = {k: v for k, v in set_on_insert.items() if k not in skip}
+        if current:
+            update["$currentDate"] = current
+        if removed:
+            update["$unset"] = removed
+        self._queue(_Op(key, update, tag, after))
+
+    def insert(self, doc: dict, tag: str = "", after=None):
+        """
+        Queue a plain insert (append-only collections, e.g. price history).
+        """
+        self._queue(_Op(None, doc, tag, after))
+
+    def _queue(self, op):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("BulkUpserter is closed")
+            k = _key_id(op.key) if op.key is not None else None
+            while True:
+                # re-checked after every wait: another producer may have
+                # queued this key (or a flush taken it) in the meantime
+                queued = self._by_key.get(k) if k is not None else None
+                if queued is not None:
+                    queued.merge(op)
+                    self.merged += 1
+                    return
+                if len(self._pending) < self.max_pending:
+                    break
+                self._cond.wait()
+            self._pending.append(op)
+            if k is not None:
+                self._by_key[k] = op
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def _take(self) -> list:
+        with self._cond:
+            batch, self._pending = self._pending, []
+            self._by_key = {}
+            self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_seconds
+                while not self._closed and len(self._pending) < self.batch_size:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self):
+        """
+        Write everything pending now (in batch_size chunks).
+        """
+        with self._write_lock:
+            batch = self._take()
+            for i in range(0, len(batch), self.batch_size):
+                self._write(batch[i:i + self.batch_size])
+
+    def _write(self, batch: list):
+        t0 = time.perf_counter()
+        lost = set()  # batch indexes that failed
+        try:
+            self.col.bulk_write([op.request() for op in batch], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                self._fail(batch[err["index"]], err.get("errmsg", ""))
+                lost.add(err["index"])
+        except PyMongoError as e:
+            for op in batch:
+                self._fail(op, str(e))
+            lost = set(range(len(batch)))
+        failed = len(lost)
+
+        dt = time.perf_counter() - t0
+        METRICS.observe("mongo.bulk_write", dt, docs=len(batch), failed=failed)
+        if failed:
+            METRICS.count("mongo.write_failed", failed)
+        self.batches += 1
+        self.docs += len(batch) - failed
+        self.failures += failed
+        self.batch_seconds += dt
+        self.max_batch_seconds = max(self.max_batch_seconds, dt)
+
+        for i, op in enumerate(batch):
+            if i not in lost:
+                op.done()
+
+    def _fail(self, op, message: str):
+        for tag in op.tags:
+            self.on_error(tag, message)
+            with self._cond:
+                self._failures[tag] = message
+
+    def take_failures(self) -> dict:
+        """
+        {tag: error} for writes that failed since the last call. Call after
+        flush() to tell which queued docs never reached Mongo.
+        """
+        with self._cond:
+            out, self._failures = self._failures, {}
+        return out
+
+    def close(self):
+        """
+        Flush remaining docs and stop the background thread.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "docs": self.docs,
+            "batches": self.batches,
+            "failures": self.failures,
+            "merged": self.merged,
+            "pending": len(self._pending),
+            "avg_batch_ms": round(1000 * self.batch_seconds / self.batches, 1) if self.batches else 0.0,
+            "max_batch_ms": round(1000 * self.max_batch_seconds, 1),
+        }
+
+
+def _key_id(key: dict) -> tuple:
+    return tuple(sorted((k, repr(v)) for k, v in key.items()))
+
+
+class _Op:
+    """
+    One queued write: an upsert (key + update operators) or an insert
+    (key None, doc in `update`). Merged upserts keep every caller's tag and
+    after= callback.
+    """
+
+    __slots__ = ("key", "update", "tags", "after")
+
+    def __init__(self, key: dict | None, update: dict, tag: str, after=None):
+        self.key = key
+        self.update = update
+        self.tags = [tag]
+        self.after = [after] if after is not None else []
+
+    def merge(self, later: "_Op"):
+        """
+        Fold a later upsert for the same key into this one: for $set, $unset
+        and $currentDate the later op wins per field, $setOnInsert keeps the
+        first value, and no path ends up in two operators (Mongo rejects that).
+        """
+        u, v = self.update, later.update
+        ops = {op: dict(u.get(op, {})) for op in ("$set", "$unset", "$currentDate")}
+        for op in ops:
+            for k, x in v.get(op, {}).items():
+                for other in ops.values():
+                    other.pop(k, None)
+                ops[op][k] = x
+        taken = set().union(*ops.values())
+        on_insert = {**v.get("$setOnInsert", {}), **u.get("$setOnInsert", {})}
+        merged = {"$set": ops["$set"]}
+        on_insert = {k: x for k, x in on_insert.items() if k not in taken}
+        if on_insert:
+            merged["$setOnInsert"] = on_insert
+        for op in ("$unset", "$currentDate"):
+            if ops[op]:
+                merged[op] = ops[op]
+        self.update = merged
+        self.tags += [t for t in later.tags if t not in self.tags]
+        self.after += later.after
+
+    def done(self):
+        """
+        The write succeeded: run the callbacks (a failing one is reported,
+        never raised into the writer).
+        """
+        for fn in self.after:
+            try:
+                fn()
+            except Exception as e:
+                print(f"[MongoDB] After-write callback for {', '.join(self.tags)} failed: {e}")
+
+    def request(self):
+        if self.key is None:
+            return InsertOne(self.update)
+        return UpdateOne(self.key, self.update, upsert=True)
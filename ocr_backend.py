@@ -0,0 +1,190 @@
+# ocr_backend.py
+import os
+import re
+import threading
+
+import numpy as np
+
+# ----------------------------
+# Backend selection
+# ----------------------------
+# auto       -> tesserocr if importable, else pytesseract
+# tesserocr  -> in-process Tesseract (C API), one engine per worker thread
+# pytesseract-> subprocess per call (original behaviour)
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto").lower()
+
+_PSM_RE = re.compile(r"--psm\s+(\d+)")
+_OEM_RE = re.compile(r"--oem\s+(\d+)")
+_TESSDATA_RE = re.compile(r"""--tessdata-dir\s+(?:"([^"]+)"|'([^']+)'|(\S+))""")
+
+
+def parse_config(config: str) -> dict:
+    """
+    Pull psm/oem/tessdata-dir out of a pytesseract-style config string.
+    """
+    psm = _PSM_RE.search(config or "")
+    oem = _OEM_RE.search(config or "")
+    td = _TESSDATA_RE.search(config or "")
+    return {
+        "psm": int(psm.group(1)) if psm else 3,
+        "oem": int(oem.group(1)) if oem else 3,
+        "tessdata_dir": next((g for g in td.groups() if g), None) if td else os.getenv("TESSDATA_PREFIX"),
+    }
+
+
+def words_to_text(words: list) -> str:
+    """
+    Rebuild plain text (one line per Tesseract line) from image_to_data words.
+    """
+    lines = {}
+    for w in words:
+        lines.setdefault(w["line"], []).append(w["text"])
+    return "\n".join(" ".join(ws) for ws in lines.values())
+
+
+class OcrBackend:
+    """
+    image_to_data() returns one dict per recognised word, in reading order:
+    {text, conf (0-100), left, top, width, height, line}; `line` is a
+    hashable id shared by the words of one text line.
+    """
+    name = "base"
+
+    def image_to_string(self, img: np.ndarray, config: str, lang: str = "eng") -> str:
+        raise NotImplementedError
+
+    def image_to_data(self, img: np.ndarray, config: str, lang: str = "eng") -> list:
+        raise NotImplementedError
+
+
+class PytesseractBackend(OcrBackend):
+    """
+    Writes the image to a temp file and runs tesseract.exe for every call.
+    """
+    name = "pytesseract"
+
+    def image_to_string(self, img: np.ndarray, config: str, lang: str = "eng") -> str:
+        import pytesseract
+
+        return pytesseract.image_to_string(img, config=config, lang=lang)
+
+    def image_to_data(self, img: np.ndarray, config: str, lang: str = "eng") -> list:
+        import pytesseract
+
+        d = pytesseract.image_to_data(img, config=config, lang=lang, output_type=pytesseract.Output.DICT)
+        words = []
+        for i, text in enumerate(d["text"]):
+            conf = float(d["conf"][i])
+            if not str(text).strip() or conf < 0:
+                continue
+            words.append({
+                "text": str(text).strip(),
+                "conf": conf,
+                "left": d["left"][i],
+                "top": d["top"][i],
+                "width": d["width"][i],
+                "height": d["height"][i],
+                "line": (d["block_num"][i], d["par_num"][i], d["line_num"][i]),
+            })
+        return words
+
+
+class TesserocrBackend(OcrBackend):
+    """
+    Keeps one initialized Tesseract engine per thread (and so per worker process)
+    and feeds it the numpy buffer from preprocess() directly: no temp file,
+    no process spawn, no reload of eng.traineddata per card.
+    """
+    name = "tesserocr"
+
+    def __init__(self):
+        import tesserocr  # optional dependency
+        self._tesserocr = tesserocr
+        self._local = threading.local()
+
+    def _api(self, opts: dict, lang: str):
+        apis = getattr(self._local, "apis", None)
+        if apis is None:
+            apis = self._local.apis = {}
+
+        key = (opts["tessdata_dir"], lang, opts["oem"])
+        api = apis.get(key)
+        if api is None:
+            kwargs = {"lang": lang, "oem": self._tesserocr.OEM(opts["oem"])}
+            if opts["tessdata_dir"]:
+                kwargs["path"] = opts["tessdata_dir"]
+            api = apis[key] = self._tesserocr.PyTessBaseAPI(**kwargs)
+        api.SetPageSegMode(self._tesserocr.PSM(opts["psm"]))
+        return api
+
+    def _set_image(self, img: np.ndarray, config: str, lang: str):
+        api = self._api(parse_config(config), lang)
+        buf = np.ascontiguousarray(img, dtype=np.uint8)
+        h, w = buf.shape[:2]
+        bpp = 1 if buf.ndim == 2 else buf.shape[2]
+        api.SetImageBytes(buf.tobytes(), w, h, bpp, w * bpp)
+        return api
+
+    def image_to_string(self, img: np.ndarray, config: str, lang: str = "eng") -> str:
+        return self._set_image(img, config, lang).GetUTF8Text()
+
+    def image_to_data(self, img: np.ndarray, config: str, lang: str = "eng") -> list:
+        api = self._set_image(img, config, lang)
+        api.Recognize()
+        RIL = self._tesserocr.RIL
+        words, line = [], -1
+        for it in self._tesserocr.iterate_level(api.GetIterator(), RIL.WORD):
+            if it.IsAtBeginningOf(RIL.TEXTLINE):
+                line += 1
+            text = (it.GetUTF8Text(RIL.WORD) or "").strip()
+            box = it.BoundingBox(RIL.WORD)
+            if not text or box is None:
+                continue
+            x1, y1, x2, y2 = box
+            words.append({
+                "text": text,
+                "conf": float(it.Confidence(RIL.WORD)),
+                "left": x1,
+                "top": y1,
+                "width": x2 - x1,
+                "height": y2 - y1,
+                "line": line,
+            })
+        return words
+
+
+def make_backend(name: str) -> OcrBackend:
+    if name == "pytesseract":
+        return PytesseractBackend()
+    if name == "tesserocr":
+        return TesserocrBackend()
+    if name == "auto":
+        try:
+            return TesserocrBackend()
+        except ImportError:
+            return PytesseractBackend()
+    raise ValueError(f"Unknown OCR_BACKEND: {name}")
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> OcrBackend:
+    """
+    Process-wide backend chosen by OCR_BACKEND, created on first use.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = make_backend(OCR_BACKEND)
+    return _backend
+
+
+def image_to_string(img: np.ndarray, config: str, lang: str = "eng") -> str:
+    return get_backend().image_to_string(img, config, lang)
+
+
+def image_to_data(img: np.ndarray, config: str, lang: str = "eng") -> list:
+    return get_backend().image_to_data(img, config, lang)
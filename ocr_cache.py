@@ -0,0 +1,186 @@
+# ocr_cache.py
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# ----------------------------
+# Cache config
+# ----------------------------
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE", "1") != "0"
+OCR_CACHE_PATH = Path(os.getenv("OCR_CACHE_PATH", str(Path(__file__).parent / "output" / "ocr_cache.sqlite3")))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# evict down to this fraction of max so we don't evict on every put
+_LOW_WATER = 0.9
+_EVICT_CHECK_EVERY = 200
+
+
+def fingerprint(preprocess_params: str, ocr_config: str, backend: str = "") -> str:
+    """
+    Identifies the preprocessing + Tesseract settings (and the OCR backend,
+    see ocr_backend.get_backend().name) that produced a text.
+    Any change gives a new fingerprint, so old entries simply stop matching.
+    """
+    return hashlib.sha256(f"{preprocess_params}\n{ocr_config}\n{backend}".encode("utf-8")).hexdigest()[:16]
+
+
+def image_key(image_bytes: bytes, fp: str) -> str:
+    h = hashlib.sha256(image_bytes)
+    h.update(fp.encode("ascii"))
+    return h.hexdigest()
+
+
+class OcrCache:
+    """
+    Content-addressed OCR text cache in SQLite:
+    key = sha256(image bytes + fingerprint), LRU eviction by total text size.
+    Safe to share between threads and worker processes.
+    """
+
+    def __init__(self, path: Path = OCR_CACHE_PATH, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as c:
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_text ("
+                " key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, text TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            c.execute("CREATE INDEX IF NOT EXISTS ix_ocr_text_accessed ON ocr_text(accessed_at)")
+            c.execute("CREATE INDEX IF NOT EXISTS ix_ocr_text_fp ON ocr_text(fingerprint)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, image_bytes: bytes, fp: str) -> str | None:
+        key = image_key(image_bytes, fp)
+        with self._conn() as c:
+            row = c.execute("SELECT text FROM ocr_text WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            c.execute("UPDATE ocr_text SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, image_bytes: bytes, fp: str, text: str):
+        now = time.time()
+        with self._conn() as c:
+            c.execute(
+                "INSERT OR REPLACE INTO ocr_text VALUES (?, ?, ?, ?, ?, ?)",
+                (image_key(image_bytes, fp), fp, text, len(text.encode("utf-8")), now, now),
+            )
+        self._puts += 1
+        if self._puts % _EVICT_CHECK_EVERY == 0:
+            self.evict()
+
+    def total_bytes(self) -> int:
+        row = self._conn().execute("SELECT COALESCE(SUM(size), 0) FROM ocr_text").fetchone()
+        return int(row[0])
+
+    def evict(self) -> int:
+        """
+        Drop least recently used entries until the cache is under its size budget.
+        Returns number of entries removed.
+        """
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+
+        target = int(self.max_bytes * _LOW_WATER)
+        victims = []
+        for key, size in self._conn().execute("SELECT key, size FROM ocr_text ORDER BY accessed_at"):
+            if total <= target:
+                break
+            victims.append((key,))
+            total -= size
+
+        with self._conn() as c:
+            c.executemany("DELETE FROM ocr_text WHERE key = ?", victims)
+        return len(victims)
+
+    def invalidate(self, fp: str | None = None, keep: set[str] | None = None) -> int:
+        """
+        invalidate(fp)          -> drop entries made with that fingerprint
+        invalidate(keep={...})  -> drop entries made with any other fingerprint
+        invalidate()            -> drop everything
+        """
+        with self._conn() as c:
+            if fp is not None:
+                cur = c.execute("DELETE FROM ocr_text WHERE fingerprint = ?", (fp,))
+            elif keep:
+                marks = ",".join("?" for _ in keep)
+                cur = c.execute(f"DELETE FROM ocr_text WHERE fingerprint NOT IN ({marks})", tuple(keep))
+            else:
+                cur = c.execute("DELETE FROM ocr_text")
+        return cur.rowcount
+
+    def stats(self) -> dict:
+        n, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_text").fetchone()
+        fps = self._conn().execute("SELECT COUNT(DISTINCT fingerprint) FROM ocr_text").fetchone()[0]
+        return {
+            "entries": n, "bytes": size, "fingerprints": fps,
+            "hits": self.hits, "misses": self.misses,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> OcrCache | None:
+    """
+    Process-wide cache, opened on first use. None when OCR_CACHE=0.
+    """
+    global _cache
+    if not OCR_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OcrCache()
+    return _cache
+
+
+def cached_ocr(image_bytes: bytes, fp: str, run_ocr) -> str:
+    """
+    Return cached text for these image bytes + fingerprint, or call run_ocr()
+    and remember its result.
+    """
+    cache = get_cache()
+    if cache is None:
+        return run_ocr()
+
+    text = cache.get(image_bytes, fp)
+    if text is None:
+        text = run_ocr()
+        cache.put(image_bytes, fp, text)
+    return text
+
+
+if __name__ == "__main__":
+    # python ocr_cache.py [stats|evict|clear|drop <fingerprint>]
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    cache = OcrCache()
+    if cmd == "clear":
+        print("Removed:", cache.invalidate())
+    elif cmd == "drop" and len(sys.argv) > 2:
+        print("Removed:", cache.invalidate(sys.argv[2]))
+    elif cmd == "evict":
+        print("Evicted:", cache.evict())
+    print(cache.stats())
@@ -0,0 +1,213 @@
+# ocr_confidence.py
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+import ocr_backend
+
+# ----------------------------
+# Confidence-aware OCR config
+# ----------------------------
+# OCR_CONFIDENCE=1: image_to_data + per-field confidence + targeted re-OCR
+OCR_CONFIDENCE = os.getenv("OCR_CONFIDENCE", "0") == "1"
+# a field below this (0-100) is re-OCR'd from its own line
+MIN_FIELD_CONF = float(os.getenv("OCR_MIN_FIELD_CONF", "75"))
+# (psm, scale) tried in order on a weak line; 7 = single text line
+RETRIES = [(7, 1.0), (7, 1.5), (13, 2.0)]
+REOCR_PAD = 6
+# lines tried when a field wasn't read at all
+MISSING_MAX_LINES = 3
+
+# Part of the OCR cache key
+CONF_PARAMS = f"data-conf{MIN_FIELD_CONF:g}-" + "-".join(f"p{p}x{s:g}" for p, s in RETRIES)
+
+# same patterns as extract_fields(); used to find each field's words
+PRICE_RE = re.compile(r"(₹\s?\d[\d,]*|\b\d{1,3}(?:,\d{3})+\b)")
+RATING_RE = re.compile(r"(\d(?:\.\d)?)\s*out\s*of\s*5", re.IGNORECASE)
+CLEAN_PRICE_RE = re.compile(r"^₹?\d{1,3}(?:,\d{2,3})*(?:\.\d+)?$")
+FIELDS = ("title", "price", "rating")
+
+
+def _lines(words: list) -> list:
+    """
+    Group words by Tesseract line: [{"text", "words", "spans"}], where spans
+    are each word's (start, end) offset in the line text.
+    """
+    grouped = {}
+    for w in words:
+        grouped.setdefault(w["line"], []).append(w)
+    out = []
+    for ws in grouped.values():
+        spans, pos = [], 0
+        for w in ws:
+            spans.append((pos, pos + len(w["text"])))
+            pos += len(w["text"]) + 1
+        out.append({"text": " ".join(w["text"] for w in ws), "words": ws, "spans": spans})
+    return out
+
+
+def _in_span(line: dict, start: int, end: int) -> list:
+    return [w for w, (a, b) in zip(line["words"], line["spans"]) if a < end and b > start]
+
+
+def _locate(field: str, value: str, line: dict):
+    """
+    (confidence, words) of `value` in `line`, or None when it isn't there.
+    Price/rating take their weakest word; a price glued to stray symbols
+    ("°72,990") counts as unreadable. The title takes the line's mean.
+    """
+    if not value:
+        return None
+    if field == "title":
+        if line["text"].strip() != value:
+            return None
+        ws = line["words"]
+        return sum(w["conf"] for w in ws) / len(ws), ws
+    regex = PRICE_RE if field == "price" else RATING_RE
+    for m in regex.finditer(line["text"]):
+        if m.group(1).replace(" ", "") != value:
+            continue
+        ws = _in_span(line, *m.span(1))
+        if not ws:
+            return None
+        conf = min(w["conf"] for w in ws)
+        if field == "price" and not CLEAN_PRICE_RE.match("".join(w["text"] for w in ws)):
+            conf = min(conf, MIN_FIELD_CONF - 1)
+        return conf, ws
+    return None
+
+
+def _read(field: str, line: dict):
+    """
+    (value, confidence) of `field` read from a re-OCR'd line.
+    """
+    if field == "title":
+        text = line["text"].strip()
+        if len(text) < 10 or PRICE_RE.search(text) or RATING_RE.search(text):
+            return None
+        return text, _locate("title", text, line)[0]
+    regex = PRICE_RE if field == "price" else RATING_RE
+    m = regex.search(line["text"])
+    if not m:
+        return None
+    value = m.group(1).replace(" ", "")
+    found = _locate(field, value, line)
+    return (value, found[0]) if found else None
+
+
+def _box(words: list, shape) -> tuple:
+    x1 = max(0, min(w["left"] for w in words) - REOCR_PAD)
+    y1 = max(0, min(w["top"] for w in words) - REOCR_PAD)
+    x2 = min(shape[1], max(w["left"] + w["width"] for w in words) + REOCR_PAD)
+    y2 = min(shape[0], max(w["top"] + w["height"] for w in words) + REOCR_PAD)
+    return x1, y1, x2, y2
+
+
+def _with_psm(config: str, psm: int) -> str:
+    if re.search(r"--psm\s+\d+", config):
+        return re.sub(r"--psm\s+\d+", f"--psm {psm}", config)
+    return f"{config} --psm {psm}"
+
+
+def _reocr(img: np.ndarray, words: list, field: str, config: str, best: float):
+    """
+    Re-read one line region with RETRIES until a read beats `best` and
+    clears MIN_FIELD_CONF. Returns (value, conf) of the best read or None.
+    """
+    import cv2
+
+    x1, y1, x2, y2 = _box(words, img.shape)
+    crop = img[y1:y2, x1:x2]
+    if crop.size == 0:
+        return None
+    out = None
+    for psm, scale in RETRIES:
+        region = crop if scale == 1 else cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        # Tesseract wants some margin around a single line
+        region = cv2.copyMakeBorder(region, 10, 10, 10, 10, cv2.BORDER_CONSTANT, value=255)
+        for line in _lines(ocr_backend.image_to_data(region, _with_psm(config, psm))):
+            got = _read(field, line)
+            if got and got[1] > best:
+                out, best = got, got[1]
+        if out and best >= MIN_FIELD_CONF:
+            break
+    return out
+
+
+def ocr_fields(img: np.ndarray, config: str, extract) -> dict:
+    """
+    One image_to_data pass over the preprocessed card, fields via
+    extract(text) -> (title, price, rating), then re-OCR of only the fields
+    that are missing or below MIN_FIELD_CONF; a missing field only takes a
+    re-read that clears MIN_FIELD_CONF. Returns
+    {text, fields, field_conf, reocr, improved, reocr_s}; text is the
+    first-pass text (what the GPU filter sees).
+    """
+    words = ocr_backend.image_to_data(img, config)
+    lines = _lines(words)
+    text = "\n".join(ln["text"] for ln in lines)
+    values = dict(zip(FIELDS, extract(text)))
+
+    conf, used = {}, set()
+    where = {}
+    for field in FIELDS:
+        for i, line in enumerate(lines):
+            found = _locate(field, values[field], line)
+            if found:
+                # re-OCR takes the whole line: "out of 5" / "₹" give the context
+                conf[field], where[field] = round(found[0], 1), line["words"]
+                used.add(i)
+                break
+        else:
+            conf[field] = None
+
+    t0 = time.perf_counter()
+    reocr, improved = [], []
+    for field in FIELDS:
+        c = conf[field]
+        if c is not None and c >= MIN_FIELD_CONF:
+            continue
+        if field == "title" and not values["title"]:
+            continue  # no title -> the card is dropped anyway
+        reocr.append(field)
+        if field in where:
+            candidates = [where[field]]
+        else:
+            weak = [
+                (sum(w["conf"] for w in ln["words"]) / len(ln["words"]), ln["words"])
+                for i, ln in enumerate(lines) if i not in used and ln["words"]
+            ]
+            candidates = [ws for _, ws in sorted(weak, key=lambda t: t[0])[:MISSING_MAX_LINES]]
+        for ws in candidates:
+            got = _reocr(img, ws, field, config, -1.0 if c is None else c)
+            if got and c is None and got[1] < MIN_FIELD_CONF:
+                # a weak regex hit on some other line isn't evidence of the field
+                got = None
+            if got:
+                values[field], conf[field], c = got[0], round(got[1], 1), got[1]
+                improved.append(field)
+                if c >= MIN_FIELD_CONF:
+                    break
+
+    return {
+        "text": text,
+        "fields": (values["title"], values["price"], values["rating"]),
+        "field_conf": conf,
+        "reocr": reocr,
+        "improved": list(dict.fromkeys(improved)),
+        "reocr_s": time.perf_counter() - t0,
+    }
+
+
+def dumps(result: dict) -> str:
+    # ocr_cache stores strings
+    return json.dumps(result)
+
+
+def loads(cached: str) -> dict:
+    res = json.loads(cached)
+    res["fields"] = tuple(res["fields"])
+    return res
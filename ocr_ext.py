@@ -1,13 +1,17 @@
 # ocr_ext.py
-import os
+import io
 import re
 from pathlib import Path
 
-import cv2
 import numpy as np
-import pytesseract
 from PIL import Image
 
+import ocr_backend
+from engine import get_engine
+from ocr_cache import cached_ocr, fingerprint
+from preprocess_profiles import PREPROCESS_PROFILE, preprocess_with_profile, profile_params
+from roi import ROI_ENABLED, ROI_PARAMS, crop_text_regions
+
 # ---------
 # Regex (tolerant for OCR quirks)
 # ---------
@@ -18,32 +22,31 @@ REVIEWS_RE = re.compile(r"(\d[\d,]*)\s*(ratings|rating|reviews|review)", re.IGNO
 def configure_tesseract():
     """
     Configure pytesseract and return (tess_exe, tessdata_dir, ocr_config).
-    Uses env vars if present; otherwise uses your venv paths.
+    Paths come from engine.py (TESS_EXE or TESSERACT_EXE / TESSDATA_DIR), like every other
+    entry point.
     """
-    tess_exe = os.getenv(
-        "TESSERACT_EXE",
-        r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tesseract.exe"
-    )
-    tessdata_dir = os.getenv(
-        "TESSDATA_DIR",
-        r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tessdata"
-    )
-
-    if not Path(tess_exe).exists():
-        raise FileNotFoundError(f"Tesseract EXE not found: {tess_exe}")
-    if not Path(tessdata_dir).exists():
-        raise FileNotFoundError(f"Tessdata directory not found: {tessdata_dir}")
-
-    pytesseract.pytesseract.tesseract_cmd = tess_exe
-    ocr_config = rf'--oem 3 --psm 6 --tessdata-dir "{tessdata_dir}"'
-    return tess_exe, tessdata_dir, ocr_config
+    engine = get_engine()
+    ocr_config = engine.tesseract()
+    return engine.tess_exe, engine.tessdata_dir, ocr_config
+
+# Part of the OCR cache key: bump when preprocess_for_ocr() changes
+PREPROCESS_PARAMS = f"rgb>gray|{ROI_PARAMS}|" + (
+    "resize2x-cubic|bilateral-9-75-75|otsu" if PREPROCESS_PROFILE == "baseline" else profile_params()
+)
 
 def preprocess_for_ocr(pil_img: Image.Image):
     """
-    Improve OCR accuracy: grayscale -> upscale -> denoise -> threshold
+    Improve OCR accuracy: grayscale -> text rows (OCR_ROI=1) -> upscale -> denoise -> threshold
     """
+    import cv2
+
     img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if ROI_ENABLED:
+        gray = crop_text_regions(gray)
+    if PREPROCESS_PROFILE != "baseline":
+        # PREPROCESS_PROFILE=<name>|adaptive, see preprocess_profiles.py
+        return preprocess_with_profile(gray)
     gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
     gray = cv2.bilateralFilter(gray, 9, 75, 75)
     _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
@@ -84,10 +87,14 @@ def ocr_extract_from_card(image_path: Path, ocr_config: str, dump_text_dir: Path
     """
     OCR a card screenshot and return extracted fields + raw OCR text.
     """
-    pil = Image.open(image_path)
-    pre = preprocess_for_ocr(pil)
+    data = Path(image_path).read_bytes()
+
+    def run_ocr():
+        pre = preprocess_for_ocr(Image.open(io.BytesIO(data)))
+        return ocr_backend.image_to_string(pre, ocr_config)
 
-    text = pytesseract.image_to_string(pre, config=ocr_config, lang="eng")
+    fp = fingerprint(PREPROCESS_PARAMS, ocr_config, ocr_backend.get_backend().name)
+    text = cached_ocr(data, fp, run_ocr)
 
     if dump_text_dir:
         dump_text_dir.mkdir(parents=True, exist_ok=True)
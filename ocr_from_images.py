@@ -1,76 +1,69 @@
 import os
 import re
+import time
 from pathlib import Path
 from datetime import datetime, timezone
 
-import pandas as pd
-import pytesseract
 from PIL import Image
-import cv2
 import numpy as np
 
-from pymongo import MongoClient, ASCENDING
-from pymongo.errors import PyMongoError
+import cascade
+import ocr_backend
+import ocr_confidence
+import raw_store
+from engine import get_engine
+from exporters import StreamingExport
+from gpu_classifier import classify as classify_gpu, has_discrete_gpu
+from manifest import ERROR, SKIPPED, STORED, get_manifest
+from metrics import METRICS
+from ocr_cache import fingerprint
+from price_history import record as record_price
+from ocr_pool import ocr_images
+from preprocess_profiles import PREPROCESS_PROFILE, preprocess_with_profile, profile_params
+from roi import ROI_ENABLED, ROI_PARAMS, crop_text_regions
 
 
 BASE_DIR = Path(__file__).parent
 IMG_DIR = BASE_DIR / "card_images"
 OUT_DIR = BASE_DIR / "output"
-OUT_DIR.mkdir(exist_ok=True)
+CSV_COLUMNS = ["image_file", "title", "price", "rating", "gpu"]
+# OCR_INCREMENTAL=0 reprocesses every image instead of only new/changed ones
+INCREMENTAL = os.getenv("OCR_INCREMENTAL", "1") != "0"
+# stored cards are recorded (manifest + export) once this many wait on a flush
+CONFIRM_EVERY = int(os.getenv("OCR_CONFIRM_EVERY", "200"))
 
 # ----------------------------
-# MongoDB setup
+# MongoDB + Tesseract: engine.py (env MONGO_URI/MONGO_DB/MONGO_COL,
+# TESS_EXE/TESSDATA_DIR). Connection, indexes and path checks happen on
+# first use, so importing this module is free.
 # ----------------------------
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-MONGO_DB = os.getenv("MONGO_DB", "amazon_ocr")
-MONGO_COL = os.getenv("MONGO_COL", "gpu_laptops")
-
-client = MongoClient(MONGO_URI)
-db = client[MONGO_DB]
-col = db[MONGO_COL]
-
-# Create a helpful unique index to prevent duplicates:
-# If you have ASIN, use that. If not, fallback to image_file.
-# We'll keep both and upsert by whichever is present.
-col.create_index([("asin", ASCENDING)], unique=False)
-col.create_index([("image_file", ASCENDING)], unique=True)
-
-# ----------------------------
-# Tesseract setup (your paths)
-# ----------------------------
-TESS_EXE = r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tesseract.exe"
-TESSDATA_DIR = r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tessdata"
-
-if not Path(TESS_EXE).exists():
-    raise FileNotFoundError(f"tesseract.exe not found: {TESS_EXE}")
-if not Path(TESSDATA_DIR, "eng.traineddata").exists():
-    raise FileNotFoundError(f"eng.traineddata not found: {Path(TESSDATA_DIR, 'eng.traineddata')}")
-
-pytesseract.pytesseract.tesseract_cmd = TESS_EXE
-os.environ["TESSDATA_PREFIX"] = TESSDATA_DIR
-OCR_CONFIG = f"--oem 3 --psm 6 --tessdata-dir {TESSDATA_DIR}"
+def get_writer():
+    # upserts are batched into unordered bulk_writes; main() closes the writer
+    return get_engine().writer()
 
 # ----------------------------
 # GPU filters
 # ----------------------------
-GPU_INCLUDE = [
-    r"\brtx\b", r"\bgtx\b", r"\bgeforce\b", r"\bnvidia\b",
-    r"\bradeon\b", r"\brx\b", r"\bamd\s+radeon\b",
-]
-GPU_EXCLUDE = [
-    r"\bintel\b", r"\buhd\b", r"\biris\b", r"\bintegrated\b",
-    r"\buma\b", r"\bshared\b", r"\barc\b"
-]
-
 def has_nvidia_amd_gpu(text: str) -> bool:
-    t = (text or "").lower()
-    include_hit = any(re.search(p, t) for p in GPU_INCLUDE)
-    exclude_hit = any(re.search(p, t) for p in GPU_EXCLUDE)
-    return include_hit and not exclude_hit
+    # shared single-pass rules, see gpu_classifier.py
+    return classify_gpu(text).ok
+
+# Part of the OCR cache key: bump when preprocess() changes
+PREPROCESS_PARAMS = f"rgb>gray|{ROI_PARAMS}|" + (
+    "resize2x-cubic|bilateral-9-75-75|otsu" if PREPROCESS_PROFILE == "baseline" else profile_params()
+) + (f"|{ocr_confidence.CONF_PARAMS}" if ocr_confidence.OCR_CONFIDENCE else "")
 
 def preprocess(pil_img: Image.Image):
+    import cv2
+
     arr = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
     gray = cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY)
+    if ROI_ENABLED:
+        # upscale/filter/OCR only the title, rating and price rows
+        gray = crop_text_regions(gray)
+    if PREPROCESS_PROFILE != "baseline":
+        # PREPROCESS_PROFILE=<name>|adaptive, see preprocess_profiles.py
+        return preprocess_with_profile(gray)
     gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
     gray = cv2.bilateralFilter(gray, 9, 75, 75)
     _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
@@ -123,92 +116,227 @@ def parse_meta_from_filename(fname: str):
 # ----------------------------
 # Mongo upsert function
 # ----------------------------
-def upsert_to_mongo(doc: dict):
+def upsert_to_mongo(doc: dict, sha256: str | None = None):
     """
     Upserts by ASIN if available; otherwise upserts by image_file.
+    Queued on the batched writer; errors are reported per document.
+    sha256 (of the card image) keys the raw_text blob, see raw_store.split.
+    """
+    if doc.get("asin"):
+        key = {"asin": doc["asin"]}
+    else:
+        key = {"image_file": doc["image_file"]}
+
+    # setOnInsert keeps initial create timestamp stable
+    now = datetime.now(timezone.utc)
+    doc = raw_store.split(doc, digest=sha256)
+    # updated_at is set by the server ($currentDate), see export_parquet.py
+    # price history only once the card upsert is stored
+    get_writer().upsert(
+        key, doc, {"created_at": now}, tag=doc.get("image_file", ""),
+        current_date=("updated_at",), unset=raw_store.unset_fields(doc),
+        after=lambda: record_price(
+            doc.get("asin", ""), doc.get("price"), doc.get("rating"), doc.get("query", ""), now,
+            tag=doc.get("image_file", ""),
+        ),
+    )
+
+class PendingStores:
+    """
+    Cards queued on the writer but not yet recorded. settle() flushes the
+    writer and only then records STORED + the export row, or ERROR when the
+    upsert failed, so the manifest never skips a card that isn't in Mongo.
+    on_settled(img_path, outcome) is called for each card once that is known.
     """
-    try:
-        if doc.get("asin"):
-            key = {"asin": doc["asin"]}
-        else:
-            key = {"image_file": doc["image_file"]}
-
-        # setOnInsert keeps initial create timestamp stable
-        now = datetime.now(timezone.utc)
-        update = {
-            "$set": {**doc, "updated_at": now},
-            "$setOnInsert": {"created_at": now}
-        }
-
-        col.update_one(key, update, upsert=True)
 
-    except PyMongoError as e:
-        print(f" MongoDB error while writing {doc.get('image_file')}: {e}")
+    def __init__(
+        self,
+        manifest,
+        fp: str,
+        export,
+        every: int = CONFIRM_EVERY,
+        max_age_s: float | None = None,
+        on_settled=None,
+    ):
+        self.manifest = manifest
+        self.fp = fp
+        self.export = export
+        self.every = max(1, every)
+        self.max_age_s = max_age_s
+        self.on_settled = on_settled
+        self._rows = []  # (img_path, gpu label, row, image sha256)
+        self._since = 0.0
+        self.failed = 0
+
+    def add(self, img_path: Path, label: str, row: dict, sha256: str | None = None):
+        if not self._rows:
+            self._since = time.monotonic()
+        self._rows.append((img_path, label, row, sha256))
+        if len(self._rows) >= self.every:
+            self.settle()
+
+    def due(self) -> bool:
+        return bool(self._rows) and (
+            len(self._rows) >= self.every
+            or (self.max_age_s is not None and time.monotonic() - self._since >= self.max_age_s)
+        )
+
+    def settle(self) -> int:
+        """
+        Flush and record everything added so far; returns how many failed.
+        """
+        if not self._rows:
+            return 0
+        get_engine().flush()
+        failed = get_writer().take_failures()
+        rows, self._rows = self._rows, []
+        n = 0
+        for img_path, label, row, sha256 in rows:
+            err = failed.get(img_path.name)
+            if err is not None:
+                self.manifest.record(img_path, self.fp, ERROR, f"mongo: {err}", sha256=sha256)
+                METRICS.count("card.write_failed", image=img_path.name)
+                n += 1
+            else:
+                self.manifest.record(img_path, self.fp, STORED, label, row, sha256=sha256)
+                self.export.write(row)
+            if self.on_settled is not None:
+                self.on_settled(img_path, STORED if err is None else ERROR)
+        self.failed += n
+        return n
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def handle_result(img_path: Path, res: dict, manifest, fp: str, stores: PendingStores) -> str:
+    """
+    GPU filter -> Mongo upsert for one OCR result; rejects are recorded in the
+    manifest right away, stored cards once `stores` confirms the write.
+    Returns the outcome (STORED meaning queued, SKIPPED or ERROR).
+    """
+    print(f"Processing {img_path.name} ...")
+    # hash of the bytes the OCR worker read; spares the manifest a second read
+    sha256 = res.get("sha256") or None
+
+    if res["error"]:
+        print(f" Could not OCR {img_path.name}: {res['error']}\n")
+        manifest.record(img_path, fp, ERROR, res["error"], sha256=sha256)
+        METRICS.count("card.failed", image=img_path.name)
+        return ERROR
+
+    if res["cascade"] == "reject":
+        print("   -> skip (title band: no NVIDIA/AMD GPU)\n")
+        manifest.record(img_path, fp, SKIPPED, "cascade_reject", sha256=sha256)
+        METRICS.count("card.cascade_reject", image=img_path.name)
+        return SKIPPED
+
+    text = res["text"]
+
+    with METRICS.timer("gpu_filter", image=img_path.name):
+        gpu = classify_gpu(text)
+    if not gpu.ok:
+        METRICS.count("card.gpu_reject", image=img_path.name)
+        print(f"   -> skip ({gpu.reason}{': ' + gpu.token if gpu.token else ''})\n")
+        manifest.record(img_path, fp, SKIPPED, gpu.reason, sha256=sha256)
+        return SKIPPED
+
+    title, price, rating = res["fields"]
+    if not title:
+        print("   -> skip (title not found)\n")
+        manifest.record(img_path, fp, SKIPPED, "no_title", sha256=sha256)
+        METRICS.count("card.no_title", image=img_path.name)
+        return SKIPPED
+
+    meta = parse_meta_from_filename(img_path.name)
+
+    doc = {
+        "image_file": img_path.name,
+        "image_path": str(img_path),
+        "title": title,
+        "price": price,
+        "rating": rating,
+        "gpu": gpu.label,
+        "raw_text": text,           # side collection unless RAW_TEXT_MODE=inline
+        "source": "amazon_in_cards", # tag your pipeline
+        **meta
+    }
+    if res.get("field_conf") is not None:
+        doc["field_conf"] = res["field_conf"]
+
+    # write to MongoDB 
+    with METRICS.timer("mongo.queue", image=img_path.name):
+        upsert_to_mongo(doc, sha256)
+    METRICS.count("card.stored_ocr", image=img_path.name)
+
+    print(f"  queued for MongoDB: {title[:70]} | {price} | {rating}\n")
+
+    row = {
+        "image_file": img_path.name,
+        "title": title,
+        "price": price,
+        "rating": rating,
+        "gpu": gpu.label,
+    }
+    stores.add(img_path, gpu.label, row, sha256)
+    return STORED
 
 def main():
     if not IMG_DIR.exists():
         raise FileNotFoundError(f"card_images folder not found: {IMG_DIR}")
 
-    images = sorted(IMG_DIR.glob("*.png"))
+    engine = get_engine()
+    ocr_config = engine.tesseract()
+
+    images = all_images = sorted(IMG_DIR.glob("*.png"))
     print("\n🔍 Starting OCR on card_images...\n")
     print("Images found:", len(images))
 
-    results_for_csv = []
-
-    for img_path in images:
-        print(f"Processing {img_path.name} ...")
-
-        try:
-            pil = Image.open(img_path)
-        except Exception as e:
-            print(f" Could not open {img_path.name}: {e}\n")
-            continue
-
-        pre = preprocess(pil)
-        text = pytesseract.image_to_string(pre, config=OCR_CONFIG, lang="eng")
-
-        if not has_nvidia_amd_gpu(text):
-            print("   -> skip (no NVIDIA/AMD GPU keywords)\n")
-            continue
-
-        title, price, rating = extract_fields(text)
-        if not title:
-            print("   -> skip (title not found)\n")
-            continue
-
-        meta = parse_meta_from_filename(img_path.name)
-
-        doc = {
-            "image_file": img_path.name,
-            "image_path": str(img_path),
-            "title": title,
-            "price": price,
-            "rating": rating,
-            "raw_text": text,           # useful for debugging
-            "source": "amazon_in_cards", # tag your pipeline
-            **meta
-        }
-
-        # write to MongoDB 
-        upsert_to_mongo(doc)
-
-        print(f"  saved to MongoDB: {title[:70]} | {price} | {rating}\n")
-
-        # optional: still collect for CSV
-        results_for_csv.append({
-            "image_file": img_path.name,
-            "title": title,
-            "price": price,
-            "rating": rating
-        })
-
-    # optional CSV export
-    df = pd.DataFrame(results_for_csv)
-    out_csv = OUT_DIR / "gpu_laptops_from_images.csv"
-    df.to_csv(out_csv, index=False, encoding="utf-8-sig")
-
-    print(" DONE. Saved:", out_csv)
-    print("Total NVIDIA/AMD GPU laptops found:", len(df))
+    # manifest: only new/changed images (or ones processed with other settings)
+    manifest = get_manifest()
+    fp = fingerprint(PREPROCESS_PARAMS, ocr_config, ocr_backend.get_backend().name)
+    if INCREMENTAL:
+        images = manifest.pending(images, fp)
+        print("New or changed:", len(images))
+
+    # rows stream into the export as cards are stored; unchanged images keep
+    # their row from the manifest, so an interrupted run just gets redone
+    # (the manifest is the resume state: resume=False rebuilds from it)
+    export = StreamingExport(OUT_DIR / "gpu_laptops_from_images", CSV_COLUMNS, key="image_file", resume=False)
+    on_disk = {str(p) for p in all_images}
+    redo = {str(p) for p in images}
+    for path, row in manifest.iter_stored():
+        if path in on_disk and path not in redo:
+            export.write(row)
+
+    # preprocess + OCR + extraction run in worker processes; this loop is the
+    # single consumer that writes Mongo and the CSV rows, in input order
+    results = ocr_images(
+        images,
+        tess_exe=engine.tess_exe,
+        ocr_config=ocr_config,
+        preprocess=preprocess,
+        preprocess_params=PREPROCESS_PARAMS,
+        extract=extract_fields,
+        prefilter=has_discrete_gpu,
+        tessdata_dir=engine.tessdata_dir,
+    )
+
+    stores = PendingStores(manifest, fp, export)
+    for img_path, res in zip(images, results):
+        handle_result(img_path, res, manifest, fp, stores)
+    stores.settle()
+    if stores.failed:
+        print("Cards not stored (Mongo write failed, recorded as errors):", stores.failed)
+
+    print("Mongo writer:", engine.close())
+    print("OCR cascade:", cascade.STATS.snapshot())
+    METRICS.report()
+
+    total = export.written
+    for path in export.close():
+        print(" DONE. Saved:", path)
+    print("Total NVIDIA/AMD GPU laptops found:", total)
 
 if __name__ == "__main__":
 
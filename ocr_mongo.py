@@ -1,69 +1,102 @@
 # ocr_mongo.py
-import os
 import re
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
-import cv2
 import numpy as np
 from PIL import Image
-import pytesseract
 
-from pymongo import MongoClient, ASCENDING
-from pymongo.errors import PyMongoError
+import cascade
+import ocr_backend
+import ocr_confidence
+import price_history
+import raw_store
+from engine import get_engine
+from gpu_classifier import classify as classify_gpu
+from metrics import METRICS
+from ocr_cache import cached_ocr, fingerprint
+from preprocess_profiles import PREPROCESS_PROFILE, preprocess_with_profile, profile_params
+from roi import ROI_ENABLED, ROI_PARAMS, crop_text_regions
 
 # ----------------------------
-# MongoDB config
+# MongoDB + Tesseract: config lives in engine.py; the client, indexes and
+# Tesseract checks are set up lazily by get_engine() on first use.
 # ----------------------------
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-MONGO_DB = os.getenv("MONGO_DB", "amazon_ocr")
-MONGO_COL = os.getenv("MONGO_COL", "gpu_laptops")
-
-_client = MongoClient(MONGO_URI)
-_db = _client[MONGO_DB]
-_col = _db[MONGO_COL]
+def get_writer():
+    """
+    Shared batched writer for the collection; flushed on interpreter exit.
+    """
+    return get_engine().writer()
 
-# Useful indexes
-_col.create_index([("asin", ASCENDING)], unique=False)
-_col.create_index([("image_file", ASCENDING)], unique=True)
 
-# ----------------------------
-# Tesseract config
-# ----------------------------
-TESS_EXE = os.getenv("TESS_EXE", r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tesseract.exe")
-TESSDATA_DIR = os.getenv("TESSDATA_DIR", r"C:\Users\harshs\Ctrix\.venv\Lib\site-packages\tessdata")
+def flush_writes() -> dict:
+    """
+    Push all queued upserts to Mongo now; returns writer counters.
+    """
+    return get_engine().flush()
 
-if not Path(TESS_EXE).exists():
-    raise FileNotFoundError(f"tesseract.exe not found: {TESS_EXE}")
-if not Path(TESSDATA_DIR, "eng.traineddata").exists():
-    raise FileNotFoundError(f"eng.traineddata not found: {Path(TESSDATA_DIR, 'eng.traineddata')}")
 
-pytesseract.pytesseract.tesseract_cmd = TESS_EXE
-os.environ["TESSDATA_PREFIX"] = TESSDATA_DIR
-OCR_CONFIG = f"--oem 3 --psm 6 --tessdata-dir {TESSDATA_DIR}"
+def take_write_failures() -> dict:
+    """
+    {image_file: error} for card upserts that failed since the last call.
+    Call after flush_writes(): a queued doc not listed here is stored.
+    """
+    return get_writer().take_failures()
 
 
 # ----------------------------
 # Filters + extractors
 # ----------------------------
-GPU_INCLUDE = [
-    r"\brtx\b", r"\bgtx\b", r"\bgeforce\b", r"\bnvidia\b",
-    r"\bradeon\b", r"\brx\b", r"\bamd\s+radeon\b",
-]
-GPU_EXCLUDE = [
-    r"\bintel\b", r"\buhd\b", r"\biris\b", r"\bintegrated\b",
-    r"\buma\b", r"\bshared\b", r"\barc\b"
-]
-
 def has_nvidia_amd_gpu(text: str) -> bool:
-    t = (text or "").lower()
-    include_hit = any(re.search(p, t) for p in GPU_INCLUDE)
-    exclude_hit = any(re.search(p, t) for p in GPU_EXCLUDE)
-    return include_hit and not exclude_hit
+    # shared single-pass rules, see gpu_classifier.py
+    return classify_gpu(text).ok
+
+# Part of the OCR cache key: bump when preprocess() changes
+PREPROCESS_PARAMS = f"imdecode-gray|{ROI_PARAMS}|" + (
+    "resize2x-cubic|bilateral-9-75-75|otsu" if PREPROCESS_PROFILE == "baseline" else profile_params()
+) + (f"|{ocr_confidence.CONF_PARAMS}" if ocr_confidence.OCR_CONFIDENCE else "")
+
+
+# pytesseract and tesserocr don't return identical text: the backend is part of
+# the key. Computed on first OCR, so importing this module picks no backend.
+@lru_cache(maxsize=None)
+def ocr_fingerprint(ocr_config: str) -> str:
+    return fingerprint(PREPROCESS_PARAMS, ocr_config, ocr_backend.get_backend().name)
+
+
+@lru_cache(maxsize=None)
+def stage1_fingerprint(ocr_config: str) -> str:
+    return fingerprint(cascade.STAGE1_PARAMS, ocr_config, ocr_backend.get_backend().name)
+
+
+def decode_gray(png_bytes: bytes) -> np.ndarray:
+    """
+    PNG/JPEG bytes -> single-channel uint8, decoded once straight to grayscale.
+    """
+    import cv2
+
+    gray = cv2.imdecode(np.frombuffer(png_bytes, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("could not decode image bytes")
+    return gray
 
 def preprocess(pil_img: Image.Image):
+    import cv2
+
     arr = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
     gray = cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY)
+    return preprocess_gray(gray)
+
+def preprocess_gray(gray: np.ndarray):
+    import cv2
+
+    if ROI_ENABLED:
+        # upscale/filter/OCR only the title, rating and price rows
+        gray = crop_text_regions(gray)
+    if PREPROCESS_PROFILE != "baseline":
+        # PREPROCESS_PROFILE=<name>|adaptive, see preprocess_profiles.py
+        return preprocess_with_profile(gray)
     gray = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
     gray = cv2.bilateralFilter(gray, 9, 75, 75)
     _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
@@ -100,26 +133,136 @@ def extract_fields(text: str):
 # ----------------------------
 # Streaming function: OCR + Mongo Upsert
 # ----------------------------
-def ocr_and_store(image_path: str, asin: str, page: int, index: int, query: str = "") -> dict | None:
+def ocr_and_store(
+    image_path: str,
+    asin: str,
+    page: int,
+    index: int,
+    query: str = "",
+    png_bytes: bytes | None = None,
+    archived: bool = True,
+) -> dict | None:
     """
-    Returns inserted/updated doc (as dict-like), or None if skipped.
+    Returns the doc queued for upsert (as dict-like), or None if skipped.
+    Queued is not stored: call flush_writes() and then take_write_failures()
+    before treating it as stored (manifest, exports).
+
+    With png_bytes (e.g. WebElement.screenshot_as_png) the card is OCR'd from
+    memory and image_path is only recorded as the archive location;
+    archived=False (the PNG is never written) stores an empty image_path and
+    keeps the file name in image_file.
     """
     img_path = Path(image_path)
-    if not img_path.exists():
+    tags = {"query": query, "page": page, "asin": asin}
+    if png_bytes is not None:
+        data = png_bytes
+    elif img_path.exists():
+        data = img_path.read_bytes()
+    else:
+        METRICS.count("card.missing_image", **tags)
         return None
 
-    pil = Image.open(img_path)
-    pre = preprocess(pil)
-    text = pytesseract.image_to_string(pre, config=OCR_CONFIG, lang="eng")
+    gray = None
+    ocr_config = get_engine().tesseract()
+
+    def load_gray():
+        nonlocal gray
+        if gray is None:
+            with METRICS.timer("ocr.decode", **tags):
+                gray = decode_gray(data)
+        return gray
+
+    if cascade.CASCADE_ENABLED:
+        # stage 1: title band only; most non-GPU cards stop here
+        title_text, dt = cascade.timed(
+            lambda: cached_ocr(data, stage1_fingerprint(ocr_config), lambda: cascade.stage1_ocr(load_gray(), ocr_config))
+        )
+        result = cascade.verdict(title_text, has_nvidia_amd_gpu)
+        cascade.STATS.stage1(result, dt)
+        METRICS.observe("ocr.stage1", dt, cascade=result, **tags)
+        if result == cascade.REJECT:
+            METRICS.count("card.cascade_reject", **tags)
+            return None
+
+    def run_ocr():
+        gray = load_gray()
+        with METRICS.timer("ocr.preprocess", **tags):
+            pre = preprocess_gray(gray)
+        if not ocr_confidence.OCR_CONFIDENCE:
+            with METRICS.timer("ocr.tesseract", **tags):
+                return ocr_backend.image_to_string(pre, ocr_config)
+        # image_to_data + re-OCR of weak fields; cached as JSON
+        with METRICS.timer("ocr.tesseract", **tags):
+            res = ocr_confidence.ocr_fields(pre, ocr_config, extract_fields)
+        if res["reocr"]:
+            METRICS.observe("ocr.reocr", res["reocr_s"], fields=",".join(res["reocr"]), **tags)
+        for field in res["improved"]:
+            METRICS.count("ocr.reocr_improved", field=field, **tags)
+        return ocr_confidence.dumps(res)
+
+    text, dt = cascade.timed(lambda: cached_ocr(data, ocr_fingerprint(ocr_config), run_ocr))
+    cascade.STATS.stage2(dt)
+    METRICS.observe("ocr.stage2", dt, **tags)
+    field_conf = None
+    if ocr_confidence.OCR_CONFIDENCE:
+        res = ocr_confidence.loads(text)
+        text, fields, field_conf = res["text"], res["fields"], res["field_conf"]
 
     # GPU filter
-    if not has_nvidia_amd_gpu(text):
+    with METRICS.timer("gpu_filter", **tags):
+        gpu = classify_gpu(text)
+    if not gpu.ok:
+        METRICS.count("card.gpu_reject", **tags)
         return None
 
-    title, price, rating = extract_fields(text)
+    title, price, rating = fields if field_conf is not None else extract_fields(text)
     if not title:
+        METRICS.count("card.no_title", **tags)
         return None
 
+    METRICS.count("card.stored_ocr", **tags)
+    return store_doc(
+        asin=asin,
+        page=page,
+        index=index,
+        query=query,
+        image_file=img_path.name,
+        image_path=str(img_path) if archived else "",
+        title=title,
+        price=price,
+        rating=rating,
+        raw_text=text,
+        extraction="ocr",
+        gpu=gpu.label,
+        image_bytes=data,
+        field_conf=field_conf,
+    )
+
+
+def store_doc(
+    asin: str,
+    page: int,
+    index: int,
+    query: str,
+    image_file: str,
+    image_path: str,
+    title: str,
+    price: str,
+    rating: str,
+    raw_text: str,
+    extraction: str,
+    gpu: str = "",
+    image_bytes: bytes | None = None,
+    field_conf: dict | None = None,
+) -> dict:
+    """
+    Queue one card upsert. extraction records which path produced the fields
+    ("dom" or "ocr"); gpu is the detected model/vendor, e.g. "RTX 4050".
+    raw_text goes to the side collection (raw_store), keyed by the hash of
+    image_bytes when given; the returned doc is what was queued, see
+    take_write_failures() for whether it reached Mongo.
+    field_conf ({title, price, rating} -> 0-100) comes from OCR_CONFIDENCE=1.
+    """
     now = datetime.now(timezone.utc)
 
     doc = {
@@ -127,27 +270,32 @@ def ocr_and_store(image_path: str, asin: str, page: int, index: int, query: str
         "query": query,
         "page": page,
         "index": index,
-        "image_file": img_path.name,
-        "image_path": str(img_path),
+        "image_file": image_file,
+        "image_path": image_path,
         "title": title,
         "price": price,
         "rating": rating,
-        "raw_text": text,
+        "gpu": gpu,
+        "raw_text": raw_text,
         "source": "amazon_in_cards",
+        "extraction": extraction,
         "updated_at": now,
     }
+    if field_conf is not None:
+        doc["field_conf"] = field_conf
+    doc = raw_store.split(doc, image_bytes)
 
-    try:
-        # Prefer ASIN as key if present, else fall back to image_file
-        key = {"asin": doc["asin"]} if doc["asin"] else {"image_file": doc["image_file"]}
+    # Prefer ASIN as key if present, else fall back to image_file
+    key = {"asin": doc["asin"]} if doc["asin"] else {"image_file": doc["image_file"]}
 
-        _col.update_one(
-            key,
-            {"$set": doc, "$setOnInsert": {"created_at": now}},
-            upsert=True
+    # queued for the next bulk_write; write errors are reported by the writer
+    with METRICS.timer("mongo.queue", query=query, page=page, asin=doc["asin"]):
+        # updated_at from the server clock: export_parquet's watermark reads it
+        # the card doc is the latest state; every observation is kept in the
+        # price history, recorded only once the card upsert is stored
+        get_writer().upsert(
+            key, doc, {"created_at": now}, tag=image_file,
+            current_date=("updated_at",), unset=raw_store.unset_fields(doc),
+            after=lambda: price_history.record(doc["asin"], price, rating, query, now, tag=image_file),
         )
-        return doc
-
-    except PyMongoError as e:
-        print(f"[MongoDB] Error storing {img_path.name}: {e}")
-        return None
\ No newline at end of file
+    return doc
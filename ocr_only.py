@@ -1,28 +1,61 @@
 from pathlib import Path
-import pandas as pd
-from ocr_ext import configure_tesseract, ocr_extract_from_card
+from exporters import StreamingExport
+from ocr_ext import configure_tesseract, preprocess_for_ocr, extract_fields, PREPROCESS_PARAMS
+from ocr_pool import ocr_images
+import cascade
 from filter_gpu import has_nvidia_amd_discrete_gpu
+from metrics import METRICS
 
 BASE_DIR = Path(__file__).parent
 IMG_DIR = BASE_DIR / "card_images"
 OUT_DIR = BASE_DIR / "output"
-OUT_DIR.mkdir(exist_ok=True)
 
 TARGET_COUNT = 10
 
 def main():
-    _, _, ocr_config = configure_tesseract()
+    tess_exe, tessdata_dir, ocr_config = configure_tesseract()
     dump_dir = OUT_DIR / "ocr_text"
-    results = []
+    dump_dir.mkdir(parents=True, exist_ok=True)
+    export = StreamingExport(
+        OUT_DIR / "gpu_top10_from_existing_images",
+        ["image_file", "title_model", "price", "rating", "reviews"],
+        key="image_file",
+        resume=False,
+        sheet_name="GPU_Top10",
+    )
 
-    for img_path in sorted(IMG_DIR.glob("*.png")):
-        fields = ocr_extract_from_card(img_path, ocr_config, dump_text_dir=dump_dir)
+    images = sorted(IMG_DIR.glob("*.png"))
+    ocr_results = ocr_images(
+        images,
+        tess_exe=tess_exe,
+        ocr_config=ocr_config,
+        preprocess=preprocess_for_ocr,
+        preprocess_params=PREPROCESS_PARAMS,
+        extract=extract_fields,
+        prefilter=has_nvidia_amd_discrete_gpu,
+        tessdata_dir=tessdata_dir,
+    )
+
+    for img_path, res in zip(images, ocr_results):
+        if res["error"]:
+            print(f"[OCR ❌] {img_path.name}: {res['error']}")
+            METRICS.count("card.failed", image=img_path.name)
+            continue
+        if res["cascade"] == "reject":
+            METRICS.count("card.cascade_reject", image=img_path.name)
+            continue
+
+        (dump_dir / f"{img_path.stem}.txt").write_text(res["text"], encoding="utf-8")
+        fields = {**res["fields"], "ocr_text": res["text"]}
         combined = fields.get("title_model","") + " " + fields.get("ocr_text","")
 
-        if not has_nvidia_amd_discrete_gpu(combined):
+        with METRICS.timer("gpu_filter", image=img_path.name):
+            is_gpu = has_nvidia_amd_discrete_gpu(combined)
+        if not is_gpu:
+            METRICS.count("card.gpu_reject", image=img_path.name)
             continue
 
-        results.append({
+        export.write({
             "image_file": img_path.name,
             "title_model": fields.get("title_model",""),
             "price": fields.get("price",""),
@@ -30,14 +63,16 @@ def main():
             "reviews": fields.get("reviews",""),
         })
 
-        print(f"[GPU ✅] {len(results)}/{TARGET_COUNT} -> {results[-1]['title_model'][:70]}")
+        print(f"[GPU ✅] {export.written}/{TARGET_COUNT} -> {fields.get('title_model','')[:70]}")
 
-        if len(results) >= TARGET_COUNT:
+        if export.written >= TARGET_COUNT:
             break
 
-    df = pd.DataFrame(results)
-    df.to_csv(OUT_DIR / "gpu_top10_from_existing_images.csv", index=False, encoding="utf-8-sig")
-    print("Saved:", OUT_DIR / "gpu_top10_from_existing_images.csv")
+    print("OCR cascade:", cascade.STATS.snapshot())
+    METRICS.report()
+
+    for path in export.close():
+        print("Saved:", path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
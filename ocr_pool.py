@@ -0,0 +1,213 @@
+# ocr_pool.py
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+import cascade
+import ocr_backend
+import ocr_confidence
+from metrics import METRICS
+from ocr_cache import cached_ocr, fingerprint
+
+# ----------------------------
+# Pool config
+# ----------------------------
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_CHUNKSIZE = int(os.getenv("OCR_CHUNKSIZE", "4"))
+
+# Per-process state, filled by _init_worker
+_worker = {}
+
+
+def _init_worker(
+    tess_exe: str, tessdata_dir: str | None, ocr_config: str, preprocess, preprocess_params, extract, prefilter
+):
+    import pytesseract
+
+    pytesseract.pytesseract.tesseract_cmd = tess_exe
+    if tessdata_dir:
+        os.environ["TESSDATA_PREFIX"] = tessdata_dir
+    confidence = ocr_confidence.OCR_CONFIDENCE and extract is not None
+    if confidence and preprocess_params and ocr_confidence.CONF_PARAMS not in preprocess_params:
+        # cached entries are JSON in this mode; never share keys with plain text
+        preprocess_params = f"{preprocess_params}|{ocr_confidence.CONF_PARAMS}"
+    backend = ocr_backend.get_backend().name
+    fp = fingerprint(preprocess_params, ocr_config, backend) if preprocess_params else None
+    _worker.update(
+        ocr_config=ocr_config,
+        preprocess=preprocess,
+        extract=extract,
+        fingerprint=fp,
+        prefilter=prefilter if cascade.CASCADE_ENABLED else None,
+        stage1_fingerprint=fingerprint(cascade.STAGE1_PARAMS, ocr_config, backend),
+        confidence=confidence,
+    )
+
+
+def _stage1(data: bytes) -> str:
+    def run_ocr():
+        import cv2
+
+        gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        return cascade.stage1_ocr(gray, _worker["ocr_config"])
+
+    return cached_ocr(data, _worker["stage1_fingerprint"], run_ocr)
+
+
+def _ocr_one(image_path: str) -> dict:
+    """
+    preprocess -> Tesseract -> field extraction for one card, inside a worker.
+    Errors are returned, not raised, so one bad image never kills the batch.
+
+    With a prefilter, a cheap title-band pass runs first; cards it rejects
+    come back with cascade="reject", the title text and no fields.
+    """
+    result = {
+        "image_path": image_path, "sha256": "", "text": "", "fields": None, "error": "",
+        "cascade": "", "stage1_s": 0.0, "ocr_s": None, "pre_s": None, "tess_s": None,
+        "field_conf": None, "reocr": [], "improved": [], "reocr_s": None,
+    }
+    try:
+        data = Path(image_path).read_bytes()
+        # hashed here, in the worker, so the consumer never re-reads the file
+        result["sha256"] = hashlib.sha256(data).hexdigest()
+
+        if _worker["prefilter"] is not None:
+            t0 = time.perf_counter()
+            title_text = _stage1(data)
+            result["stage1_s"] = time.perf_counter() - t0
+            result["cascade"] = cascade.verdict(title_text, _worker["prefilter"])
+            if result["cascade"] == cascade.REJECT:
+                result["text"] = title_text
+                return result
+
+        def run_ocr():
+            t0 = time.perf_counter()
+            pre = _worker["preprocess"](Image.open(io.BytesIO(data)))
+            t1 = time.perf_counter()
+            if not _worker["confidence"]:
+                text = ocr_backend.image_to_string(pre, _worker["ocr_config"])
+                result["pre_s"], result["tess_s"] = t1 - t0, time.perf_counter() - t1
+                return text
+            conf = ocr_confidence.ocr_fields(pre, _worker["ocr_config"], _worker["extract"])
+            result["pre_s"], result["tess_s"] = t1 - t0, time.perf_counter() - t1
+            result["reocr"], result["improved"], result["reocr_s"] = conf["reocr"], conf["improved"], conf["reocr_s"]
+            return ocr_confidence.dumps(conf)
+
+        fp = _worker["fingerprint"]
+        t0 = time.perf_counter()
+        text = cached_ocr(data, fp, run_ocr) if fp else run_ocr()
+        result["ocr_s"] = time.perf_counter() - t0
+    except Exception as e:
+        result["error"] = str(e)
+        return result
+
+    if _worker["confidence"]:
+        # fields (possibly re-OCR'd) and their confidences come with the text
+        conf = ocr_confidence.loads(text)
+        result["text"], result["fields"], result["field_conf"] = conf["text"], conf["fields"], conf["field_conf"]
+        return result
+    result["text"] = text
+    if _worker["extract"] is not None:
+        result["fields"] = _worker["extract"](text)
+    return result
+
+
+def _tally(res: dict) -> dict:
+    # worker timings are recorded here, in the consuming process
+    image = Path(res["image_path"]).name
+    if res["cascade"]:
+        cascade.STATS.stage1(res["cascade"], res["stage1_s"])
+        METRICS.observe("ocr.stage1", res["stage1_s"], image=image, cascade=res["cascade"])
+    if res["ocr_s"] is not None:
+        cascade.STATS.stage2(res["ocr_s"])
+        METRICS.observe("ocr.stage2", res["ocr_s"], image=image)
+    if res["pre_s"] is not None:
+        METRICS.observe("ocr.preprocess", res["pre_s"], image=image)
+        METRICS.observe("ocr.tesseract", res["tess_s"], image=image)
+    if res["reocr"]:
+        METRICS.observe("ocr.reocr", res["reocr_s"], image=image, fields=",".join(res["reocr"]))
+    for field in res["improved"]:
+        METRICS.count("ocr.reocr_improved", image=image, field=field)
+    return res
+
+
+def ocr_images(
+    image_paths,
+    tess_exe: str,
+    ocr_config: str,
+    preprocess,
+    preprocess_params: str | None = None,
+    extract=None,
+    prefilter=None,
+    tessdata_dir: str | None = None,
+    workers: int | None = None,
+    chunksize: int | None = None,
+):
+    """
+    OCR card images across a pool of worker processes.
+    Yields one result dict per image, in input order, so the caller stays the
+    single consumer for Mongo upserts and CSV rows.
+
+    preprocess/extract/prefilter must be module-level functions (they are
+    pickled by name). When preprocess_params is given, OCR text goes through
+    the ocr_cache. prefilter (the GPU filter) enables the two-stage cascade;
+    per-stage counters accumulate in cascade.STATS of the calling process.
+    """
+    paths = [str(Path(p)) for p in image_paths]
+    workers = max(1, workers or OCR_WORKERS)
+    chunksize = max(1, chunksize or OCR_CHUNKSIZE)
+    initargs = (tess_exe, tessdata_dir, ocr_config, preprocess, preprocess_params, extract, prefilter)
+
+    if workers == 1 or len(paths) <= 1:
+        _init_worker(*initargs)
+        for p in paths:
+            yield _tally(_ocr_one(p))
+        return
+
+    ex = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+    try:
+        for res in ex.map(_ocr_one, paths, chunksize=chunksize):
+            yield _tally(res)
+    finally:
+        # consumer may stop early (e.g. TARGET_COUNT reached)
+        ex.shutdown(wait=True, cancel_futures=True)
+
+
+class OcrPool:
+    """
+    Long-lived worker pool for callers that get images one at a time (e.g.
+    watch_ingest.py). Same worker setup and result dicts as ocr_images();
+    submit() returns a Future, result(fut) records its timings here.
+    """
+
+    def __init__(
+        self,
+        tess_exe: str,
+        ocr_config: str,
+        preprocess,
+        preprocess_params: str | None = None,
+        extract=None,
+        prefilter=None,
+        tessdata_dir: str | None = None,
+        workers: int | None = None,
+    ):
+        self.workers = max(1, workers or OCR_WORKERS)
+        initargs = (tess_exe, tessdata_dir, ocr_config, preprocess, preprocess_params, extract, prefilter)
+        self._ex = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=initargs)
+
+    def submit(self, image_path):
+        return self._ex.submit(_ocr_one, str(Path(image_path)))
+
+    @staticmethod
+    def result(fut) -> dict:
+        return _tally(fut.result())
+
+    def close(self):
+        self._ex.shutdown(wait=True, cancel_futures=True)
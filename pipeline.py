@@ -1,88 +1,141 @@
 # pipeline.py
+import math
 from pathlib import Path
-import pandas as pd
 
-from ocr_ext import configure_tesseract, ocr_extract_from_card
-from filter_gpu import has_nvidia_amd_discrete_gpu
-from collector import collect_card_screenshots
+from selenium.webdriver.support.ui import WebDriverWait
+
+from collector import CrawlContext, accept_cookies, capture_page, goto_next, make_driver, search_url
+from crawl_control import WAITS, AdaptivePacer
+from exporters import StreamingExport
 
 # =========================
 # PIPELINE CONFIG
 # =========================
 QUERY = "gaming laptop"
+# tried in order when QUERY alone doesn't give TARGET_COUNT GPU laptops
+RELATED_QUERIES = ["rtx laptop", "nvidia geforce laptop", "amd radeon laptop"]
 TARGET_COUNT = 10
 
-MAX_PAGES = 8          # increase if you don't get 10 GPU laptops quickly
-CARDS_PER_PAGE = 12    # capture a bit more than 10 because filter removes many
+PAGES_PER_ROUND = 2    # pages crawled before the hit rate is checked
+MAX_PAGES = 8          # per query
+MIN_HIT_RATE = 0.5     # GPU laptops per page needed to keep paging a query
+CARDS_PER_PAGE = 24    # no surplus needed: capture stops at TARGET_COUNT
+
+OCR_WORKERS = 2
+QUEUE_SIZE = 32
+WAIT_SECONDS = 25
+HEADLESS = False
 
 BASE_DIR = Path(__file__).parent
 OUT_DIR = BASE_DIR / "output"
-OUT_DIR.mkdir(exist_ok=True)
-
-DUMP_OCR_TEXT = True   # saves OCR text per card for debugging
+EXPORT_COLUMNS = ["query", "page", "index", "asin", "title", "price", "rating", "gpu", "extraction"]
+
+
+def crawl_query(driver, wait, ctx: CrawlContext, pacer: AdaptivePacer, query: str, first: bool) -> str:
+    """
+    Page through one query until the target is met, the hit rate says another
+    query is a better bet, or pages run out.
+    Returns "target", "low_yield", "exhausted", "timeout" or "blocked".
+    """
+    print(f"\n=== QUERY {query!r} ===")
+    WAITS.timed("page_load", lambda: driver.get(search_url(query)), query=query, page=1)
+    if first:
+        accept_cookies(driver)
+
+    found_before = ctx.found
+    budget = PAGES_PER_ROUND
+    page = 1
+    while True:
+        print(f"\n=== PAGE {page} ({query}) ===")
+        status = capture_page(driver, wait, page, ctx, query)
+        if status != "ok":
+            pacer.record_block()
+            return status
+        pacer.record_ok()
+
+        if ctx.target_reached():
+            return "target"
+        if page >= MAX_PAGES:
+            return "exhausted"
+
+        if page >= budget:
+            # OCR runs behind capture; count what this query really yielded
+            ctx.drain()
+            if ctx.stop.is_set():
+                return "target"
+            rate = (ctx.found - found_before) / page
+            need = ctx.target - ctx.found
+            if rate < MIN_HIT_RATE:
+                print(f"[WIDEN] {query!r}: {rate:.2f} GPU laptops/page, trying a related query.")
+                return "low_yield"
+            budget = min(MAX_PAGES, page + max(PAGES_PER_ROUND, math.ceil(need / rate)))
+            print(f"[WIDEN] {query!r}: {rate:.2f} GPU laptops/page, {need} to go -> crawling to page {budget}.")
+
+        WAITS.record("pace", pacer.pace())
+        try:
+            goto_next(driver, wait, page + 1)
+        except Exception:
+            print("[END] Next not clickable / last page.")
+            return "exhausted"
+        page += 1
+
+
+def run_pipeline(queries: list, target: int = TARGET_COUNT, on_doc=None) -> list:
+    """
+    Streaming crawl -> DOM/OCR -> GPU filter -> Mongo, stopping as soon as
+    `target` GPU laptops are stored. on_doc(doc) sees each match as it is
+    stored (at most `target`). Returns at most `target` docs, best query first.
+    """
+    ctx = CrawlContext(
+        queries[0], CARDS_PER_PAGE, BASE_DIR, OCR_WORKERS, QUEUE_SIZE,
+        in_memory=True, archive_images=True, extract_mode="dom", target=target, on_doc=on_doc,
+    )
+    driver = None
+    try:
+        driver = make_driver(HEADLESS)
+        wait = WebDriverWait(driver, WAIT_SECONDS)
+        pacer = AdaptivePacer()
+
+        for i, query in enumerate(queries):
+            outcome = crawl_query(driver, wait, ctx, pacer, query, first=(i == 0))
+            ctx.drain()
+            print(f"[QUERY] {query!r}: {outcome} | found {ctx.found}/{target}")
+            if outcome == "blocked" or ctx.stop.is_set():
+                break
+    finally:
+        if driver is not None:
+            driver.quit()
+        docs = ctx.close()
+
+    order = {q: i for i, q in enumerate(queries)}
+    docs.sort(key=lambda d: (order.get(d.get("query"), len(order)), d["page"], d["index"]))
+    unique, seen = [], set()
+    for d in docs:
+        key = d.get("asin") or d.get("image_file")
+        if key not in seen:
+            seen.add(key)
+            unique.append(d)
+    return unique[:target]
 
 
 def main():
-    # Setup OCR
-    tess_exe, tessdata_dir, ocr_config = configure_tesseract()
-    print(" Tesseract EXE:", tess_exe)
-    print(" Tessdata:", tessdata_dir)
-
-    # Collect card screenshots
-    collected = collect_card_screenshots(
-        query=QUERY,
-        max_pages=MAX_PAGES,
-        cards_per_page=CARDS_PER_PAGE,
-        base_dir=BASE_DIR,
-        headless=False,
+    # rows are appended as matches are stored, so a crash keeps what was found
+    export = StreamingExport(
+        OUT_DIR / "amazon_in_gpu_top10_ocr", EXPORT_COLUMNS, key="asin", resume=False, sheet_name="GPU_Top10",
     )
+    try:
+        docs = run_pipeline([QUERY, *RELATED_QUERIES], TARGET_COUNT, on_doc=export.write)
+    finally:
+        paths = export.close()
 
-    if not collected:
-        print("No screenshots collected. Possibly blocked or selectors changed.")
+    if not docs:
+        print("No GPU laptops found. Possibly blocked or selectors changed.")
         return
 
-    # OCR + Filter GPU
-    results = []
-    dump_dir = (OUT_DIR / "ocr_text") if DUMP_OCR_TEXT else None
-
-    for item in collected:
-        img_path = Path(item["image_path"])
-
-        fields = ocr_extract_from_card(img_path, ocr_config, dump_text_dir=dump_dir)
-
-        combined_text = (fields.get("title_model", "") + " " + fields.get("ocr_text", ""))
-        if not has_nvidia_amd_discrete_gpu(combined_text):
-            continue
-
-        row = {
-            "page": item["page"],
-            "index": item["index"],
-            "asin": item["asin"],
-            "image_file": img_path.name,
-            "title_model": fields.get("title_model", ""),
-            "price": fields.get("price", ""),
-            "rating": fields.get("rating", ""),
-            "reviews": fields.get("reviews", ""),
-        }
-        results.append(row)
-
-        print(f"[GPU present] {len(results)}/{TARGET_COUNT} -> {row['title_model'][:70]} | {row['price']} | {row['rating']}")
-
-        if len(results) >= TARGET_COUNT:
-            break
-
-    # Export
-    df = pd.DataFrame(results)
-    out_csv = OUT_DIR / "amazon_in_gpu_top10_ocr.csv"
-    out_xlsx = OUT_DIR / "amazon_in_gpu_top10_ocr.xlsx"
-
-    df.to_csv(out_csv, index=False, encoding="utf-8-sig")
-    with pd.ExcelWriter(out_xlsx, engine="openpyxl") as w:
-        df.to_excel(w, index=False, sheet_name="GPU_Top10")
-
-    print("\n Saved:", out_csv)
-    print(" Saved:", out_xlsx)
-    print("Total GPU laptops extracted:", len(df))
+    print()
+    for path in paths:
+        print(" Saved:", path)
+    print("Total GPU laptops extracted:", len(docs))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+# preprocess_profiles.py
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from roi import find_text_lines
+
+# ----------------------------
+# Profile config
+# ----------------------------
+# "baseline" is the original preprocess(); "adaptive" picks per card from the
+# benchmark table written by bench_preprocess.py.
+PREPROCESS_PROFILE = os.getenv("PREPROCESS_PROFILE", "baseline")
+PROFILE_TABLE = Path(os.getenv("PREPROCESS_PROFILE_TABLE", str(Path(__file__).parent / "output" / "preprocess_profiles.json")))
+ACCURACY_TARGET = float(os.getenv("PREPROCESS_ACCURACY_TARGET", "0.9"))
+
+# line height (px) Tesseract reads best at; used by the "glyph_scale" profile
+TARGET_LINE_PX = 32
+
+PROFILES = {
+    "baseline":    {"scale": 2.0,     "blur": "bilateral", "threshold": "otsu"},
+    "no_upscale":  {"scale": 1.0,     "blur": "bilateral", "threshold": "otsu"},
+    "gaussian":    {"scale": 2.0,     "blur": "gaussian",  "threshold": "otsu"},
+    "fast":        {"scale": 1.5,     "blur": "none",      "threshold": "otsu"},
+    "adaptive_th": {"scale": 2.0,     "blur": "median",    "threshold": "adaptive"},
+    "glyph_scale": {"scale": "glyph", "blur": "gaussian",  "threshold": "otsu"},
+}
+
+# glyph-height buckets (median text-line height on the raw card, px)
+BUCKETS = [("small", 14), ("medium", 22), ("large", 10_000)]
+
+
+def line_height(gray: np.ndarray) -> float:
+    """
+    Median height of detected text lines; 0 when none are found.
+    """
+    hs = [h for _, _, _, h in find_text_lines(gray)]
+    return float(np.median(hs)) if hs else 0.0
+
+
+def glyph_bucket(height: float) -> str:
+    for name, upper in BUCKETS:
+        if height < upper:
+            return name
+    return BUCKETS[-1][0]
+
+
+def apply_profile(gray: np.ndarray, profile: dict, height: float | None = None) -> np.ndarray:
+    import cv2
+
+    scale = profile["scale"]
+    if scale == "glyph":
+        h = height if height is not None else line_height(gray)
+        scale = min(3.0, max(1.0, TARGET_LINE_PX / h)) if h else 2.0
+    if scale != 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+
+    blur = profile["blur"]
+    if blur == "bilateral":
+        gray = cv2.bilateralFilter(gray, 9, 75, 75)
+    elif blur == "gaussian":
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
+    elif blur == "median":
+        gray = cv2.medianBlur(gray, 3)
+
+    if profile["threshold"] == "adaptive":
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+    _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return th
+
+
+def load_table(path: Path = PROFILE_TABLE) -> dict:
+    """
+    {bucket: {profile: {"accuracy": float, "ms": float}}} from bench_preprocess.py.
+    """
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def choose_profile(bucket: str, table: dict, target: float = ACCURACY_TARGET) -> str:
+    """
+    Cheapest profile meeting the accuracy target for this glyph-height bucket;
+    the most accurate one if none does; baseline when there's no data.
+    """
+    rows = table.get(bucket) or {}
+    rows = {k: v for k, v in rows.items() if k in PROFILES}
+    if not rows:
+        return "baseline"
+    ok = [k for k, v in rows.items() if v["accuracy"] >= target]
+    if ok:
+        return min(ok, key=lambda k: rows[k]["ms"])
+    return max(rows, key=lambda k: (rows[k]["accuracy"], -rows[k]["ms"]))
+
+
+_table = None
+
+
+def adaptive_preprocess(gray: np.ndarray) -> np.ndarray:
+    global _table
+    if _table is None:
+        _table = load_table()
+    h = line_height(gray)
+    name = choose_profile(glyph_bucket(h), _table)
+    return apply_profile(gray, PROFILES[name], height=h)
+
+
+def preprocess_with_profile(gray: np.ndarray, name: str = PREPROCESS_PROFILE) -> np.ndarray:
+    if name == "adaptive":
+        return adaptive_preprocess(gray)
+    return apply_profile(gray, PROFILES[name])
+
+
+def profile_params(name: str = PREPROCESS_PROFILE) -> str:
+    """
+    OCR cache key part for the active profile (adaptive depends on the table).
+    """
+    if name == "adaptive":
+        data = PROFILE_TABLE.read_bytes() if PROFILE_TABLE.exists() else b""
+        return f"adaptive-{ACCURACY_TARGET}-{hashlib.sha256(data).hexdigest()[:8]}"
+    p = PROFILES[name]
+    return f"{name}-{p['scale']}-{p['blur']}-{p['threshold']}"
@@ -0,0 +1,167 @@
+# price_history.py
+import os
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+from engine import get_engine
+
+# ----------------------------
+# Price history config
+# ----------------------------
+# Append-only observations; gpu_laptops stays the latest-state view.
+PRICE_HISTORY_ENABLED = os.getenv("PRICE_HISTORY", "1") != "0"
+PRICE_HISTORY_COL = os.getenv("PRICE_HISTORY_COL", "price_history")
+
+_PRICE_RE = re.compile(r"(\d[\d,]*)(?:\.(\d{1,2}))?")
+
+
+def to_paise(price) -> int | None:
+    """
+    "₹78,990" -> 7899000, "1,299.5" -> 129950; None when there is no number.
+    """
+    m = _PRICE_RE.search(str(price or ""))
+    if not m:
+        return None
+    rupees = int(m.group(1).replace(",", ""))
+    frac = (m.group(2) or "").ljust(2, "0")
+    return rupees * 100 + int(frac)
+
+
+def _rating(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _setup(db, name: str):
+    """
+    Create the collection as a native time series (MongoDB 5.0+; falls back to
+    a plain collection) and the (asin, ts) / ts indexes every helper scans.
+    """
+    from pymongo.errors import CollectionInvalid, OperationFailure
+
+    if name not in db.list_collection_names():
+        try:
+            db.create_collection(name, timeseries={"timeField": "ts", "metaField": "asin", "granularity": "hours"})
+        except CollectionInvalid:
+            pass  # created by another process since list_collection_names()
+        except OperationFailure:
+            # pre-5.0 server: no time series
+            try:
+                db.create_collection(name)
+            except CollectionInvalid:
+                pass
+    col = db[name]
+    col.create_index([("asin", 1), ("ts", 1)])
+    col.create_index([("ts", 1)])
+
+
+def history_col():
+    return get_engine().collection(PRICE_HISTORY_COL, _setup)
+
+
+def record(asin: str, price, rating, query: str = "", ts: datetime | None = None, tag: str = ""):
+    """
+    Queue one observation on the batched writer. Skipped without an ASIN or
+    when neither price nor rating was read.
+    """
+    if not PRICE_HISTORY_ENABLED or not asin:
+        return
+    paise, stars = to_paise(price), _rating(rating)
+    if paise is None and stars is None:
+        return
+    doc = {
+        "asin": asin.upper(),
+        "ts": ts or datetime.now(timezone.utc),
+        "price_paise": paise,
+        "rating": stars,
+        "query": query,
+    }
+    get_engine().writer(history_col()).insert(doc, tag=tag or asin)
+
+
+# ----------------------------
+# Query helpers (all start with an index range: asin + ts, or ts)
+# ----------------------------
+def latest(asin: str) -> dict | None:
+    """
+    Most recent observation with a price.
+    """
+    return history_col().find_one(
+        {"asin": asin.upper(), "price_paise": {"$ne": None}},
+        {"_id": 0},
+        sort=[("ts", -1)],
+    )
+
+
+def price_range(asin: str, days: float = 30, until: datetime | None = None) -> dict | None:
+    """
+    {min_paise, max_paise, observations, first_ts, last_ts} over the window.
+    """
+    until = until or datetime.now(timezone.utc)
+    rows = list(history_col().aggregate([
+        {"$match": {
+            "asin": asin.upper(),
+            "ts": {"$gte": until - timedelta(days=days), "$lte": until},
+            "price_paise": {"$ne": None},
+        }},
+        {"$group": {
+            "_id": "$asin",
+            "min_paise": {"$min": "$price_paise"},
+            "max_paise": {"$max": "$price_paise"},
+            "observations": {"$sum": 1},
+            "first_ts": {"$min": "$ts"},
+            "last_ts": {"$max": "$ts"},
+        }},
+    ]))
+    if not rows:
+        return None
+    out = rows[0]
+    out["asin"] = out.pop("_id")
+    return out
+
+
+def price_drops(days: float = 7, min_drop_pct: float = 5.0, asins: list | None = None) -> list:
+    """
+    ASINs whose latest price is at least min_drop_pct below their highest
+    price in the window, biggest drop first. Scans only the window (ts index,
+    or asin+ts when `asins` is given).
+    """
+    match = {"ts": {"$gte": datetime.now(timezone.utc) - timedelta(days=days)}, "price_paise": {"$ne": None}}
+    if asins:
+        match["asin"] = {"$in": [a.upper() for a in asins]}
+    rows = history_col().aggregate([
+        {"$match": match},
+        {"$sort": {"asin": 1, "ts": 1}},
+        {"$group": {
+            "_id": "$asin",
+            "max_paise": {"$max": "$price_paise"},
+            "latest_paise": {"$last": "$price_paise"},
+            "latest_ts": {"$last": "$ts"},
+            "query": {"$last": "$query"},
+        }},
+        {"$addFields": {
+            "drop_pct": {"$multiply": [
+                {"$divide": [{"$subtract": ["$max_paise", "$latest_paise"]}, "$max_paise"]}, 100,
+            ]},
+        }},
+        {"$match": {"drop_pct": {"$gte": min_drop_pct}}},
+        {"$sort": {"drop_pct": -1}},
+    ], allowDiskUse=True)
+    return [{"asin": r.pop("_id"), **r} for r in rows]
+
+
+if __name__ == "__main__":
+    # python price_history.py latest <ASIN> | range <ASIN> [days] | drops [days] [min_pct]
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "drops"
+    if cmd == "latest" and len(sys.argv) > 2:
+        print(latest(sys.argv[2]))
+    elif cmd == "range" and len(sys.argv) > 2:
+        print(price_range(sys.argv[2], float(sys.argv[3]) if len(sys.argv) > 3 else 30))
+    else:
+        days = float(sys.argv[2]) if len(sys.argv) > 2 else 7
+        pct = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+        for r in price_drops(days, pct):
+            print(f"{r['asin']}  -{r['drop_pct']:.1f}%  {r['max_paise'] / 100:,.0f} -> {r['latest_paise'] / 100:,.0f}")
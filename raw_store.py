@@ -0,0 +1,182 @@
+# raw_store.py
+import hashlib
+import os
+import sys
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from engine import get_engine
+
+# ----------------------------
+# raw_text storage config
+# ----------------------------
+# "side": compressed blobs in RAW_TEXT_COL, cards keep only raw_ref
+# "inline": raw_text stays on the card document (previous behaviour)
+RAW_TEXT_MODE = os.getenv("RAW_TEXT_MODE", "side")
+RAW_TEXT_COL = os.getenv("RAW_TEXT_COL", "raw_text")
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+try:
+    import zstandard
+except ImportError:  # zlib is always there
+    zstandard = None
+
+CODEC = os.getenv("RAW_TEXT_CODEC", "zstd" if zstandard is not None else "zlib")
+
+
+def compress(text: str, codec: str = CODEC) -> bytes:
+    data = (text or "").encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(blob: bytes, codec: str) -> str:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("raw_text blob is zstd-compressed; pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def raw_key(image_bytes: bytes | None = None, image_path: str = "", text: str = "") -> str:
+    """
+    sha256 of the card image (bytes, or the file at image_path); DOM cards have
+    no image, so they are keyed by their text instead ("text:" prefix).
+    """
+    if image_bytes is not None:
+        return hashlib.sha256(image_bytes).hexdigest()
+    if image_path and Path(image_path).is_file():
+        from manifest import file_hash
+
+        return file_hash(Path(image_path))
+    return "text:" + hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def raw_col():
+    return get_engine().collection(RAW_TEXT_COL)
+
+
+def put(key: str, text: str):
+    """
+    Queue the compressed blob on the batched writer (idempotent per key).
+    """
+    get_engine().writer(raw_col()).upsert(
+        {"_id": key},
+        {"codec": CODEC, "data": compress(text), "chars": len(text or "")},
+        {"created_at": datetime.now(timezone.utc)},
+        tag=key,
+    )
+
+
+def split(doc: dict, image_bytes: bytes | None = None, digest: str | None = None) -> dict:
+    """
+    Card doc as it should be stored: in side mode raw_text is moved to the
+    side collection and replaced by raw_ref; inline mode returns doc as is.
+    digest is the image sha256 when the caller already has it (the OCR pool
+    returns one), so the image isn't read and hashed again.
+    Upsert the result with unset=unset_fields(doc), so an older inline
+    raw_text on the stored card goes away.
+    """
+    if RAW_TEXT_MODE != "side" or "raw_text" not in doc:
+        return doc
+    out = dict(doc)
+    text = out.pop("raw_text") or ""
+    key = digest or raw_key(image_bytes, out.get("image_path", ""), text)
+    put(key, text)
+    out["raw_ref"] = key
+    return out
+
+
+def unset_fields(doc: dict) -> tuple:
+    """
+    Fields to $unset when upserting a split() doc.
+    """
+    return ("raw_text",) if "raw_ref" in doc else ()
+
+
+def load(doc: dict) -> str:
+    """
+    The card's raw_text, fetched and decompressed only when asked for.
+    raw_ref wins over an inline raw_text (stale once the card was re-OCR'd
+    in side mode).
+    """
+    if doc.get("raw_ref"):
+        blob = raw_col().find_one({"_id": doc["raw_ref"]})
+        if blob:
+            return decompress(blob["data"], blob["codec"])
+    return doc.get("raw_text") or ""
+
+
+def migrate(col=None, batch: int = 500) -> dict:
+    """
+    Move raw_text of existing card docs into the side collection and $unset
+    it. Safe to re-run: only docs still carrying raw_text are touched.
+    """
+    from pymongo import UpdateOne
+
+    col = col if col is not None else get_engine().col
+    side = raw_col()
+    moved = raw_bytes = packed_bytes = 0
+    ops, blobs = [], []
+
+    def flush():
+        if blobs:
+            side.bulk_write(blobs, ordered=False)
+        if ops:
+            col.bulk_write(ops, ordered=False)
+        ops.clear()
+        blobs.clear()
+
+    cursor = col.find(
+        {"raw_text": {"$exists": True}}, {"raw_text": 1, "image_path": 1}
+    ).batch_size(batch)
+    for d in cursor:
+        text = d.get("raw_text") or ""
+        key = raw_key(image_path=d.get("image_path", ""), text=text)
+        data = compress(text)
+        blobs.append(UpdateOne(
+            {"_id": key},
+            {"$set": {"codec": CODEC, "data": data, "chars": len(text)},
+             "$setOnInsert": {"created_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        ))
+        ops.append(UpdateOne({"_id": d["_id"]}, {"$set": {"raw_ref": key}, "$unset": {"raw_text": ""}}))
+        moved += 1
+        raw_bytes += len(text.encode("utf-8"))
+        packed_bytes += len(data)
+        if len(ops) >= batch:
+            flush()
+    flush()
+    return {
+        "moved": moved,
+        "codec": CODEC,
+        "raw_kb": round(raw_bytes / 1024, 1),
+        "compressed_kb": round(packed_bytes / 1024, 1),
+    }
+
+
+def stats() -> dict:
+    col = get_engine().col
+    return {
+        "mode": RAW_TEXT_MODE,
+        "codec": CODEC,
+        "inline_docs": col.count_documents({"raw_text": {"$exists": True}}),
+        "ref_docs": col.count_documents({"raw_ref": {"$exists": True}}),
+        "blobs": raw_col().estimated_document_count(),
+    }
+
+
+if __name__ == "__main__":
+    # python raw_store.py migrate | stats | show <ASIN or image_file>
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if cmd == "migrate":
+        print(migrate())
+    elif cmd == "show" and len(sys.argv) > 2:
+        key = sys.argv[2]
+        doc = get_engine().col.find_one({"$or": [{"asin": key.upper()}, {"image_file": key}]})
+        print(load(doc) if doc else f"no card {key!r}")
+    else:
+        print(stats())
@@ -0,0 +1,173 @@
+# roi.py
+import os
+import re
+import threading
+
+import numpy as np
+
+# ----------------------------
+# ROI config
+# ----------------------------
+# OCR_ROI=1: OCR only the title rows plus the rows holding the price and the
+# rating, located with a cheap image_to_data pass on the raw card. Opt-in.
+ROI_ENABLED = os.getenv("OCR_ROI", "0") == "1"
+# title is 2-3 lines; the GPU model and brand live there
+ROI_TITLE_ROWS = int(os.getenv("OCR_ROI_TITLE_ROWS", "3"))
+# used only when the locate pass finds neither a price nor a rating
+ROI_MAX_LINES = int(os.getenv("OCR_ROI_MAX_LINES", "7"))
+ROI_PAD = 4
+ROI_GAP = 10
+
+# Part of the OCR cache key (empty when ROI is off)
+ROI_PARAMS = (
+    f"roi-grad-close-locate-{ROI_TITLE_ROWS}-{ROI_MAX_LINES}-{ROI_PAD}-{ROI_GAP}" if ROI_ENABLED else ""
+)
+
+# what the locate pass looks for: "₹1,23,990" / "1,23,990" and "4.3 out of 5"
+PRICE_RE = re.compile(r"₹\s*\d|\b\d{1,3}(?:,\d{2,3})+\b")
+RATING_RE = re.compile(r"\d(?:\.\d)?\s*out\s+of\s+5", re.I)
+
+_stats = {"cards": 0, "fallback": 0, "unlocated": 0, "pixels_in": 0, "pixels_out": 0}
+_stats_lock = threading.Lock()
+
+
+def find_text_lines(gray: np.ndarray) -> list:
+    """
+    Cheap morphological text-line detection on the raw (not upscaled) card:
+    gradient -> Otsu -> horizontal close -> external contours.
+    Returns (x, y, w, h) boxes that look like lines of text, top to bottom.
+    """
+    import cv2
+
+    H, W = gray.shape[:2]
+    grad = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, bw = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, W // 40), 1))
+    closed = cv2.morphologyEx(bw, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    max_h = max(12, H // 12)
+    lines = []
+    for c in contours:
+        x, y, w, h = cv2.boundingRect(c)
+        if h < 6 or h > max_h or w < 2 * h:
+            continue  # specks, product photo blobs, icons
+        fill = cv2.countNonZero(bw[y:y + h, x:x + w]) / float(w * h)
+        if fill < 0.15:
+            continue
+        lines.append((x, y, w, h))
+    return sorted(lines, key=lambda b: (b[1], b[0]))
+
+
+def group_rows(lines: list) -> list:
+    """
+    Merge boxes that share a row into one band (x0, y0, x1, y1).
+    """
+    rows = []
+    for x, y, w, h in lines:
+        for r in rows:
+            overlap = min(r[3], y + h) - max(r[1], y)
+            if overlap > 0.5 * min(h, r[3] - r[1]):
+                r[0], r[1], r[2], r[3] = min(r[0], x), min(r[1], y), max(r[2], x + w), max(r[3], y + h)
+                break
+        else:
+            rows.append([x, y, x + w, y + h])
+    return sorted(rows, key=lambda r: r[1])
+
+
+def pick_rows(rows: list, words: list, title_rows: int = ROI_TITLE_ROWS, max_lines: int = ROI_MAX_LINES) -> list | None:
+    """
+    Indexes of the rows worth OCRing: the first title_rows rows plus every
+    row whose words (image_to_data dicts, matched by vertical centre) hold a
+    price or an "out of 5" rating. Returns None when no row matched, so the
+    caller can fall back to the first max_lines rows.
+    """
+    text = [[] for _ in rows]
+    for w in sorted(words, key=lambda w: w["left"]):
+        cy = w["top"] + w["height"] / 2
+        for i, (_, y0, _, y1) in enumerate(rows):
+            if y0 <= cy <= y1:
+                text[i].append(w["text"])
+                break
+
+    hits = [i for i, ws in enumerate(text) if PRICE_RE.search(" ".join(ws)) or RATING_RE.search(" ".join(ws))]
+    if not hits:
+        return None
+    return sorted(set(range(min(title_rows, len(rows)))) | set(hits))
+
+
+def locate_words(gray: np.ndarray) -> list:
+    """
+    Cheap word-box pass for pick_rows: native resolution, Otsu only, sparse
+    text segmentation.
+    """
+    import cv2
+
+    import ocr_backend
+    from engine import get_engine
+
+    config = re.sub(r"--psm\s+\d+", "--psm 11", get_engine().tesseract())
+    _, th = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return ocr_backend.image_to_data(th, config)
+
+
+def crop_text_regions(gray: np.ndarray, max_lines: int = ROI_MAX_LINES, words: list | None = None) -> np.ndarray:
+    """
+    Stack the title rows and the rows holding the price and the rating into
+    one compact image, dropping the product photo and footer boilerplate.
+    words are image_to_data word boxes for the card (located here when not
+    given). When neither price nor rating is found, the first max_lines rows
+    are kept; with no text rows at all the full card is returned.
+    """
+    H, W = gray.shape[:2]
+    rows = group_rows(find_text_lines(gray))
+
+    if not rows:
+        _record(H * W, H * W, fallback=True)
+        return gray
+
+    keep = pick_rows(rows, locate_words(gray) if words is None else words, max_lines=max_lines)
+    unlocated = keep is None
+    if unlocated:
+        keep = range(min(max_lines, len(rows)))
+
+    crops = []
+    for i in keep:
+        x0, y0, x1, y1 = rows[i]
+        x0, y0 = max(0, x0 - ROI_PAD), max(0, y0 - ROI_PAD)
+        x1, y1 = min(W, x1 + ROI_PAD), min(H, y1 + ROI_PAD)
+        crops.append(gray[y0:y1, x0:x1])
+
+    out_w = max(c.shape[1] for c in crops)
+    out_h = sum(c.shape[0] for c in crops) + ROI_GAP * (len(crops) + 1)
+    # background colour of the card (white on Amazon) keeps Otsu stable
+    bg = int(np.median(gray[0, :]))
+    out = np.full((out_h, out_w + 2 * ROI_GAP), bg, dtype=gray.dtype)
+
+    y = ROI_GAP
+    for c in crops:
+        out[y:y + c.shape[0], ROI_GAP:ROI_GAP + c.shape[1]] = c
+        y += c.shape[0] + ROI_GAP
+
+    _record(H * W, out.size, fallback=False, unlocated=unlocated)
+    return out
+
+
+def _record(pixels_in: int, pixels_out: int, fallback: bool, unlocated: bool = False):
+    with _stats_lock:
+        _stats["cards"] += 1
+        _stats["fallback"] += int(fallback)
+        _stats["unlocated"] += int(unlocated)
+        _stats["pixels_in"] += pixels_in
+        _stats["pixels_out"] += pixels_out
+
+
+def roi_stats() -> dict:
+    """
+    Cards seen, full-card fallbacks, cards where no price/rating row was
+    located, and the share of card pixels actually OCR'd.
+    """
+    with _stats_lock:
+        s = dict(_stats)
+    s["pixel_ratio"] = round(s["pixels_out"] / s["pixels_in"], 3) if s["pixels_in"] else 0.0
+    return s
@@ -0,0 +1,10 @@
+# tests/conftest.py
+import os
+import sys
+from pathlib import Path
+
+# the modules live flat in the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# in-memory metrics only: no output/metrics/*.jsonl from test runs
+os.environ.setdefault("METRICS", "0")
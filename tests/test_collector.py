@@ -0,0 +1,41 @@
+# tests/test_collector.py
+import pytest
+
+pytest.importorskip("selenium")
+pytest.importorskip("bs4")
+
+import collector  # noqa: E402
+
+
+def _doc(asin):
+    return {"asin": asin, "image_file": f"{asin}.png", "page": 1, "index": 0, "extraction": "dom"}
+
+
+@pytest.fixture
+def failures(monkeypatch):
+    failed = {}
+    monkeypatch.setattr(collector, "flush_writes", lambda: {})
+    monkeypatch.setattr(collector, "take_write_failures", lambda: dict(failed))
+    return failed
+
+
+def _ctx(tmp_path, target):
+    return collector.CrawlContext("q", 12, tmp_path, 0, 8, True, False, "dom", target=target)
+
+
+def test_target_reached_on_confirmed_writes(tmp_path, failures):
+    ctx = _ctx(tmp_path, target=2)
+    ctx.add_doc(_doc("A"))
+    ctx.add_doc(_doc("B"))
+    assert ctx.stop.is_set()
+    assert ctx.target_reached()
+
+
+def test_failed_write_clears_stop(tmp_path, failures):
+    ctx = _ctx(tmp_path, target=2)
+    ctx.add_doc(_doc("A"))
+    ctx.add_doc(_doc("B"))
+    failures["B.png"] = "E11000"
+    assert not ctx.target_reached()
+    assert not ctx.stop.is_set()
+    assert ctx.found == 1
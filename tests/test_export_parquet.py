@@ -0,0 +1,44 @@
+# tests/test_export_parquet.py
+from datetime import datetime
+
+import pytest
+
+from export_parquet import PartitionedWriter, partition_dir, to_row
+
+DOC = {
+    "asin": "B0TEST", "query": "gaming laptop", "page": "2", "index": 5, "title": "Victus RTX 3050",
+    "price": "₹1,23,990.50", "rating": "4.2", "updated_at": datetime(2026, 5, 1, 12, 0),
+}
+
+
+def test_to_row_price_in_paise():
+    row = to_row(DOC)
+    assert row["price_paise"] == 12399050
+    assert "price" not in row
+    assert to_row({**DOC, "price": "₹78,990"})["price_paise"] == 7899000
+    assert to_row({**DOC, "price": None})["price_paise"] is None
+
+
+def test_to_row_types():
+    row = to_row(DOC)
+    assert (row["page"], row["index"], row["rating"]) == (2, 5, 4.2)
+    assert row["updated_at"].tzinfo is not None
+
+
+def test_partitioned_writer_hides_open_files(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.dataset as ds
+
+    d = partition_dir(tmp_path, "gaming laptop", "2026-05-01")
+    d.mkdir(parents=True)
+    (d / ".part-old.parquet.tmp").write_bytes(b"crashed run")
+
+    w = PartitionedWriter(tmp_path, "run1", row_group=1)
+    assert not (d / ".part-old.parquet.tmp").exists()
+    w.write("gaming laptop", "2026-05-01", to_row(DOC))
+    assert [p.name for p in d.iterdir()] == [".part-run1.parquet.tmp"]
+    assert ds.dataset(tmp_path, partitioning="hive").count_rows() == 0
+
+    assert w.close() == 1
+    t = ds.dataset(tmp_path, partitioning="hive").to_table()
+    assert t.column("price_paise").to_pylist() == [12399050]
@@ -0,0 +1,106 @@
+# tests/test_exporters.py
+import csv
+
+import pytest
+
+from exporters import CsvExporter, ParquetExporter, SummaryStats
+
+COLUMNS = ["asin", "title", "price", "rating"]
+ROWS = [
+    {"asin": "B0A", "title": "TUF F15 RTX 4050", "price": "₹78,990", "rating": "4.3"},
+    {"asin": "B0B", "title": "Victus RTX 3050", "price": "₹1,23,990.50", "rating": ""},
+    {"asin": "B0C", "title": "Legion RTX 4060", "price": "", "rating": "4.6"},
+]
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.DictReader(f))
+
+
+def test_csv_resume_skips_exported_keys(tmp_path):
+    path = tmp_path / "out.csv"
+    e = CsvExporter(path, COLUMNS, key="asin")
+    e.write(ROWS[0])
+    e.close()
+
+    e = CsvExporter(path, COLUMNS, key="asin", resume=True)
+    assert not e.write(ROWS[0])
+    assert e.write(ROWS[1])
+    e.close()
+    assert [r["asin"] for r in _csv_rows(path)] == ["B0A", "B0B"]
+    assert (e.written, e.skipped) == (1, 1)
+
+
+def test_csv_without_resume_starts_over(tmp_path):
+    path = tmp_path / "out.csv"
+    e = CsvExporter(path, COLUMNS, key="asin")
+    e.write(ROWS[0])
+    e.close()
+
+    e = CsvExporter(path, COLUMNS, key="asin", resume=False)
+    assert e.write(ROWS[0])
+    e.close()
+    assert [r["asin"] for r in _csv_rows(path)] == ["B0A"]
+
+
+@pytest.fixture
+def pa_ds():
+    pytest.importorskip("pyarrow")
+    import pyarrow.dataset as ds
+
+    return ds
+
+
+def test_parquet_types_and_paise(tmp_path, pa_ds):
+    e = ParquetExporter(tmp_path / "pq", COLUMNS)
+    for r in ROWS:
+        e.write(r)
+    e.close()
+    t = pa_ds.dataset(tmp_path / "pq").to_table()
+    assert t.column_names == ["asin", "title", "price_paise", "rating"]
+    assert t.column("price_paise").to_pylist() == [7899000, 12399050, None]
+    assert t.column("rating").to_pylist() == [pytest.approx(4.3), None, pytest.approx(4.6)]
+
+
+def test_parquet_readers_skip_the_open_part(tmp_path, pa_ds):
+    e = ParquetExporter(tmp_path / "pq", COLUMNS, row_group=1)
+    e.write(ROWS[0])  # row group written, part still open
+    assert [p.name.startswith(".") for p in (tmp_path / "pq").iterdir()] == [True]
+    assert pa_ds.dataset(tmp_path / "pq").count_rows() == 0
+    e.close()
+    assert pa_ds.dataset(tmp_path / "pq").count_rows() == 1
+
+
+def test_parquet_resume_keeps_parts_and_drops_stale_tmp(tmp_path, pa_ds):
+    out = tmp_path / "pq"
+    e = ParquetExporter(out, COLUMNS)
+    e.write(ROWS[0])
+    e.close()
+    crashed = ParquetExporter(out, COLUMNS, row_group=1)
+    crashed.write(ROWS[1])  # never closed: leaves its temp file behind
+
+    e = ParquetExporter(out, COLUMNS, resume=True)
+    assert not list(out.glob(".part-*"))
+    e.write(ROWS[2])
+    e.close()
+    assert sorted(pa_ds.dataset(out).to_table().column("asin").to_pylist()) == ["B0A", "B0C"]
+
+
+def test_parquet_without_resume_drops_parts(tmp_path, pa_ds):
+    out = tmp_path / "pq"
+    e = ParquetExporter(out, COLUMNS)
+    e.write(ROWS[0])
+    e.close()
+
+    e = ParquetExporter(out, COLUMNS, resume=False)
+    e.write(ROWS[1])
+    e.close()
+    assert pa_ds.dataset(out).to_table().column("asin").to_pylist() == ["B0B"]
+
+
+def test_summary_prices_in_rupees():
+    stats = SummaryStats()
+    for r in ROWS:
+        stats.add(r)
+    assert (stats.priced, stats.price_min, stats.price_max) == (2, 78990, 123990)
@@ -0,0 +1,47 @@
+# tests/test_gpu_classifier.py
+import pytest
+
+from gpu_classifier import DISCRETE, INTEGRATED, NO_GPU, classify
+
+
+@pytest.mark.parametrize("text, vendor, model", [
+    ("ASUS TUF Gaming F15, Intel Core i5, NVIDIA GeForce RTX 4050 6GB", "nvidia", "RTX 4050"),
+    ("Lenovo LOQ RTX-3050 Ti laptop", "nvidia", "RTX 3050 Ti"),
+    ("HP Victus AMD Radeon RX 6500M 4GB", "amd", "RX 6500M"),
+    ("Acer Nitro with GTX1650 graphics", "nvidia", "GTX 1650"),
+    ("Dell G15 NVIDIA graphics", "nvidia", ""),
+])
+def test_discrete(text, vendor, model):
+    m = classify(text)
+    assert m.ok and m.reason == DISCRETE
+    assert (m.vendor, m.model) == (vendor, model)
+
+
+@pytest.mark.parametrize("text", [
+    "Intel Core i5 12th Gen, Intel UHD Graphics",
+    "Intel Iris Xe Graphics, 16GB RAM",
+    "Integrated AMD Radeon Graphics",
+    "Intel Core Ultra 7 with Intel Arc Graphics",
+    "8GB shared graphics memory",
+])
+def test_integrated(text):
+    m = classify(text)
+    assert not m.ok and m.reason == INTEGRATED
+
+
+@pytest.mark.parametrize("text", [
+    "MSI Thin RTX 4050 6GB GDDR6, 16GB shared memory",
+    "Intel Arc + NVIDIA GeForce RTX 4060",
+])
+def test_weak_excludes_ignored_with_discrete_gpu(text):
+    assert classify(text).ok
+
+
+def test_intel_cpu_is_not_integrated():
+    assert classify("Intel Core i7 13th Gen, RTX 4060 8GB").ok
+
+
+@pytest.mark.parametrize("text", ["", None, "Apple MacBook Air M2", "search bar archive"])
+def test_no_gpu(text):
+    m = classify(text)
+    assert not m and m.reason == NO_GPU
@@ -0,0 +1,58 @@
+# tests/test_lean_chrome.py
+import pytest
+
+from lean_chrome import BLOCK_GROUPS, blocked_patterns, install
+
+
+def test_groups_and_deny():
+    pats = blocked_patterns(["images", "fonts"], deny=["*tracker.example*"], allow=[])
+    assert pats == BLOCK_GROUPS["images"] + BLOCK_GROUPS["fonts"] + ["*tracker.example*"]
+
+
+def test_no_duplicates():
+    pats = blocked_patterns(["ads"], deny=[BLOCK_GROUPS["ads"][0]], allow=[])
+    assert len(pats) == len(set(pats)) == len(BLOCK_GROUPS["ads"])
+
+
+def test_allow_removes_matching_patterns():
+    pats = blocked_patterns(["images"], deny=[], allow=["*.png*"])
+    assert "*.png*" not in pats
+    assert "*.jpg*" in pats
+
+
+def test_unknown_group():
+    with pytest.raises(ValueError):
+        blocked_patterns(["images", "nope"], deny=[], allow=[])
+
+
+def test_empty():
+    assert blocked_patterns([], deny=[], allow=[]) == []
+
+
+class FakeDriver:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = []
+        self.quit_called = False
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.calls.append(cmd)
+        if cmd == self.fail_on:
+            raise RuntimeError("cdp failed")
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_install_quits_driver_on_cdp_failure():
+    driver = FakeDriver(fail_on="Network.setBlockedURLs")
+    with pytest.raises(RuntimeError):
+        install(driver, lean=True, report=False)
+    assert driver.quit_called
+
+
+def test_install():
+    driver = FakeDriver()
+    assert install(driver, lean=True, report=True) is driver
+    assert driver.calls == ["Network.enable", "Network.setBlockedURLs", "Performance.enable"]
+    assert not driver.quit_called
@@ -0,0 +1,72 @@
+# tests/test_manifest.py
+import hashlib
+import os
+
+import pytest
+
+import manifest
+from manifest import ERROR, SKIPPED, STORED, Manifest
+
+FP = "fp-1"
+
+
+@pytest.fixture
+def m(tmp_path):
+    return Manifest(tmp_path / "manifest.sqlite3")
+
+
+def _card(tmp_path, data=b"card-bytes", mtime=1_700_000_000):
+    p = tmp_path / "card_p01_00_B0TEST.png"
+    p.write_bytes(data)
+    os.utime(p, (mtime, mtime))
+    return p
+
+
+def test_new_file_needs_processing(m, tmp_path):
+    assert m.needs(_card(tmp_path), FP)
+
+
+def test_recorded_file_is_skipped(m, tmp_path):
+    p = _card(tmp_path)
+    m.record(p, FP, STORED, "RTX 4050", {"title": "x"})
+    assert not m.needs(p, FP)
+    assert m.pending([p], FP) == []
+
+
+def test_error_and_new_fingerprint_redo(m, tmp_path):
+    p = _card(tmp_path)
+    m.record(p, FP, ERROR, "mongo: boom")
+    assert m.needs(p, FP)
+    m.record(p, FP, SKIPPED, "no_gpu")
+    assert not m.needs(p, FP)
+    assert m.needs(p, "fp-2")
+
+
+def test_touched_file_with_same_bytes_is_skipped(m, tmp_path):
+    p = _card(tmp_path)
+    m.record(p, FP, STORED)
+    os.utime(p, (1_700_000_100, 1_700_000_100))
+    assert not m.needs(p, FP)
+    # the new mtime is stored, so the next check needs no hashing
+    mtime = m._conn().execute("SELECT mtime FROM images WHERE path = ?", (str(p),)).fetchone()[0]
+    assert mtime == 1_700_000_100
+
+
+def test_changed_bytes_need_processing(m, tmp_path):
+    p = _card(tmp_path)
+    m.record(p, FP, STORED)
+    _card(tmp_path, data=b"other-bytes", mtime=1_700_000_100)
+    assert m.needs(p, FP)
+
+
+def test_record_uses_given_hash(m, tmp_path, monkeypatch):
+    p = _card(tmp_path)
+    sha = hashlib.sha256(p.read_bytes()).hexdigest()
+
+    def no_read(path):
+        raise AssertionError("file hashed again")
+
+    monkeypatch.setattr(manifest, "file_hash", no_read)
+    m.record(p, FP, STORED, sha256=sha)
+    row = m._conn().execute("SELECT sha256 FROM images WHERE path = ?", (str(p),)).fetchone()
+    assert row[0] == sha
@@ -0,0 +1,49 @@
+# tests/test_metrics.py
+import json
+
+from metrics import Metrics
+
+
+def _metrics(tmp_path, **kw):
+    kw = {"enabled": True, "jsonl": True, "flush_every": 3, "flush_s": 3600, "max_bytes": 1 << 20, **kw}
+    return Metrics(tmp_path, **kw)
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_jsonl_is_opt_in(tmp_path):
+    m = _metrics(tmp_path, jsonl=False)
+    m.count("card.failed")
+    m.close()
+    assert list(tmp_path.iterdir()) == []
+    assert m.summary()["counts"] == {"card.failed": 1}
+
+
+def test_records_are_buffered_until_flush_every(tmp_path):
+    m = _metrics(tmp_path)
+    m.observe("ocr", 0.5, asin="B0A")
+    m.count("card.failed")
+    assert not m.jsonl_path.exists()
+    m.count("card.failed")
+    assert [r.get("stage") or r.get("event") for r in _lines(m.jsonl_path)] == ["ocr", "card.failed", "card.failed"]
+
+
+def test_close_writes_the_tail(tmp_path):
+    m = _metrics(tmp_path)
+    m.count("card.blocked", page=2)
+    m.close()
+    assert _lines(m.jsonl_path)[0]["page"] == 2
+
+
+def test_rotates_past_max_bytes(tmp_path):
+    m = _metrics(tmp_path, flush_every=1, max_bytes=200)
+    for i in range(20):
+        m.count("card.failed", i=i)
+    m.close()
+    rotated = m.jsonl_path.with_name(m.jsonl_path.name + ".1")
+    files = [p for p in (rotated, m.jsonl_path) if p.exists()]
+    assert rotated in files
+    assert all(p.stat().st_size < 400 for p in files)
+    assert _lines(files[-1])[-1]["i"] == 19
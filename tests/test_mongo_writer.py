@@ -0,0 +1,209 @@
+# tests/test_mongo_writer.py
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from pymongo import InsertOne, UpdateOne  # noqa: E402
+from pymongo.errors import AutoReconnect, BulkWriteError  # noqa: E402
+
+from mongo_writer import BulkUpserter  # noqa: E402
+
+
+class FakeCol:
+    """
+    Records bulk_write batches; fail(index -> errmsg) makes the next batch
+    report those write errors, error=... makes it raise outright.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.fail = {}
+        self.error = None
+
+    def bulk_write(self, requests, ordered=True):
+        assert ordered is False
+        self.batches.append(list(requests))
+        if self.error is not None:
+            raise self.error
+        if self.fail:
+            errors = [{"index": i, "errmsg": m} for i, m in self.fail.items()]
+            self.fail = {}
+            raise BulkWriteError({"writeErrors": errors})
+
+
+@pytest.fixture
+def writer():
+    col = FakeCol()
+    # no background flushes during a test: flush() is called explicitly
+    w = BulkUpserter(col, batch_size=100, flush_seconds=3600, max_pending=100, on_error=lambda *a: None)
+    yield w, col
+    w.close()
+
+
+def test_upsert_builds_operators(writer):
+    w, col = writer
+    w.upsert({"asin": "A"}, {"title": "t", "updated_at": 1, "raw_text": "x"}, {"created_at": 1},
+             tag="a.png", current_date=("updated_at",), unset=("raw_text",))
+    w.flush()
+    assert col.batches == [[UpdateOne(
+        {"asin": "A"},
+        {"$set": {"title": "t"}, "$setOnInsert": {"created_at": 1},
+         "$currentDate": {"updated_at": True}, "$unset": {"raw_text": ""}},
+        upsert=True,
+    )]]
+
+
+def test_same_key_upserts_merge_last_wins(writer):
+    w, col = writer
+    w.upsert({"asin": "A"}, {"price": "1", "raw_text": "old"}, {"created_at": 1}, tag="a1")
+    w.upsert({"asin": "A"}, {"price": "2", "raw_ref": "k"}, {"created_at": 2}, tag="a2",
+             current_date=("updated_at",), unset=("raw_text",))
+    w.upsert({"asin": "B"}, {"price": "9"}, tag="b")
+    w.flush()
+
+    (batch,) = col.batches
+    assert len(batch) == 2 and w.merged == 1
+    assert batch[0] == UpdateOne(
+        {"asin": "A"},
+        {"$set": {"price": "2", "raw_ref": "k"}, "$setOnInsert": {"created_at": 1},
+         "$unset": {"raw_text": ""}, "$currentDate": {"updated_at": True}},
+        upsert=True,
+    )
+
+
+def test_later_set_overrides_earlier_unset(writer):
+    w, col = writer
+    w.upsert({"asin": "A"}, {"x": 1}, unset=("raw_text",), current_date=("updated_at",))
+    w.upsert({"asin": "A"}, {"raw_text": "inline", "updated_at": 5})
+    w.flush()
+    assert col.batches[0][0] == UpdateOne(
+        {"asin": "A"}, {"$set": {"x": 1, "raw_text": "inline", "updated_at": 5}}, upsert=True,
+    )
+
+
+def test_no_merge_after_flush(writer):
+    w, col = writer
+    w.upsert({"asin": "A"}, {"x": 1})
+    w.flush()
+    w.upsert({"asin": "A"}, {"x": 2})
+    w.flush()
+    assert [len(b) for b in col.batches] == [1, 1] and w.merged == 0
+
+
+def test_inserts_never_merge(writer):
+    w, col = writer
+    w.insert({"asin": "A", "p": 1})
+    w.insert({"asin": "A", "p": 1})
+    w.flush()
+    assert col.batches == [[InsertOne({"asin": "A", "p": 1})] * 2]
+
+
+def test_write_errors_go_to_take_failures(writer):
+    w, col = writer
+    w.upsert({"asin": "A"}, {"x": 1}, tag="a1")
+    w.upsert({"asin": "B"}, {"x": 1}, tag="b")
+    w.upsert({"asin": "A"}, {"x": 2}, tag="a2")  # merged into index 0
+    col.fail = {0: "E11000 duplicate key"}
+    w.flush()
+
+    assert w.take_failures() == {"a1": "E11000 duplicate key", "a2": "E11000 duplicate key"}
+    assert w.take_failures() == {}
+    assert (w.docs, w.failures) == (1, 1)
+
+
+def test_network_error_fails_whole_batch(writer):
+    w, col = writer
+    w.upsert({"asin": "A"}, {"x": 1}, tag="a")
+    w.insert({"asin": "A"}, tag="h")
+    col.error = AutoReconnect("down")
+    w.flush()
+    assert set(w.take_failures()) == {"a", "h"}
+
+
+def test_on_error_sees_every_tag():
+    col, seen = FakeCol(), []
+    w = BulkUpserter(col, flush_seconds=3600, on_error=lambda tag, msg: seen.append(tag))
+    w.upsert({"asin": "A"}, {"x": 1}, tag="a1")
+    w.upsert({"asin": "A"}, {"x": 2}, tag="a2")
+    col.fail = {0: "boom"}
+    w.close()
+    assert seen == ["a1", "a2"]
+
+
+def test_producer_waiting_on_backpressure_merges_after_wait():
+    col = FakeCol()
+    w = BulkUpserter(col, batch_size=1, flush_seconds=3600, max_pending=1, on_error=lambda *a: None)
+    w.batch_size = 100  # keep the background thread from flushing on its own
+    w.upsert({"asin": "X"}, {"x": 0})  # fills max_pending
+
+    started = threading.Barrier(3)
+
+    def produce(v):
+        started.wait()
+        w.upsert({"asin": "A"}, {"x": v})
+
+    threads = [threading.Thread(target=produce, args=(v,)) for v in (1, 2)]
+    for t in threads:
+        t.start()
+    started.wait()
+    while len(w._cond._waiters) < 2:  # both producers blocked in _queue
+        time.sleep(0.001)
+    w.flush()
+    for t in threads:
+        t.join(timeout=1)
+    w.flush()
+    for t in threads:
+        t.join()
+    w.close()
+    # both A upserts landed in one op, never two ops for the same key
+    a_ops = [r for b in col.batches for r in b if r._filter == {"asin": "A"}]
+    assert len(a_ops) == 1 and w.merged == 1
+
+
+def test_after_runs_only_for_stored_writes(writer):
+    w, col = writer
+    done = []
+    w.upsert({"asin": "A"}, {"price": "1"}, tag="a", after=lambda: done.append("a"))
+    w.upsert({"asin": "B"}, {"price": "2"}, tag="b", after=lambda: done.append("b"))
+    w.insert({"asin": "C"}, tag="c", after=lambda: done.append("c"))
+    col.fail = {1: "E11000 duplicate key"}
+    w.flush()
+    assert done == ["a", "c"]
+    assert w.take_failures() == {"b": "E11000 duplicate key"}
+
+
+def test_after_skipped_when_batch_fails(writer):
+    w, col = writer
+    done = []
+    w.upsert({"asin": "A"}, {"price": "1"}, after=lambda: done.append("a"))
+    col.error = AutoReconnect("down")
+    w.flush()
+    assert done == []
+
+
+def test_merged_upserts_run_every_after(writer):
+    w, col = writer
+    done = []
+    w.upsert({"asin": "A"}, {"price": "1"}, tag="a1", after=lambda: done.append(1))
+    w.upsert({"asin": "A"}, {"price": "2"}, tag="a2", after=lambda: done.append(2))
+    w.flush()
+    assert done == [1, 2]
+
+
+def test_after_error_does_not_break_the_writer(writer, capsys):
+    w, col = writer
+    w.upsert({"asin": "A"}, {"price": "1"}, tag="a", after=lambda: 1 / 0)
+    w.upsert({"asin": "B"}, {"price": "2"}, tag="b")
+    w.flush()
+    assert w.stats()["docs"] == 2
+    assert "callback for a failed" in capsys.readouterr().out
+
+
+def test_closed_writer_rejects(writer):
+    w, _ = writer
+    w.close()
+    with pytest.raises(RuntimeError):
+        w.upsert({"asin": "A"}, {"x": 1})
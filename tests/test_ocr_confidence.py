@@ -0,0 +1,69 @@
+# tests/test_ocr_confidence.py
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pytesseract")
+
+from ocr_confidence import MIN_FIELD_CONF, _lines, _locate, _read  # noqa: E402
+
+
+def _line(*words):
+    """
+    One Tesseract line from (text, conf) pairs.
+    """
+    ws = [
+        {"text": t, "conf": c, "line": 1, "left": 10 * i, "top": 0, "width": 8, "height": 10}
+        for i, (t, c) in enumerate(words)
+    ]
+    return _lines(ws)[0]
+
+
+def test_lines_spans():
+    line = _line(("4.3", 90), ("out", 95), ("of", 95), ("5", 96))
+    assert line["text"] == "4.3 out of 5"
+    assert line["spans"] == [(0, 3), (4, 7), (8, 10), (11, 12)]
+
+
+def test_locate_rating_takes_weakest_word():
+    line = _line(("4.3", 62), ("out", 95), ("of", 95), ("5", 96))
+    conf, ws = _locate("rating", "4.3", line)
+    assert conf == 62
+    assert [w["text"] for w in ws] == ["4.3"]
+
+
+def test_locate_price():
+    line = _line(("₹78,990", 91), ("M.R.P:", 80))
+    conf, ws = _locate("price", "₹78,990", line)
+    assert conf == 91 and [w["text"] for w in ws] == ["₹78,990"]
+
+
+def test_locate_price_glued_to_symbols_is_weak():
+    line = _line(("°72,990", 93))
+    conf, _ = _locate("price", "72,990", line)
+    assert conf < MIN_FIELD_CONF
+
+
+def test_locate_title_uses_line_mean():
+    line = _line(("ASUS", 90), ("TUF", 80), ("Gaming", 70))
+    conf, _ = _locate("title", "ASUS TUF Gaming", line)
+    assert conf == 80
+    assert _locate("title", "ASUS TUF", line) is None
+
+
+def test_locate_missing():
+    line = _line(("Free", 90), ("delivery", 90))
+    assert _locate("price", "₹78,990", line) is None
+    assert _locate("price", "", line) is None
+
+
+def test_read_fields():
+    assert _read("rating", _line(("4.5", 88), ("out", 90), ("of", 90), ("5", 90))) == ("4.5", 88)
+    assert _read("price", _line(("₹1,23,990", 85))) == ("₹1,23,990", 85)
+    assert _read("price", _line(("no", 90), ("price", 90))) is None
+
+
+def test_read_title_rejects_short_or_priced_lines():
+    assert _read("title", _line(("HP", 90))) is None
+    assert _read("title", _line(("Victus", 90), ("₹65,990", 90))) is None
+    value, conf = _read("title", _line(("HP", 90), ("Victus", 80), ("Gaming", 70)))
+    assert (value, conf) == ("HP Victus Gaming", 80)
@@ -0,0 +1,57 @@
+# tests/test_ocr_from_images.py
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pymongo")
+
+import ocr_from_images  # noqa: E402
+from manifest import ERROR, STORED  # noqa: E402
+from ocr_from_images import PendingStores  # noqa: E402
+
+
+class FakeManifest:
+    def __init__(self):
+        self.rows = {}
+
+    def record(self, path, fp, outcome, detail="", result=None, sha256=None):
+        self.rows[Path(path).name] = (outcome, sha256)
+
+
+class FakeWriter:
+    def __init__(self):
+        self.failures = {}
+
+    def take_failures(self):
+        out, self.failures = self.failures, {}
+        return out
+
+
+class FakeEngine:
+    def flush(self):
+        return {}
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    w = FakeWriter()
+    monkeypatch.setattr(ocr_from_images, "get_engine", lambda: FakeEngine())
+    monkeypatch.setattr(ocr_from_images, "get_writer", lambda: w)
+    return w
+
+
+def test_settle_reports_each_card_once_confirmed(writer):
+    manifest, exported, settled = FakeManifest(), [], []
+    export = type("Export", (), {"write": lambda self, row: exported.append(row["image_file"])})()
+    stores = PendingStores(manifest, "fp", export, every=10, on_settled=lambda p, o: settled.append((p.name, o)))
+
+    stores.add(Path("a.png"), "RTX 4050", {"image_file": "a.png"}, "sha-a")
+    stores.add(Path("b.png"), "RTX 4060", {"image_file": "b.png"}, "sha-b")
+    assert settled == []  # queued, not yet confirmed
+
+    writer.failures = {"b.png": "E11000"}
+    assert stores.settle() == 1
+    assert settled == [("a.png", STORED), ("b.png", ERROR)]
+    assert exported == ["a.png"]
+    assert manifest.rows == {"a.png": (STORED, "sha-a"), "b.png": (ERROR, "sha-b")}
@@ -0,0 +1,21 @@
+# tests/test_price_history.py
+import pytest
+
+from price_history import to_paise
+
+
+@pytest.mark.parametrize("price, paise", [
+    ("₹78,990", 7899000),
+    ("₹1,23,990", 12399000),
+    ("1,299.5", 129950),
+    ("1,299.05", 129905),
+    ("₹ 999", 99900),
+    (54999, 5499900),
+])
+def test_to_paise(price, paise):
+    assert to_paise(price) == paise
+
+
+@pytest.mark.parametrize("price", [None, "", "no price", "₹"])
+def test_to_paise_without_number(price):
+    assert to_paise(price) is None
@@ -0,0 +1,59 @@
+# tests/test_raw_store.py
+import zlib
+
+import pytest
+
+import raw_store
+from raw_store import compress, decompress, raw_key, split, unset_fields
+
+TEXT = "ASUS TUF Gaming F15\n₹78,990\n4.3 out of 5 stars\nNVIDIA GeForce RTX 4050\n" * 20
+
+
+def test_zlib_round_trip():
+    blob = compress(TEXT, "zlib")
+    assert len(blob) < len(TEXT.encode("utf-8"))
+    assert decompress(blob, "zlib") == TEXT
+
+
+def test_zstd_round_trip():
+    pytest.importorskip("zstandard")
+    assert decompress(compress(TEXT, "zstd"), "zstd") == TEXT
+
+
+@pytest.mark.parametrize("text", ["", None])
+def test_empty_text(text):
+    assert decompress(compress(text, "zlib"), "zlib") == ""
+
+
+def test_zstd_blob_without_zstandard(monkeypatch):
+    monkeypatch.setattr(raw_store, "zstandard", None)
+    with pytest.raises(RuntimeError):
+        decompress(b"\x28\xb5\x2f\xfd", "zstd")
+
+
+def test_raw_key():
+    assert raw_key(b"png") == raw_key(image_bytes=b"png", text="ignored")
+    assert raw_key(text="a").startswith("text:")
+    assert raw_key(text="a") != raw_key(text="b")
+
+
+def test_unset_fields():
+    assert unset_fields({"raw_ref": "k"}) == ("raw_text",)
+    assert unset_fields({"raw_text": "inline"}) == ()
+
+
+def test_split_uses_given_digest(monkeypatch, tmp_path):
+    img = tmp_path / "card.png"
+    img.write_bytes(b"png")
+    put = {}
+    monkeypatch.setattr(raw_store, "RAW_TEXT_MODE", "side")
+    monkeypatch.setattr(raw_store, "put", lambda key, text: put.update({key: text}))
+    monkeypatch.setattr(raw_store, "raw_key", lambda *a, **kw: pytest.fail("image hashed again"))
+
+    out = split({"asin": "B0TEST", "image_path": str(img), "raw_text": TEXT}, digest="abc123")
+    assert out == {"asin": "B0TEST", "image_path": str(img), "raw_ref": "abc123"}
+    assert put == {"abc123": TEXT}
+
+
+def test_zlib_level_is_plain_zlib():
+    assert zlib.decompress(compress("x", "zlib")) == b"x"
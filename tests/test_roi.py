@@ -0,0 +1,46 @@
+# tests/test_roi.py
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from roi import ROI_GAP, crop_text_regions, pick_rows  # noqa: E402
+
+# ten 12px text rows, 30px apart: 3 title rows, badges, ..., price in row 9
+ROWS = [[20, 20 + 30 * i, 300, 32 + 30 * i] for i in range(10)]
+
+
+def _word(text, row):
+    x0, y0, _, y1 = ROWS[row]
+    return {"text": text, "conf": 90, "left": x0, "top": y0, "width": 40, "height": y1 - y0, "line": row}
+
+
+def test_pick_rows_keeps_title_and_price_row():
+    words = [_word("Laptop", 0), _word("RTX", 1), _word("Limited", 5), _word("₹1,23,990", 9)]
+    assert pick_rows(ROWS, words, title_rows=3) == [0, 1, 2, 9]
+
+
+def test_pick_rows_finds_rating():
+    words = [_word("4.3", 7), {**_word("out", 7), "left": 70}, {**_word("of", 7), "left": 110},
+             {**_word("5", 7), "left": 140}]
+    assert pick_rows(ROWS, words, title_rows=2) == [0, 1, 7]
+
+
+def test_pick_rows_none_without_price_or_rating():
+    assert pick_rows(ROWS, [_word("Sponsored", 4)]) is None
+
+
+def test_price_row_survives_crop():
+    pytest.importorskip("cv2")
+    gray = np.full((340, 360), 255, dtype=np.uint8)
+    for i, (x0, y0, x1, y1) in enumerate(ROWS):
+        # stripes read as text to find_text_lines; the price row is darker
+        gray[y0:y1, x0:x1:4] = 60 if i == 9 else 0
+        gray[y0:y1, x0 + 1:x1:4] = 60 if i == 9 else 0
+
+    out = crop_text_regions(gray, max_lines=7, words=[_word("₹1,23,990", 9)])
+    first7 = crop_text_regions(gray, max_lines=7, words=[])
+
+    # title rows 0-2 plus the price row; the old first-7-rows crop loses it
+    assert (out == 60).any()
+    assert not (first7 == 60).any()
+    assert out.shape[0] - 5 * ROI_GAP == 4 * (first7.shape[0] - 8 * ROI_GAP) // 7
@@ -0,0 +1,96 @@
+# tests/test_watch_ingest.py
+import os
+
+from watch_ingest import PNG_TRAILER, IngestQueue, png_complete
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 32 + PNG_TRAILER
+
+
+def _write(path, data, mtime=None):
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def _queue(monkeypatch, **kw):
+    clock = Clock()
+    monkeypatch.setattr("watch_ingest.time.monotonic", clock)
+    return IngestQueue(**kw), clock
+
+
+def test_png_complete(tmp_path):
+    _write(tmp_path / "done.png", PNG)
+    _write(tmp_path / "partial.png", PNG[:20])
+    assert png_complete(tmp_path / "done.png")
+    assert not png_complete(tmp_path / "partial.png")
+    assert not png_complete(tmp_path / "missing.png")
+
+
+def test_ready_after_debounce(tmp_path, monkeypatch):
+    q, clock = _queue(monkeypatch, debounce_s=0.5, stale_s=30)
+    p = tmp_path / "a.png"
+    _write(p, PNG)
+    q.touch(p)
+    assert q.promote() == 0 and q.debouncing == 1
+
+    clock.t += 0.6
+    assert q.promote() == 1
+    assert (q.ready, q.debouncing) == (1, 0)
+    assert q.pop() == (p, True)
+
+
+def test_change_restarts_debounce(tmp_path, monkeypatch):
+    q, clock = _queue(monkeypatch, debounce_s=0.5, stale_s=30)
+    p = tmp_path / "a.png"
+    _write(p, PNG[:20], mtime=1)
+    q.touch(p)
+    clock.t += 0.4
+    _write(p, PNG, mtime=2)
+    q.touch(p)
+    clock.t += 0.4
+    assert q.promote() == 0  # changed 0.4s ago
+    clock.t += 0.2
+    assert q.promote() == 1
+
+
+def test_incomplete_png_dropped_when_stale(tmp_path, monkeypatch):
+    q, clock = _queue(monkeypatch, debounce_s=0.5, stale_s=5)
+    p = tmp_path / "a.png"
+    _write(p, PNG[:20])
+    q.touch(p)
+    clock.t += 1
+    assert q.promote() == 0 and q.debouncing == 1
+    clock.t += 5
+    assert q.promote() == 0 and q.debouncing == 0
+
+
+def test_deleted_file_forgotten(tmp_path, monkeypatch):
+    q, clock = _queue(monkeypatch, debounce_s=0.5, stale_s=30)
+    p = tmp_path / "a.png"
+    _write(p, PNG)
+    q.touch(p)
+    p.unlink()
+    clock.t += 1
+    assert q.promote() == 0 and q.debouncing == 0
+
+
+def test_fifo_and_no_duplicates(tmp_path, monkeypatch):
+    q, clock = _queue(monkeypatch, debounce_s=0.5, stale_s=30)
+    paths = [tmp_path / f"{i}.png" for i in range(3)]
+    for p in paths:
+        _write(p, PNG)
+        q.touch(p, live=False)
+    clock.t += 1
+    assert q.promote() == 3
+    q.touch(paths[0])  # touched again while already queued
+    clock.t += 1
+    assert q.promote() == 0
+    assert [q.pop()[0] for _ in range(3)] == paths
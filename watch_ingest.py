@@ -0,0 +1,352 @@
+# watch_ingest.py
+import os
+import queue
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from pathlib import Path
+
+from engine import get_engine
+from exporters import StreamingExport
+from gpu_classifier import has_discrete_gpu
+from manifest import get_manifest
+from metrics import METRICS, percentile
+from ocr_cache import fingerprint
+
+# OCR modules (numpy, cv2, pytesseract) are imported in run(): the watcher
+# and the debounce queue work without them
+
+# ----------------------------
+# Watch config
+# ----------------------------
+WATCH_DIR = Path(os.getenv("WATCH_DIR", str(Path(__file__).parent / "card_images")))
+# a file is taken once its size/mtime haven't changed for this long
+WATCH_DEBOUNCE_S = float(os.getenv("WATCH_DEBOUNCE_S", "0.75"))
+# directory rescan interval when watchdog (inotify etc.) isn't available
+WATCH_POLL_S = float(os.getenv("WATCH_POLL_S", "1.0"))
+# stable but still not a complete PNG after this long: dropped as truncated
+WATCH_STALE_S = float(os.getenv("WATCH_STALE_S", "30"))
+WATCH_STATUS_S = float(os.getenv("WATCH_STATUS_S", "15"))
+# images in the OCR pool at once; the rest wait in the ready queue
+WATCH_MAX_INFLIGHT = int(os.getenv("WATCH_MAX_INFLIGHT", "0")) or None
+# recent lags kept for the status line's p50/p95
+WATCH_LAG_WINDOW = 1000
+# stored cards reach the manifest/export after a writer flush at most this late
+WATCH_CONFIRM_S = float(os.getenv("WATCH_CONFIRM_S", "1.0"))
+
+PNG_TRAILER = b"IEND\xaeB`\x82"
+
+
+def png_complete(path: Path) -> bool:
+    """
+    True when the PNG already ends with its IEND chunk (not mid-write).
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(-len(PNG_TRAILER), os.SEEK_END)
+            return f.read() == PNG_TRAILER
+    except OSError:
+        return False
+
+
+def _stat(path: Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class DirWatcher:
+    """
+    Reports *.png paths under `root` that were created or changed.
+    Uses watchdog (inotify / FSEvents / ReadDirectoryChangesW) when it is
+    installed; otherwise rescans the directory every poll_s seconds and only
+    reports entries whose (size, mtime) changed since the last scan.
+    """
+
+    def __init__(self, root: Path, poll_s: float = WATCH_POLL_S):
+        self.root = Path(root)
+        self.poll_s = poll_s
+        self._events = queue.SimpleQueue()
+        self._seen = {}  # polling only: name -> (size, mtime_ns)
+        self._next_scan = 0.0
+        self._observer = None
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            self.mode = "polling"
+            return
+
+        events = self._events
+
+        class Handler(FileSystemEventHandler):
+            # only events that can change a file's bytes or name: "opened" and
+            # "closed without write" (our own reads) would keep --once busy
+            def _put(self, event):
+                if event.is_directory:
+                    return
+                for p in (getattr(event, "dest_path", ""), event.src_path):
+                    if p and str(p).lower().endswith(".png"):
+                        events.put(Path(p))
+
+            on_created = on_modified = on_moved = on_closed = _put
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), str(self.root), recursive=False)
+        self._observer.start()
+        self.mode = "watchdog"
+
+    def existing(self) -> list:
+        """
+        PNGs already in the folder; polling then only reports later changes.
+        """
+        paths = sorted(self.root.glob("*.png"))
+        if self._observer is None:
+            self._seen = {p.name: _stat(p) for p in paths}
+        return paths
+
+    def changed(self) -> set:
+        """
+        Paths touched since the previous call (non-blocking).
+        """
+        out = set()
+        while True:
+            try:
+                out.add(self._events.get_nowait())
+            except queue.Empty:
+                break
+        if self._observer is None and time.monotonic() >= self._next_scan:
+            self._next_scan = time.monotonic() + self.poll_s
+            seen = {}
+            with os.scandir(self.root) as it:
+                for e in it:
+                    if not e.name.lower().endswith(".png") or not e.is_file():
+                        continue
+                    st = e.stat()
+                    seen[e.name] = (st.st_size, st.st_mtime_ns)
+                    if self._seen.get(e.name) != seen[e.name]:
+                        out.add(self.root / e.name)
+            self._seen = seen
+        return out
+
+    def close(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+
+
+class IngestQueue:
+    """
+    Debounce + ready queue. A path becomes ready once its size/mtime have been
+    stable for debounce_s and the PNG is complete; a later change to a queued
+    or finished file makes it pending again. `live` is False for the startup
+    backlog, whose write-to-store lag isn't meaningful.
+    """
+
+    def __init__(self, debounce_s: float = WATCH_DEBOUNCE_S, stale_s: float = WATCH_STALE_S):
+        self.debounce_s = debounce_s
+        self.stale_s = stale_s
+        self._pending = {}      # path -> [stat, stable_since, live]
+        self._ready = deque()   # (path, live)
+        self._queued = set()
+
+    def touch(self, path: Path, live: bool = True):
+        now = time.monotonic()
+        st = _stat(path)
+        if st is None:
+            self._pending.pop(path, None)
+            return
+        cur = self._pending.get(path)
+        if cur is None:
+            self._pending[path] = [st, now, live]
+        elif cur[0] != st:
+            cur[0], cur[1], cur[2] = st, now, cur[2] or live
+
+    def promote(self) -> int:
+        """
+        Move settled files to the ready queue; returns how many moved.
+        """
+        now = time.monotonic()
+        moved = 0
+        for path, (st, since, live) in list(self._pending.items()):
+            if now - since < self.debounce_s:
+                continue
+            cur = _stat(path)
+            if cur is None:
+                del self._pending[path]
+            elif cur != st:
+                self._pending[path][:2] = [cur, now]
+            elif st[0] > 0 and png_complete(path):
+                del self._pending[path]
+                if path not in self._queued:
+                    self._queued.add(path)
+                    self._ready.append((path, live))
+                    moved += 1
+            elif now - since >= self.stale_s:
+                del self._pending[path]
+                print(f"[WATCH] {path.name}: not a complete PNG after {self.stale_s:.0f}s, skipped")
+                METRICS.count("ingest.incomplete", image=path.name)
+        return moved
+
+    def pop(self):
+        path, live = self._ready.popleft()
+        self._queued.discard(path)
+        return path, live
+
+    @property
+    def ready(self) -> int:
+        return len(self._ready)
+
+    @property
+    def debouncing(self) -> int:
+        return len(self._pending)
+
+
+def run(
+    root: Path = WATCH_DIR,
+    workers: int | None = None,
+    max_inflight: int | None = WATCH_MAX_INFLIGHT,
+    status_s: float = WATCH_STATUS_S,
+    once: bool = False,
+):
+    """
+    Watch `root` and push every new or changed card image through the same
+    OCR -> GPU filter -> Mongo path as ocr_from_images.py, with at most
+    max_inflight images in the OCR pool. Lag (file written -> upsert
+    confirmed by Mongo; for skipped/failed cards, -> outcome known) is
+    recorded as ingest.lag. once=True drains the current backlog and returns
+    instead of watching.
+    """
+    import cascade
+    import ocr_backend
+    from ocr_from_images import (
+        CSV_COLUMNS, OUT_DIR, PREPROCESS_PARAMS, PendingStores, extract_fields, handle_result, preprocess,
+    )
+    from ocr_pool import OcrPool
+
+    root = Path(root)
+    if not root.exists():
+        raise FileNotFoundError(f"watch folder not found: {root}")
+
+    engine = get_engine()
+    ocr_config = engine.tesseract()
+    manifest = get_manifest()
+    fp = fingerprint(PREPROCESS_PARAMS, ocr_config, ocr_backend.get_backend().name)
+
+    pool = OcrPool(
+        tess_exe=engine.tess_exe,
+        ocr_config=ocr_config,
+        preprocess=preprocess,
+        preprocess_params=PREPROCESS_PARAMS,
+        extract=extract_fields,
+        prefilter=has_discrete_gpu,
+        tessdata_dir=engine.tessdata_dir,
+        workers=workers,
+    )
+    max_inflight = max(1, max_inflight or 2 * pool.workers)
+    # appended row by row; the xlsx is rebuilt from the CSV on exit
+    export = StreamingExport(
+        OUT_DIR / "gpu_laptops_from_images", CSV_COLUMNS, key="image_file", resume=True, flush_every=1,
+    )
+    inflight = {}  # future -> (path, live, mtime)
+    queued = {}    # path -> (live, mtime): stored cards waiting for Mongo to confirm
+    lags = deque(maxlen=WATCH_LAG_WINDOW)
+    done = {"stored": 0, "skipped": 0, "error": 0}
+
+    def observe_lag(path: Path, mtime: float, outcome: str):
+        lag = max(0.0, time.time() - mtime)
+        lags.append(lag)
+        METRICS.observe("ingest.lag", lag, image=path.name, outcome=outcome)
+
+    def settled(path: Path, outcome: str):
+        live, mtime = queued.pop(path, (False, 0.0))
+        if outcome != "stored":
+            # counted as stored when queued; the upsert failed
+            done["stored"] -= 1
+            done[outcome] = done.get(outcome, 0) + 1
+        if live:
+            observe_lag(path, mtime, outcome)
+
+    stores = PendingStores(manifest, fp, export, max_age_s=WATCH_CONFIRM_S, on_settled=settled)
+    watcher = DirWatcher(root)
+    ingest = IngestQueue()
+
+    # backlog first: whatever the manifest hasn't seen with these settings
+    backlog = manifest.pending(watcher.existing(), fp)  # one table scan, at startup only
+    for p in backlog:
+        ingest.touch(p, live=False)
+    print(f"[WATCH] {root} ({watcher.mode}), backlog {len(backlog)}, {pool.workers} OCR workers, "
+          f"max {max_inflight} in flight")
+
+    next_status = time.monotonic() + status_s
+
+    def status():
+        lag = sorted(lags)
+        print(
+            f"[WATCH] queue {ingest.ready} ready + {ingest.debouncing} settling | in flight {len(inflight)} | "
+            f"done {done} | lag p50 {percentile(lag, 0.5):.2f}s p95 {percentile(lag, 0.95):.2f}s"
+        )
+
+    try:
+        while True:
+            for p in watcher.changed():
+                ingest.touch(p)
+            ingest.promote()
+
+            while ingest.ready and len(inflight) < max_inflight:
+                path, live = ingest.pop()
+                st = _stat(path)
+                # touched but identical bytes, or already done with these settings
+                if st is None or not manifest.needs(path, fp):
+                    continue
+                inflight[pool.submit(path)] = (path, live, st[1] / 1e9)
+
+            if inflight:
+                finished, _ = wait(list(inflight), timeout=0.2, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    path, live, mtime = inflight.pop(fut)
+                    # register before handle_result: it may settle right away
+                    queued[path] = (live, mtime)
+                    outcome = handle_result(path, pool.result(fut), manifest, fp, stores)
+                    done[outcome] = done.get(outcome, 0) + 1
+                    if outcome != "stored":
+                        queued.pop(path, None)
+                        if live:
+                            observe_lag(path, mtime, outcome)
+            elif once and not ingest.ready and not ingest.debouncing:
+                break
+            else:
+                time.sleep(0.1)
+
+            if stores.due():
+                stores.settle()
+            if time.monotonic() >= next_status:
+                next_status = time.monotonic() + status_s
+                status()
+    except KeyboardInterrupt:
+        print("\n[WATCH] stopping; finishing images in flight ...")
+        for fut in list(inflight):
+            path, _, _ = inflight.pop(fut)
+            try:
+                handle_result(path, pool.result(fut), manifest, fp, stores)
+            except Exception as e:
+                print(f"[WATCH] {path.name}: {e}")
+    finally:
+        watcher.close()
+        pool.close()
+        stores.settle()
+        status()
+        print("Mongo writer:", engine.close())
+        print("OCR cascade:", cascade.STATS.snapshot())
+        METRICS.report("Ingest stage timings")
+        for path in export.close():
+            print(" Saved:", path)
+
+
+if __name__ == "__main__":
+    # python watch_ingest.py [--once]
+    import sys
+
+    run(once="--once" in sys.argv[1:])